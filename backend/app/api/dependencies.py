@@ -1,14 +1,15 @@
-from typing import Annotated, List, Optional
+from typing import Annotated, Optional
 import uuid
-from app.dto.models.models import User
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from pydantic import ValidationError
 from app.core.config import settings
 from app.dto.schemas.utils import TokenPayload
-from app.dto.schemas.management.unit_schema import UserRead
+from app.dto.schemas.management.unit_schema import UserPrincipal
 from app.core import security
 from app.core.database import get_session
+from app.core.cache import user_cache
+from app.dto.crud.management_crud import POS_Manager
 from jwt.exceptions import InvalidTokenError  # type: ignore
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -18,58 +19,61 @@ SessionDep = Annotated[AsyncSession, Depends(get_session)]
 TokenDep = Annotated[str, Depends(reusable_oauth2)]
 
 
-async def get_current_user(session: SessionDep, token: TokenDep) -> UserRead:
+async def get_current_user(session: SessionDep, token: TokenDep) -> UserPrincipal:
     try:
         payload = security.decode_access_token(token)
         token_data = TokenPayload(**payload)
-    except (InvalidTokenError, ValidationError):
+        user_id = uuid.UUID(token_data.sub)
+    except (InvalidTokenError, ValidationError, ValueError, TypeError):
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Could not validate credentials")
-    user = await session.get(User, token_data.sub)
-    # If the user is not found, raise an error
+    # a burst of requests with the same token costs only one lookup in database
+    user = user_cache.get(token_data.sub)
+    if user is None:
+        db_user = await POS_Manager(session).get_auth_user(user_id)
+        # If the user is not found, raise an error
+        if not db_user:
+            raise HTTPException(status_code=404, detail="user not found")
+        user = UserPrincipal.model_validate(db_user)
+        user_cache.set(token_data.sub, user)
     # If the user is found, check if the user is active
-    if not user:
-        raise HTTPException(status_code=404, detail="user not found")
     if not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
-    return user
+    # copy : the cached user must not be modified by the route
+    return user.model_copy()
 
 
-CurrentUserDep = Annotated[UserRead, Depends(get_current_user)]
+CurrentUserDep = Annotated[UserPrincipal, Depends(get_current_user)]
 
 
-async def get_current_active_superuser(current_user: CurrentUserDep) -> UserRead:
+async def get_current_active_superuser(current_user: CurrentUserDep) -> UserPrincipal:
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="The user doesn't have enough privileges")
     return current_user
 
 
-CurrentSuperUser = Annotated[UserRead, get_current_active_superuser]
+CurrentSuperUser = Annotated[UserPrincipal, get_current_active_superuser]
 
 
-def get_user_area_scope(current_user: CurrentUserDep) -> Optional[List[uuid.UUID]]:
+def get_user_area_scope(current_user: CurrentUserDep) -> Optional[frozenset[uuid.UUID]]:
     if current_user.is_superuser:
         return None
-    if current_user.is_owner and current_user.owned_areas:
-        return [area.id for area in current_user.owned_areas]
-    if current_user.employee and current_user.employee.area_id:
-        return [current_user.employee.area_id]
+    if current_user.area_scope:
+        return current_user.area_scope
     raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="The user doesn't have access defined")
 
 
-AreaScope = Annotated[Optional[List[int]], Depends(get_user_area_scope)]
+AreaScope = Annotated[Optional[frozenset[uuid.UUID]], Depends(get_user_area_scope)]
 
 
-def check_area_access(area_id: uuid.UUID, area_scope: AreaScope | None, current_user: UserRead):
+def check_area_access(area_id: uuid.UUID, area_scope: frozenset[uuid.UUID] | None, current_user: UserPrincipal):
     if not current_user.is_superuser:
         if area_scope is None or area_id not in area_scope:
             raise HTTPException(status_code=403, detail="Access denied!")
 
 
-def verify_area_access(area_id: uuid.UUID, user: UserRead):
-    async def _verify(area_scope: AreaScope):
-        check_area_access(area_id, area_scope, user)
-
-    return Depends(_verify)
+# the area scope is computed at authentication : the check is a lookup in a set, without any I/O
+def verify_area_access(area_id: uuid.UUID, user: UserPrincipal) -> None:
+    check_area_access(area_id, user.area_scope, user)
 
 
 def require_superuser_or_owner(user: CurrentUserDep):
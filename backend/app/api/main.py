@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from app.api.routes import login, private, sale_routes, supplier_routes, log_routes
+from app.api.routes import login, private, sale_routes, supplier_routes, log_routes, monitoring_routes
 from app.core.config import settings
 from app.api.routes.finance import finance_routes
 from app.api.routes.management import area, employee, user
@@ -23,6 +23,7 @@ api_router.include_router(sale_routes.router)
 api_router.include_router(supplier_routes.router)
 api_router.include_router(customer_routes.router)
 api_router.include_router(log_routes.router)
+api_router.include_router(monitoring_routes.router)
 
 if settings.ENVIRONMENT == "local":
     api_router.include_router(private.router)
@@ -1,4 +1,149 @@
-from fastapi import APIRouter
+import uuid
+from datetime import date
+
+from fastapi import APIRouter, HTTPException, status
+
+from app.api.dependencies import CurrentUserDep, SessionDep, verify_area_access
+from app.core.idempotency import idempotent
+from app.dto.crud.finance_crud import FinanceManager
+from app.dto.schemas.finance.cash_schema import (
+    RegisterBalanceRead,
+    RegisterBalancingCreate,
+    RegisterBalancingRead,
+    RegisterDailyTotalsRead,
+    RegisterOpeningCreate,
+    RegisterOpeningRead,
+    RegisterStatisticsRead,
+    TransactionCashStateRead,
+)
 
 
 router = APIRouter(prefix="/finance", tags=["Finance"])
+
+
+@router.post("/register/open", response_model=RegisterOpeningRead, status_code=status.HTTP_201_CREATED)
+@idempotent
+async def open_register(opening: RegisterOpeningCreate, session: SessionDep, user: CurrentUserDep):
+    """Open a register of the area with the notes / coins counted in it"""
+    verify_area_access(opening.area_id, user)
+    counted: dict[uuid.UUID, int] = {}
+    for line in opening.lines:
+        counted[line.denomination_id] = counted.get(line.denomination_id, 0) + line.quantity
+    try:
+        return await FinanceManager(session).open_register(opening.area_id, user.id, counted)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/register/{register_id}/totals", response_model=RegisterDailyTotalsRead)
+async def register_totals(
+    register_id: uuid.UUID, session: SessionDep, user: CurrentUserDep, dateof: date | None = None
+):
+    """In / out / net amounts of the completed transactions of the register for the day (today by default),
+    with the detail per denomination
+    """
+    manager = FinanceManager(session)
+    try:
+        register = await manager.get_cash_register(register_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    verify_area_access(register.area_id, user)
+    return await manager.register_daily_totals(register_id, dateof or date.today())
+
+
+@router.get("/register/{register_id}/statistics", response_model=RegisterStatisticsRead)
+async def register_statistics(
+    register_id: uuid.UUID, date_begin: date, date_end: date, session: SessionDep, user: CurrentUserDep
+):
+    """Number and amount of the transactions of the register between two days (included),
+    per status, direction and purpose
+    """
+    manager = FinanceManager(session)
+    try:
+        register = await manager.get_cash_register(register_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    verify_area_access(register.area_id, user)
+    groups = await manager.register_statistics(register_id, date_begin, date_end)
+    return RegisterStatisticsRead(
+        register_id=register_id,
+        date_begin=date_begin,
+        date_end=date_end,
+        groups=groups,
+        count=sum(group["count"] for group in groups),
+    )
+
+
+@router.get("/register/{register_id}/balance", response_model=RegisterBalanceRead)
+async def register_balance(register_id: uuid.UUID, session: SessionDep, user: CurrentUserDep):
+    """Cash expected in the register and number of each denomination"""
+    manager = FinanceManager(session)
+    try:
+        register = await manager.get_cash_register(register_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    verify_area_access(register.area_id, user)
+    balance = await manager.register_balance(register_id)
+    return RegisterBalanceRead(
+        register_id=register_id,
+        running_balance=balance["running_balance"],
+        denominations=[
+            {"denomination_id": id, "quantity": quantity} for id, quantity in balance["denominations"].items()
+        ],
+    )
+
+
+@router.post("/register/{register_id}/balancing", response_model=RegisterBalancingRead)
+@idempotent
+async def balance_register(
+    register_id: uuid.UUID, count: RegisterBalancingCreate, session: SessionDep, user: CurrentUserDep
+):
+    """Compare the cash counted with the cash expected in the register and close it until the end of day closing"""
+    manager = FinanceManager(session)
+    try:
+        register = await manager.get_cash_register(register_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    verify_area_access(register.area_id, user)
+    counted: dict[uuid.UUID, int] = {}
+    for line in count.lines:
+        counted[line.denomination_id] = counted.get(line.denomination_id, 0) + line.quantity
+    try:
+        return await manager.balance_register(register_id, user.id, counted)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def _get_transaction(manager: FinanceManager, transaction_id: uuid.UUID, user: CurrentUserDep):
+    try:
+        transaction = await manager.get_cash_transaction(transaction_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    verify_area_access(transaction.register.area_id, user)
+    return transaction
+
+
+@router.post("/transaction/{transaction_id}/complete", response_model=TransactionCashStateRead)
+@idempotent
+async def complete_transaction(transaction_id: uuid.UUID, session: SessionDep, user: CurrentUserDep):
+    """Complete a pending transaction and update the balance of its register"""
+    manager = FinanceManager(session)
+    await _get_transaction(manager, transaction_id, user)
+    try:
+        return await manager.complete_transaction(transaction_id, user.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/transaction/{transaction_id}/cancel", response_model=TransactionCashStateRead)
+@idempotent
+async def cancel_transaction(
+    transaction_id: uuid.UUID, session: SessionDep, user: CurrentUserDep, reason: str | None = None
+):
+    """Cancel a transaction, a completed one is removed from the balance of its register"""
+    manager = FinanceManager(session)
+    await _get_transaction(manager, transaction_id, user)
+    try:
+        return await manager.cancel_transaction(transaction_id, user.id, reason)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
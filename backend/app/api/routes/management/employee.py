@@ -9,11 +9,34 @@ from app.dto.schemas.management.unit_schema import (
 from app.api.dependencies import SessionDep, CurrentUserDep, require_superuser_or_owner, verify_area_access
 from app.dto.crud.management_crud import POS_Manager
 from app.dto.models.utils import Message
+from app.dto.schemas.utils import CursorPage
 
 
 router = APIRouter(prefix="/unit", tags=["employee"])
 
 
+@router.get(
+    "/employees/list/{area_id}",
+    dependencies=[Depends(require_superuser_or_owner)],
+    response_model=CursorPage[EmployeeRead],
+)
+async def fetch_all(
+    area_id: uuid.UUID,
+    session: SessionDep,
+    owner: CurrentUserDep,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+):
+    """Employees of the area, sorted by name"""
+    verify_area_access(area_id, owner)
+    try:
+        page = await POS_Manager(session).get_area_employees_list(area_id, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(data=page.items, next_cursor=page.next_cursor, total=page.total)
+
+
 @router.get(
     "/employee/{area_id}/{employee_id}", dependencies=[Depends(require_superuser_or_owner)], response_model=EmployeeRead
 )
@@ -5,6 +5,7 @@ from fastapi import APIRouter, Depends, HTTPException, Query, status
 
 from app.dto.schemas.management.unit_schema import (
     OwnersRead,
+    RoleRead,
     UpdatedPassword,
     UserAuth,
     UserCreate,
@@ -25,6 +26,7 @@ from app.api.dependencies import (
 from app.dto.crud.management_crud import POS_Manager
 from app.dto.models.utils import Message
 from app.dto.models.models import User
+from app.dto.schemas.utils import CursorPage
 
 
 router = APIRouter(prefix="/unit", tags=["users"])
@@ -32,27 +34,60 @@ router = APIRouter(prefix="/unit", tags=["users"])
 
 @router.get("/users/list/{area_id}", dependencies=[Depends(require_superuser_or_owner)], response_model=UsersPublic)
 async def fetchAll(
-    area_id: uuid.UUID, session: SessionDep, current_user: CurrentUserDep, skip: int = 0, limit: int = 10
+    area_id: uuid.UUID,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
 ):
     """Get all users from area id
     List of all user for the area
     """
     verify_area_access(area_id, current_user)
-    data = await POS_Manager(session).get_area_users_list(area_id, skip, limit)
-    data_list = list(map(UserPublic.model_validate, data))
-    return UsersPublic(data=data_list, count=len(data_list))
+    try:
+        page = await POS_Manager(session).get_area_users_list(area_id, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data_list = list(map(UserPublic.model_validate, page.items))
+    return UsersPublic(data=data_list, count=page.total, next_cursor=page.next_cursor)
+
+
+@router.get(
+    "/roles/list/{area_id}", dependencies=[Depends(require_superuser_or_owner)], response_model=CursorPage[RoleRead]
+)
+async def fetchAllRoles(
+    area_id: uuid.UUID,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+):
+    """Roles of the area, sorted by name"""
+    verify_area_access(area_id, current_user)
+    try:
+        page = await POS_Manager(session).get_area_role_list(area_id, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(data=page.items, next_cursor=page.next_cursor, total=page.total)
 
 
 @router.get("/users/list/admin", response_model=UsersPublic)
-async def fetchAllByAdmin(session: SessionDep, current_user: CurrentUserDep, skip: int = 0, limit: int = 10):
+async def fetchAllByAdmin(
+    session: SessionDep, current_user: CurrentUserDep, skip: int = 0, limit: int = 10, cursor: str | None = None
+):
     """Get all users
     "List of all user for the area
     """
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Access Denied.")
-    data = await POS_Manager(session).get_all_user(skip, limit)
-    data_list = list(map(UserPublic.model_validate, data))
-    return UsersPublic(data=data_list, count=len(data_list))
+    try:
+        page = await POS_Manager(session).get_all_user(skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    data_list = list(map(UserPublic.model_validate, page.items))
+    return UsersPublic(data=data_list, count=page.total, next_cursor=page.next_cursor)
 
 
 @router.get("/user/{area_id}/{user_id}", dependencies=[Depends(require_superuser_or_owner)], response_model=UserPublic)
@@ -198,23 +233,29 @@ async def ownersList(
     order: Literal["asc", "desc"] = Query("asc"),
     skip: int = 0,
     limit: int = 10,
+    cursor: str | None = None,
 ):
     """Get all owners
     List of all owner
     """
     if not current_user.is_superuser:
         raise HTTPException(status_code=403, detail="Access Denied.")
+    manager = POS_Manager(session)
     try:
-        data = await POS_Manager(session).getAllOwners(sort_by, order, skip, limit)
-
-        data_list = list(map(UserRead.model_validate, data))
-        total_active = sum(owner.is_active for owner in data_list)
-        total_pos = 0
-        for owner in data_list:
-            # owner_count_pos = await POS_Manager(session).count_pos(owner.id)
-            if owner.owned_areas:
-                total_pos += len(owner.owned_areas)
-        return OwnersRead(data=data_list, total=len(data_list), total_active=total_active, total_pos=total_pos)
+        page = await manager.getAllOwners(sort_by, order, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        data_list = list(map(UserRead.model_validate, page.items))
+        # totals of all the owners, not only of this page
+        total, total_active, total_pos = await manager.owners_totals()
+        return OwnersRead(
+            data=data_list,
+            total=total,
+            total_active=total_active,
+            total_pos=total_pos,
+            next_cursor=page.next_cursor,
+        )
     except Exception as e:
         # raise HTTPException(status_code=500, detail=str(e))
         raise Exception(e)
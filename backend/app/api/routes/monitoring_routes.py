@@ -0,0 +1,48 @@
+import secrets
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import PlainTextResponse
+
+from app.api.dependencies import require_superuser
+from app.core.cache import user_cache
+from app.core.config import settings
+from app.core.database import pool_status
+from app.core.metrics import collect_snapshots, render_prometheus, write_worker_snapshot
+from app.dto.crud.catalog_cache import catalog_cache
+from app.dto.crud.reference_cache import denomination_cache
+from app.dto.schemas.utils import CacheStats, PoolStatus
+
+router = APIRouter(prefix="/monitoring", tags=["Monitoring"])
+
+
+@router.get("/pool", dependencies=[Depends(require_superuser)], response_model=PoolStatus)
+async def pool():
+    """State of the database connection pool of the worker serving the request
+    (each uvicorn worker has its own pool)
+    """
+    return pool_status()
+
+
+@router.get("/cache", dependencies=[Depends(require_superuser)], response_model=list[CacheStats])
+async def cache():
+    """Size and hit/miss counters of the in-process caches of the worker serving the request"""
+    return [user_cache.stats(), denomination_cache.stats(), catalog_cache.stats()]
+
+
+def _allow_scraper(request: Request) -> None:
+    if settings.METRICS_TOKEN:
+        authorization = request.headers.get("authorization", "")
+        if not secrets.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    elif request.client is None or request.client.host not in ("127.0.0.1", "::1", "localhost"):
+        raise HTTPException(status_code=403, detail="Metrics are only served to the host itself")
+
+
+@router.get("/metrics", dependencies=[Depends(_allow_scraper)], response_class=PlainTextResponse)
+async def metrics():
+    """Metrics of all the workers in the Prometheus text format"""
+    # the worker serving the scrape gives its current values, the others their last flush
+    write_worker_snapshot(settings.METRICS_DIR)
+    return PlainTextResponse(
+        render_prometheus(collect_snapshots(settings.METRICS_DIR)), media_type="text/plain; version=0.0.4"
+    )
@@ -10,7 +10,10 @@ router = APIRouter(prefix="/product", tags=["categories"])
 # Categories
 @router.post("/category/", response_model=product_schema.ProductCategoryRead)
 async def create(category_new: product_schema.ProductCategoryCreate, db: SessionDep, user: CurrentUserDep):
-    return await ProductManager(db).create_category(category_new)
+    try:
+        return await ProductManager(db).create_category(category_new)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/category/{category_id}", response_model=product_schema.ProductCategoryRead)
@@ -1,9 +1,12 @@
 import uuid
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query, UploadFile
 from app.api.dependencies import CurrentSuperUser, SessionDep, CurrentUserDep, verify_area_access
+from app.core.idempotency import idempotent
 from app.dto.crud.operation_crud import ProductManager
+from app.dto.crud.product_import import ProductImportManager
 from app.dto.models.models import PriceType
 from app.dto.schemas.operation import product_schema
+from app.dto.schemas.utils import CursorPage
 
 router = APIRouter(prefix="/product", tags=["product"])
 
@@ -12,10 +15,31 @@ router = APIRouter(prefix="/product", tags=["product"])
 @router.post("/", response_model=product_schema.ProductRead)
 async def create(product_new: product_schema.ProductCreate, db: SessionDep, user: CurrentUserDep):
     verify_area_access(product_new.area_id, user)
-    product = await ProductManager(db).create_product(product_new)
+    employee_id = user.employee.id if user.employee else None
+    try:
+        product = await ProductManager(db).create_product(product_new, user.id, employee_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return product
 
 
+@router.post("/import/{area_id}", response_model=product_schema.ProductImportRead)
+@idempotent
+async def import_products(area_id: uuid.UUID, file: UploadFile, db: SessionDep, user: CurrentUserDep):
+    """Create the products of an area from a CSV or XLSX file whose header has the columns of ProductCreate
+    (reference, name, description, category_name, price, purchase_price, init_stock, actual_stock)
+    """
+    verify_area_access(area_id, user)
+    if user.employee is None:
+        raise HTTPException(status_code=403, detail="Only an employee can import products")
+    format = (file.filename or "").rsplit(".", 1)[-1].lower()
+    try:
+        report = await ProductImportManager(db).import_products(file.file, format, area_id, user.id, user.employee.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return report
+
+
 @router.get("/{product_id}", response_model=product_schema.ProductRead)
 async def read(product_id: uuid.UUID, db: SessionDep, user: CurrentUserDep):
     try:
@@ -26,6 +50,17 @@ async def read(product_id: uuid.UUID, db: SessionDep, user: CurrentUserDep):
     return product
 
 
+@router.get("/scan/{area_id}/{reference}", response_model=product_schema.ProductScanRead)
+async def scan(area_id: uuid.UUID, reference: str, db: SessionDep, user: CurrentUserDep):
+    """Product of the area with this reference (barcode) scanned at the till"""
+    verify_area_access(area_id, user)
+    try:
+        product = await ProductManager(db).get_product_by_reference(area_id, reference)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return product
+
+
 @router.put("/{product_id}", response_model=product_schema.ProductRead)
 async def update(
     product_id: uuid.UUID, product_updated: product_schema.ProductUpdate, db: SessionDep, user: CurrentUserDep
@@ -43,11 +78,41 @@ async def update(
     return product
 
 
-@router.get("/list/{area_id}", response_model=list[product_schema.ProductRead])
-async def fetch_all(area_id: uuid.UUID, db: SessionDep, user: CurrentUserDep, skip: int = 0, limit: int = 10):
+@router.get("/list/{area_id}", response_model=CursorPage[product_schema.ProductRead])
+async def fetch_all(
+    area_id: uuid.UUID,
+    db: SessionDep,
+    user: CurrentUserDep,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+):
     """Obtain list of product of an area"""
     verify_area_access(area_id, user)
-    return await ProductManager(db).get_area_products(area_id, skip, limit)
+    try:
+        page = await ProductManager(db).get_area_products(area_id, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(data=page.items, next_cursor=page.next_cursor, total=page.total)
+
+
+@router.get("/search/{area_id}", response_model=CursorPage[product_schema.ProductRead])
+async def search(
+    area_id: uuid.UUID,
+    db: SessionDep,
+    user: CurrentUserDep,
+    q: str = Query(min_length=2, max_length=100),
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
+):
+    """Search of products of an area by name, reference, description or category, best matches first"""
+    verify_area_access(area_id, user)
+    try:
+        page = await ProductManager(db).search_products(area_id, q, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(data=page.items, next_cursor=page.next_cursor, total=page.total)
 
 
 @router.delete("/{product_id}", status_code=204)
@@ -59,12 +124,21 @@ async def delete(area_id: uuid.UUID, product_id: uuid.UUID, db: SessionDep, user
         raise HTTPException(status_code=404, detail=str(e))
 
 
-@router.get("/superuser/list/{area_id}", response_model=list[product_schema.ProductRead])
+@router.get("/superuser/list/{area_id}", response_model=CursorPage[product_schema.ProductRead])
 async def fetch_all_for_superuser(
-    area_id: uuid.UUID, db: SessionDep, user: CurrentSuperUser, skip: int = 0, limit: int = 10
+    area_id: uuid.UUID,
+    db: SessionDep,
+    user: CurrentSuperUser,
+    skip: int = 0,
+    limit: int = 10,
+    cursor: str | None = None,
 ):
     """Superuser can obtain list of product for one point of sale"""
-    return await ProductManager(db).get_area_products(area_id, skip, limit)
+    try:
+        page = await ProductManager(db).get_area_products(area_id, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(data=page.items, next_cursor=page.next_cursor, total=page.total)
 
 
 @router.get("/dashbord/", response_model=list[product_schema.ProductDashbordRead])
@@ -82,7 +156,7 @@ async def dashboard(area_id: uuid.UUID, db: SessionDep, user: CurrentUserDep, sk
     return
 
 
-@router.get("/price-history/{product_id}", response_model=list[product_schema.PriceHistoryRead])
+@router.get("/price-history/{product_id}", response_model=CursorPage[product_schema.PriceHistoryRead])
 async def price_history(
     area_id: uuid.UUID,
     product_id: uuid.UUID,
@@ -91,6 +165,11 @@ async def price_history(
     user: CurrentUserDep,
     skip: int = 0,
     limit: int = 10,
+    cursor: str | None = None,
 ):
     verify_area_access(area_id, user)
-    return await ProductManager(db).get_product_history_price(product_id, type, skip, limit)
+    try:
+        page = await ProductManager(db).get_product_history_price(product_id, type, skip, limit, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return CursorPage(data=page.items, next_cursor=page.next_cursor, total=page.total)
@@ -1,23 +1,33 @@
 import uuid
-from fastapi import APIRouter, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from typing import List, Literal
 from datetime import datetime
 
 from app.api.dependencies import (
     SessionDep,
     CurrentUserDep,
+    require_superuser_or_owner,
     verify_area_access,
 )
 from app.dto.schemas.operation.stock_schema import (
+    StockLevelRead,
+    StockMovementBatchCreate,
+    StockMovementBatchRead,
     StockMovementCreate,
     StockMovementRead,
+    StockSnapshotRead,
 )
-from app.dto.crud.operation_crud import StockManager
+from app.dto.crud.operation_crud import StockLedgerManager, StockManager
+from app.api.utils import EXPORT_MEDIA_TYPES, export_rows
+from app.core.database import AsyncSessionLocal
+from app.core.idempotency import idempotent
 
 router = APIRouter(prefix="/stock", tags=["movement"])
 
 
 @router.post("/", response_model=StockMovementRead, status_code=status.HTTP_201_CREATED)
+@idempotent
 async def create(data: StockMovementCreate, session: SessionDep, user: CurrentUserDep):
     verify_area_access(data.area_id, user)
     manager = StockManager(session)
@@ -28,12 +38,57 @@ async def create(data: StockMovementCreate, session: SessionDep, user: CurrentUs
         raise HTTPException(status_code=400, detail=str(e))
 
 
+@router.post("/batch", response_model=StockMovementBatchRead, status_code=status.HTTP_201_CREATED)
+@idempotent
+async def create_batch(data: StockMovementBatchCreate, session: SessionDep, user: CurrentUserDep):
+    for area_id in {movement.area_id for movement in data.movements}:
+        verify_area_access(area_id, user)
+    manager = StockManager(session)
+    try:
+        ids = await manager.create_movements(data)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return StockMovementBatchRead(created=len(ids), ids=ids)
+
+
+@router.get("/export")
+async def export(
+    area_id: uuid.UUID,
+    date_begin: datetime,
+    date_end: datetime,
+    current_user: CurrentUserDep,
+    product_id: uuid.UUID | None = None,
+    format: Literal["csv", "ndjson"] = "csv",
+):
+    """History of the movements of the area (or of one product) between two dates, streamed as csv or ndjson"""
+    verify_area_access(area_id, current_user)
+    columns = [column.key for column in StockManager.EXPORT_COLUMNS]
+
+    async def content():
+        # the session of the request is closed before the body is sent : the export uses its own session
+        async with AsyncSessionLocal() as session:
+            header = True
+            async for rows in StockManager(session).stream_movements(area_id, date_begin, date_end, product_id):
+                yield export_rows(rows, columns, format, header)
+                header = False
+            if header and format == "csv":
+                yield export_rows([], columns, format, header)
+
+    filename = f"stock_movements_{area_id}_{date_begin:%Y%m%d}_{date_end:%Y%m%d}.{format}"
+    return StreamingResponse(
+        content(),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
 @router.get("/{movement_id}", response_model=StockMovementRead)
 async def read(movement_id: uuid.UUID, session: SessionDep, user: CurrentUserDep):
     manager = StockManager(session)
-    movement = await manager.get_stock_movement(movement_id)
-    if not movement:
-        raise HTTPException(status_code=404, detail="Stock movement not found")
+    try:
+        movement = await manager.get_stock_movement(movement_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     verify_area_access(movement.area_id, user)
     return movement
 
@@ -41,7 +96,10 @@ async def read(movement_id: uuid.UUID, session: SessionDep, user: CurrentUserDep
 @router.delete("/{movement_id}", status_code=204)
 async def cancel(movement_id: uuid.UUID, session: SessionDep, user: CurrentUserDep):
     manager = StockManager(session)
-    movement_db = await manager.get_stock_movement(movement_id)
+    try:
+        movement_db = await manager.get_stock_movement(movement_id)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     verify_area_access(movement_db.area_id, user)
     try:
         await manager.cancel_movement_stock(movement_id)
@@ -65,3 +123,32 @@ async def product_track(
     manager = StockManager(session)
     result = await manager.product_stock_track(product_id, area_id, date_begin, date_end, skip, limit)
     return result
+
+
+@router.get("/product/{product_id}/level", response_model=StockLevelRead)
+async def product_level(
+    product_id: uuid.UUID,
+    area_id: uuid.UUID,
+    session: SessionDep,
+    current_user: CurrentUserDep,
+    dateof: datetime | None = None,
+    lot_id: uuid.UUID | None = None,
+):
+    """Stock of the product (of one lot or of all lots) now, or at the date given"""
+    verify_area_access(area_id, current_user)
+    ledger = StockLedgerManager(session)
+    if dateof is None:
+        quantity = await ledger.current_stock(area_id, product_id, lot_id)
+    else:
+        quantity = await ledger.stock_at(area_id, product_id, dateof, lot_id)
+    return StockLevelRead(area_id=area_id, product_id=product_id, lot_id=lot_id, dateof=dateof, quantity=quantity)
+
+
+@router.post(
+    "/snapshot/{area_id}", dependencies=[Depends(require_superuser_or_owner)], response_model=StockSnapshotRead
+)
+async def snapshot(area_id: uuid.UUID, snapshot_at: datetime, session: SessionDep, current_user: CurrentUserDep):
+    """Save the stock of all products of the area at the date"""
+    verify_area_access(area_id, current_user)
+    saved = await StockLedgerManager(session).take_snapshot(area_id, snapshot_at)
+    return StockSnapshotRead(area_id=area_id, snapshot_at=snapshot_at, saved=saved)
@@ -2,7 +2,7 @@ from fastapi import APIRouter
 from pydantic import BaseModel
 
 from app.api.dependencies import SessionDep
-from app.core.security import get_password_hash
+from app.core.security import get_password_hash_async
 from app.dto.models.models import User
 from app.dto.schemas.management.unit_schema import UserPublic
 
@@ -22,7 +22,7 @@ async def create_user(user_in: PrivateUserCreate, session: SessionDep):
     user = User(
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=get_password_hash(user_in.password),
+        hashed_password=await get_password_hash_async(user_in.password),
     )
     session.add(user)
     await session.commit()
@@ -1,6 +1,24 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
+
+from app.api.dependencies import CurrentUserDep, SessionDep, verify_area_access
+from app.core.idempotency import idempotent
+from app.dto.crud.management_crud import SaleManager
+from app.dto.schemas.management.sale_schema import SaleCheckoutCreate, SaleCheckoutRead
 
 
 router = APIRouter(prefix="/sale", tags=["Sale management"])
 
 
+@router.post("/checkout", response_model=SaleCheckoutRead, status_code=201)
+@idempotent
+async def checkout(data: SaleCheckoutCreate, session: SessionDep, user: CurrentUserDep):
+    """Save a sale paid and delivered at the counter : sale, stock movements, payment
+    and cash transaction (cash payment), together or not at all
+    """
+    verify_area_access(data.area_id, user)
+    if user.employee is None:
+        raise HTTPException(status_code=403, detail="Only an employee can make a sale")
+    try:
+        return await SaleManager(session).checkout(data, user.id, user.employee.id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -1,6 +1,17 @@
-# Champs autorisés pour le tri
+import csv
+import datetime
+import enum
+import io
+import json
+import uuid
+from collections.abc import Sequence
+from decimal import Decimal
+from typing import Any
+
 from sqlalchemy.orm.attributes import InstrumentedAttribute
 
+# Champs autorisés pour le tri
+
 
 def getSortableFields() -> dict[str, InstrumentedAttribute[object]]:
     from app.dto.models.models import User
@@ -10,3 +21,31 @@ def getSortableFields() -> dict[str, InstrumentedAttribute[object]]:
         "last_name": User.last_name,
         "created_at": User.created_at,
     }
+
+
+EXPORT_MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def export_rows(rows: Sequence[Any], columns: Sequence[str], format: str, header: bool = False) -> str:
+    """Chunk of an export (csv or ndjson) made of the rows given"""
+    if format == "ndjson":
+        return "".join(
+            json.dumps({name: _export_value(value) for name, value in zip(columns, row, strict=True)}) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(columns)
+    writer.writerows([_export_value(value) for value in row] for row in rows)
+    return buffer.getvalue()
@@ -0,0 +1,91 @@
+# This script measures the latency and the number of statements of the sale checkout on the database
+# of the settings, e.g : python app/checkout_benchmark.py --area <area id> --user <user email> --iterations 200
+# The sales are made in a transaction rolled back at the end : nothing is saved.
+import argparse
+import asyncio
+import logging
+import statistics
+import sys
+import uuid
+from time import perf_counter
+
+from sqlalchemy import select
+
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def benchmark(area_id: uuid.UUID, email: str, iterations: int, lines: int):
+    from sqlalchemy.ext.asyncio import AsyncSession
+
+    from app.core.config import settings
+    from app.core.database import engine
+    from app.core.query_counter import count_statements
+    from app.dto.crud.management_crud import SaleManager
+    from app.dto.models.models import Customer, Product, User
+    from app.dto.schemas.management.sale_schema import SaleCheckoutCreate
+
+    async with engine.connect() as connection:
+        transaction = await connection.begin()
+        # each commit of the checkout only releases a savepoint of the transaction
+        session = AsyncSession(bind=connection, join_transaction_mode="create_savepoint", expire_on_commit=False)
+        user = (await session.execute(select(User).where(User.email == email))).scalar_one()
+        if user.employee_id is None:
+            raise ValueError("The user is not an employee")
+        customer_id = (await session.execute(select(Customer.id).where(Customer.area_id == area_id))).scalars().first()
+        statement = select(Product.id).where(Product.area_id == area_id).limit(lines)
+        product_ids = (await session.execute(statement)).scalars().all()
+        if customer_id is None or not product_ids:
+            raise ValueError("The area needs a customer and products")
+
+        durations = []
+        most_statements = 0
+        manager = SaleManager(session)
+        for _ in range(iterations):
+            data = SaleCheckoutCreate(
+                area_id=area_id,
+                customer_id=customer_id,
+                lines=[{"product_id": product_id, "quantity": 1} for product_id in product_ids],
+                payment={"method": "card"},
+            )
+            with count_statements(engine) as counter:
+                started_at = perf_counter()
+                await manager.checkout(data, user.id, user.employee_id)
+                durations.append(perf_counter() - started_at)
+            most_statements = max(most_statements, counter.count)
+        await session.close()
+        await transaction.rollback()
+
+    durations.sort()
+    logger.info(
+        "%s checkouts of %s products : mean %.1fms, p50 %.1fms, p95 %.1fms, max %.1fms (target %.1fms)",
+        iterations,
+        len(product_ids),
+        statistics.mean(durations) * 1000,
+        durations[len(durations) // 2] * 1000,
+        durations[int(len(durations) * 0.95)] * 1000,
+        durations[-1] * 1000,
+        settings.SALE_CHECKOUT_TARGET_SECONDS * 1000,
+    )
+    logger.info(
+        "at most %s statements per checkout (budget %s)",
+        most_statements,
+        SaleManager.checkout_statement_budget(len(product_ids)),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Latency of the sale checkout")
+    parser.add_argument("--area", required=True, type=uuid.UUID, help="id of the area where the sales are made")
+    parser.add_argument("--user", required=True, help="email of the user (employee) making the sales")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--lines", type=int, default=5, help="number of products of each sale")
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.area, args.user, args.iterations, args.lines))
+
+
+if __name__ == "__main__":
+    main()
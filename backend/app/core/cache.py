@@ -0,0 +1,54 @@
+from collections.abc import Hashable
+from typing import Any, Generic, TypeVar
+
+from cachetools import TTLCache
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+cache_hits = registry.counter("cache_hits_total", "Lookups served by an in-process cache")
+cache_misses = registry.counter("cache_misses_total", "Lookups not found in an in-process cache")
+
+V = TypeVar("V")
+
+
+class StatsTTLCache(Generic[V]):
+    """Bounded in-process cache with a time to live, counting hits and misses.
+    The cache is per worker : an invalidation only reaches the worker which made it,
+    the other workers see the change at the latest after the ttl.
+    """
+
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self._cache: TTLCache[Hashable, V] = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def get(self, key: Hashable) -> V | None:
+        value = self._cache.get(key)
+        if value is None:
+            cache_misses.inc(cache=self.name)
+        else:
+            cache_hits.inc(cache=self.name)
+        return value
+
+    def set(self, key: Hashable, value: V) -> None:
+        self._cache[key] = value
+
+    def invalidate(self, key: Hashable) -> None:
+        self._cache.pop(key, None)
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._cache),
+            "maxsize": self._cache.maxsize,
+            "ttl": self._cache.ttl,
+            "hits": cache_hits.value(cache=self.name),
+            "misses": cache_misses.value(cache=self.name),
+        }
+
+
+# authenticated users, keyed by the subject of the token (user id)
+user_cache: StatsTTLCache[Any] = StatsTTLCache("user", settings.USER_CACHE_MAX_SIZE, settings.USER_CACHE_TTL_SECONDS)
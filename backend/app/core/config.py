@@ -1,4 +1,6 @@
+import os
 import secrets
+import tempfile
 import warnings
 from typing import Annotated, Any, Literal
 
@@ -36,6 +38,23 @@ class Settings(BaseSettings):
     SECRET_KEY: str = secrets.token_urlsafe(32)
     # 60 minutes * 24 hours * 8 days = 8 days
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # cache of the authenticated users (per worker), a change is seen by the other workers after the ttl
+    USER_CACHE_TTL_SECONDS: int = 30
+    USER_CACHE_MAX_SIZE: int = 1024
+    # cache of the denominations (per worker), a change made by another worker is seen after the ttl
+    DENOMINATION_CACHE_TTL_SECONDS: int = 300
+    # cache of the product catalogs (per worker) : number of areas kept,
+    # "database" : the workers share the versions of the catalogs (table catalog_version),
+    # "local" : versions kept in memory, only for a single worker (development, tests)
+    CATALOG_CACHE_MAX_AREAS: int = 64
+    CATALOG_CACHE_BACKEND: Literal["database", "local"] = "database"
+    # import of products from a file : rows saved per transaction, errors returned in the report
+    PRODUCT_IMPORT_CHUNK_SIZE: int = 1000
+    PRODUCT_IMPORT_MAX_ERRORS: int = 1000
+    # work factor of bcrypt, the passwords hashed with another one are rehashed at login
+    PASSWORD_HASH_ROUNDS: int = 12
+    # threads of each worker dedicated to the hashing / verification of passwords
+    PASSWORD_HASH_WORKERS: int = 2
     FRONTEND_HOST: str = "http://localhost:5173"
     ENVIRONMENT: Literal["local", "staging", "production"] = "local"
 
@@ -66,6 +85,48 @@ class Settings(BaseSettings):
             path=self.POSTGRES_DB,
         )  # type: ignore[return-value]
 
+    # Connection pool of the async engine. The pool is per worker process :
+    # max connections opened to Postgres = workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # seconds to wait for a free connection before raising an error
+    DB_POOL_TIMEOUT: float = 30
+    # seconds after which a connection is recycled (-1 to disable)
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+
+    # "atomic" : the stock of a product is changed by one UPDATE (stock = stock + quantity)
+    # "locked" : the row of the product is locked (SELECT ... FOR UPDATE) and checked before the UPDATE
+    STOCK_UPDATE_MODE: Literal["atomic", "locked"] = "atomic"
+    # refuse a movement which would make the stock of a product negative
+    STOCK_ALLOW_NEGATIVE: bool = True
+
+    # areas whose registers are closed at the same time by the end of day job (one connection each)
+    REGISTER_CLOSING_CONCURRENCY: int = 4
+    # latency target of a sale checkout, the slower ones are logged
+    SALE_CHECKOUT_TARGET_SECONDS: float = 0.25
+
+    # responses of the write requests sent with an Idempotency-Key header are kept this time for the retries
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+    # a request still in progress after this time (worker stopped) can be executed again by a retry
+    IDEMPOTENCY_LOCK_SECONDS: int = 60
+
+    # development / CI : logs the requests sending too many SQL statements (N+1)
+    QUERY_MONITOR_ENABLED: bool = False
+    # budget of statements of a request (a route can set its own with query_budget)
+    QUERY_MONITOR_MAX_STATEMENTS: int = 20
+    # a statement sent more times than this in a request is reported
+    QUERY_MONITOR_MAX_DUPLICATES: int = 3
+    # a request over its budget fails (error 500) instead of being only logged
+    QUERY_MONITOR_RAISE: bool = False
+
+    # directory shared by the workers where each one writes its metrics, merged at each scrape
+    METRICS_DIR: str = os.path.join(tempfile.gettempdir(), "multipos-metrics")
+    METRICS_FLUSH_SECONDS: float = 5
+    # token expected by /monitoring/metrics (Authorization: Bearer <token>),
+    # without token only the requests from the host itself are accepted
+    METRICS_TOKEN: str | None = None
+
     SMTP_TLS: bool = True
     SMTP_SSL: bool = False
     SMTP_PORT: int = 587
@@ -1,15 +1,82 @@
+import os
+from time import perf_counter
+from typing import Any, AsyncGenerator
+
+from sqlalchemy import exc
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from typing import AsyncGenerator
 from app.core.config import settings
+from app.core.metrics import registry
+
+# Pool telemetry (per worker)
+pool_wait_seconds = registry.histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a connection of the pool",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+pool_overflow_total = registry.counter("db_pool_overflow_total", "Connections opened beyond the pool size")
+pool_timeout_total = registry.counter("db_pool_timeout_total", "Checkouts failed because no connection was free")
+
+
+class InstrumentedAsyncQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool which records the wait time of each checkout and the overflow connections opened"""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        start = perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            pool_timeout_total.inc()
+            raise
+        finally:
+            pool_wait_seconds.observe(perf_counter() - start)
+
+    def _inc_overflow(self) -> bool:
+        opened = super()._inc_overflow()
+        # _overflow is negative while the base pool is not full
+        if opened and self._overflow > 0:
+            pool_overflow_total.inc()
+        return opened
 
 
-engine = create_async_engine(str(settings.SQLALCHEMY_DATABASE_URI))
+engine = create_async_engine(
+    str(settings.SQLALCHEMY_DATABASE_URI),
+    poolclass=InstrumentedAsyncQueuePool,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+)
 
 AsyncSessionLocal = async_sessionmaker(expire_on_commit=False, bind=engine)
 Base = declarative_base()
 
 
+def _pool() -> InstrumentedAsyncQueuePool:
+    return engine.sync_engine.pool  # type: ignore[return-value]
+
+
+registry.gauge("db_pool_checked_out", "Connections currently checked out", lambda: _pool().checkedout())
+registry.gauge("db_pool_checked_in", "Idle connections in the pool", lambda: _pool().checkedin())
+registry.gauge("db_pool_overflow", "Overflow connections currently opened", lambda: max(_pool().overflow(), 0))
+
+
+def pool_status() -> dict[str, Any]:
+    """State of the connection pool of this worker"""
+    pool = _pool()
+    return {
+        "worker_pid": os.getpid(),
+        "pool_size": pool.size(),
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "metrics": registry.snapshot(prefix="db_pool_"),
+    }
+
+
 async def get_session() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
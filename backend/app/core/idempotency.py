@@ -0,0 +1,233 @@
+# Idempotency keys : a till retrying a write request (e.g on a flaky network) sends the same
+# Idempotency-Key header, the request is executed once and its response is replayed to the retries.
+# The routes accepting the header are decorated with @idempotent.
+# The responses are saved in the database : a retry received by another worker is replayed too.
+import hashlib
+import json
+import logging
+from collections.abc import Callable
+from datetime import datetime, timedelta, timezone
+from time import monotonic
+from typing import Any, TypeVar
+
+from jose import JWTError
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import security
+from app.dto.models.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+HEADER = b"idempotency-key"
+MAX_KEY_LENGTH = 255
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def idempotent(endpoint: F) -> F:
+    """Mark a route accepting the Idempotency-Key header, e.g
+
+    @router.post("/checkout")
+    @idempotent
+    async def checkout(...):
+    """
+    endpoint.__idempotent__ = True  # type: ignore[attr-defined]
+    return endpoint
+
+
+def _json_response(status_code: int, detail: str) -> tuple[int, bytes]:
+    return status_code, json.dumps({"detail": detail}).encode()
+
+
+def replay_body_of(body: bytes, receive: Receive) -> Receive:
+    # the body already read, given once again to the route, then the messages of the client (disconnect)
+    sent = False
+
+    async def replay() -> Message:
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replay
+
+
+class IdempotencyMiddleware:
+    """Replays the saved response of a request already executed with the same Idempotency-Key.
+    The key is claimed before the execution (one INSERT) : a retry arriving during the execution
+    gets a 409 instead of executing the request a second time.
+    The server errors (5xx) are not saved : the retry executes the request again.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        router: Router,
+        session_factory: async_sessionmaker[AsyncSession],
+        ttl: float,
+        lock_timeout: float,
+    ):
+        self.app = app
+        self.router = router
+        self.session_factory = session_factory
+        self.ttl = ttl
+        self.lock_timeout = lock_timeout
+        self._purged_at = 0.0
+
+    def _is_idempotent(self, scope: Scope) -> bool:
+        for route in self.router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                return getattr(getattr(route, "endpoint", None), "__idempotent__", False)
+        return False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        headers = dict(scope["headers"])
+        key = headers.get(HEADER)
+        if key is None or not self._is_idempotent(scope):
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await self._send(send, *_json_response(400, "Invalid Idempotency-Key"))
+            return
+
+        # the body is read here to compute the fingerprint, then given again to the route
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), body])
+        ).hexdigest()
+        client = self._client(headers.get(b"authorization", b""))
+        if client is None:
+            # not authenticated : rejected by the route, nothing to replay
+            await self.app(scope, replay_body_of(body, receive), send)
+            return
+        key_text = key.decode("latin-1")
+
+        if not await self._claim(client, key_text, fingerprint):
+            await self._replay(send, client, key_text, fingerprint)
+            return
+
+        status_code = 500
+        content_type: str | None = None
+        response_body = b""
+
+        async def capture(message: Message) -> None:
+            nonlocal status_code, content_type, response_body
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                content_type = dict(message.get("headers", [])).get(b"content-type", b"").decode() or None
+            elif message["type"] == "http.response.body":
+                response_body += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body_of(body, receive), capture)
+        finally:
+            await self._save(client, key_text, status_code, content_type, response_body)
+
+    @staticmethod
+    def _client(authorization: bytes) -> str | None:
+        """The keys are scoped by user (sub of the access token) : a retry sent with a refreshed token
+        is still replayed. None if the token is missing or invalid
+        """
+        scheme, _, token = authorization.decode("latin-1").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            subject = security.decode_access_token(token).get("sub")
+        except JWTError:
+            # expired or forged : the route answers (401 / 403), nothing is saved
+            return None
+        return str(subject) if subject else None
+
+    async def _claim(self, client: str, key: str, fingerprint: str) -> bool:
+        """Save the key as in progress, False if it is already used (not expired)"""
+        now = datetime.now(timezone.utc)
+        statement = pg_insert(IdempotencyKey).values(
+            scope=client, key=key, fingerprint=fingerprint, created_at=now, expires_at=now + timedelta(seconds=self.ttl)
+        )
+        # an expired key, or a key whose request never ended (worker stopped), is taken again
+        statement = statement.on_conflict_do_update(
+            index_elements=[IdempotencyKey.scope, IdempotencyKey.key],
+            set_={
+                "fingerprint": statement.excluded.fingerprint,
+                "status_code": None,
+                "content_type": None,
+                "response_body": None,
+                "created_at": statement.excluded.created_at,
+                "expires_at": statement.excluded.expires_at,
+            },
+            where=or_(
+                IdempotencyKey.expires_at < now,
+                IdempotencyKey.status_code.is_(None)
+                & (IdempotencyKey.created_at < now - timedelta(seconds=self.lock_timeout)),
+            ),
+        ).returning(IdempotencyKey.key)
+        async with self.session_factory() as session:
+            if monotonic() - self._purged_at > self.lock_timeout:
+                self._purged_at = monotonic()
+                await session.execute(delete(IdempotencyKey).where(IdempotencyKey.expires_at < now))
+            claimed = (await session.execute(statement)).scalar_one_or_none() is not None
+            await session.commit()
+        return claimed
+
+    async def _replay(self, send: Send, client: str, key: str, fingerprint: str) -> None:
+        async with self.session_factory() as session:
+            statement = select(IdempotencyKey).where(IdempotencyKey.scope == client, IdempotencyKey.key == key)
+            saved = (await session.execute(statement)).scalar_one_or_none()
+        if saved is None:
+            # expired and deleted in between : the client can retry
+            await self._send(send, *_json_response(409, "Request with this Idempotency-Key in progress"))
+        elif saved.fingerprint != fingerprint:
+            await self._send(send, *_json_response(422, "Idempotency-Key already used by another request"))
+        elif saved.status_code is None:
+            await self._send(send, *_json_response(409, "Request with this Idempotency-Key in progress"))
+        else:
+            await self._send(send, saved.status_code, saved.response_body or b"", saved.content_type, replayed=True)
+
+    async def _save(
+        self, client: str, key: str, status_code: int, content_type: str | None, response_body: bytes
+    ) -> None:
+        where = (IdempotencyKey.scope == client, IdempotencyKey.key == key)
+        try:
+            async with self.session_factory() as session:
+                if status_code >= 500:
+                    await session.execute(delete(IdempotencyKey).where(*where))
+                else:
+                    await session.execute(
+                        update(IdempotencyKey)
+                        .where(*where)
+                        .values(status_code=status_code, content_type=content_type, response_body=response_body)
+                    )
+                await session.commit()
+        except Exception as e:
+            # the key is released after the lock timeout
+            logger.error("response of idempotency key not saved: %s", e)
+
+    @staticmethod
+    async def _send(
+        send: Send, status_code: int, body: bytes, content_type: str | None = "application/json", replayed=False
+    ) -> None:
+        headers = [(b"content-length", str(len(body)).encode())]
+        if content_type:
+            headers.append((b"content-type", content_type.encode()))
+        if replayed:
+            headers.append((b"idempotent-replayed", b"true"))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
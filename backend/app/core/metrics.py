@@ -0,0 +1,271 @@
+import json
+import os
+import threading
+from bisect import bisect_left
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any
+
+# Metrics are kept in memory, per worker process.
+# Each metric is identified by its name and can be split by labels (e.g. route="product-read").
+# To expose the metrics of all the workers, each worker writes its snapshot in a shared directory
+# (write_worker_snapshot) and the worker serving the scrape merges them (collect_snapshots).
+
+LabelKey = tuple[tuple[str, str], ...]
+
+
+def _label_key(labels: dict[str, Any]) -> LabelKey:
+    return tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+
+class Metric:
+    type_name = "untyped"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        # worker threads (e.g. password hashing pool) update metrics too
+        self._lock = threading.Lock()
+
+    def samples(self) -> list[dict[str, Any]]:
+        raise NotImplementedError
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"type": self.type_name, "help": self.documentation, "samples": self.samples()}
+
+
+class Counter(Metric):
+    """Value which can only go up (number of requests, of timeouts...)"""
+
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._values: dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        if amount < 0:
+            raise ValueError("Counter can only be incremented")
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[dict[str, Any]]:
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Gauge(Metric):
+    """Value which can go up and down (connections checked out, requests in flight...)
+    If a function is given, the value is read from it at each snapshot
+    """
+
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, function: Callable[[], float] | None = None):
+        super().__init__(name, documentation)
+        self._values: dict[LabelKey, float] = {}
+        self._function = function
+
+    def set(self, value: float, **labels: Any) -> None:
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def value(self, **labels: Any) -> float:
+        if self._function is not None and not labels:
+            return self._function()
+        return self._values.get(_label_key(labels), 0)
+
+    def samples(self) -> list[dict[str, Any]]:
+        if self._function is not None:
+            return [{"labels": {}, "value": self._function()}]
+        with self._lock:
+            return [{"labels": dict(key), "value": value} for key, value in self._values.items()]
+
+
+class Histogram(Metric):
+    """Distribution of observed values (latencies, wait times...) in cumulative buckets"""
+
+    type_name = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, name: str, documentation: str, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation)
+        self.buckets = tuple(sorted(buckets))
+        # per label : count by bucket (last one is +Inf), sum of values
+        self._counts: dict[LabelKey, list[int]] = {}
+        self._sums: dict[LabelKey, float] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._counts.setdefault(key, [0] * (len(self.buckets) + 1))
+            counts[index] += 1
+            self._sums[key] = self._sums.get(key, 0) + value
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def count(self, **labels: Any) -> int:
+        return sum(self._counts.get(_label_key(labels), []))
+
+    def samples(self) -> list[dict[str, Any]]:
+        samples: list[dict[str, Any]] = []
+        with self._lock:
+            for key, counts in self._counts.items():
+                cumulated = 0
+                buckets: list[tuple[float | str, int]] = []
+                for bound, count in zip((*self.buckets, "+Inf"), counts, strict=True):
+                    cumulated += count
+                    buckets.append((bound, cumulated))
+                samples.append({"labels": dict(key), "buckets": buckets, "sum": self._sums[key], "count": cumulated})
+        return samples
+
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, name: str, factory: Callable[[], Metric]) -> Any:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._get_or_create(name, lambda: Counter(name, documentation))  # type: ignore[no-any-return]
+
+    def gauge(self, name: str, documentation: str, function: Callable[[], float] | None = None) -> Gauge:
+        return self._get_or_create(name, lambda: Gauge(name, documentation, function))  # type: ignore[no-any-return]
+
+    def histogram(
+        self, name: str, documentation: str, buckets: tuple[float, ...] = Histogram.DEFAULT_BUCKETS
+    ) -> Histogram:
+        return self._get_or_create(name, lambda: Histogram(name, documentation, buckets))  # type: ignore[no-any-return]
+
+    def snapshot(self, prefix: str = "") -> dict[str, dict[str, Any]]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.snapshot() for metric in metrics if metric.name.startswith(prefix)}
+
+
+registry = MetricsRegistry()
+
+
+def write_worker_snapshot(directory: str, registry: MetricsRegistry = registry) -> None:
+    """Write the snapshot of this worker in the directory shared by the workers"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{os.getpid()}.json")
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump(registry.snapshot(), file)
+    # atomic : a reader never sees a partial file
+    os.replace(temporary, path)
+
+
+def _is_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the process exists but belongs to another user
+        pass
+    return True
+
+
+def merge_snapshots(snapshots: list[tuple[dict[str, dict[str, Any]], bool]]) -> dict[str, dict[str, Any]]:
+    """Sum the snapshots of the workers, given with a flag telling if the worker is alive.
+    Counters and histograms of the stopped workers are kept (a counter must not go down),
+    gauges only come from the workers alive.
+    """
+    merged: dict[str, dict[str, Any]] = {}
+    for snapshot, alive in snapshots:
+        for name, metric in snapshot.items():
+            if metric["type"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {"type": metric["type"], "help": metric["help"], "samples": {}})
+            for sample in metric["samples"]:
+                key = _label_key(sample["labels"])
+                current = target["samples"].get(key)
+                if current is None:
+                    target["samples"][key] = json.loads(json.dumps(sample))
+                elif metric["type"] == "histogram":
+                    current["buckets"] = [
+                        [bound, count + other]
+                        for (bound, count), (_, other) in zip(current["buckets"], sample["buckets"], strict=True)
+                    ]
+                    current["sum"] += sample["sum"]
+                    current["count"] += sample["count"]
+                else:
+                    current["value"] += sample["value"]
+    for metric in merged.values():
+        metric["samples"] = list(metric["samples"].values())
+    return merged
+
+
+def collect_snapshots(directory: str) -> dict[str, dict[str, Any]]:
+    """Metrics of all the workers which wrote their snapshot in the directory"""
+    snapshots = []
+    for filename in os.listdir(directory) if os.path.isdir(directory) else []:
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as file:
+                snapshot = json.load(file)
+        except (OSError, ValueError):
+            continue
+        snapshots.append((snapshot, _is_alive(int(filename.removesuffix(".json")))))
+    return merge_snapshots(snapshots)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: dict[str, Any]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in sorted(labels.items())) + "}"
+
+
+def _format_bound(bound: float | str) -> str:
+    return bound if isinstance(bound, str) else repr(float(bound))
+
+
+def render_prometheus(snapshot: dict[str, dict[str, Any]]) -> str:
+    """Snapshot in the text format of Prometheus"""
+    lines: list[str] = []
+    for name, metric in sorted(snapshot.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        for sample in metric["samples"]:
+            labels = sample["labels"]
+            if metric["type"] == "histogram":
+                for bound, count in sample["buckets"]:
+                    lines.append(f"{name}_bucket{_format_labels({**labels, 'le': _format_bound(bound)})} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {sample['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {sample['count']}")
+            else:
+                lines.append(f"{name}{_format_labels(labels)} {sample['value']}")
+    return "\n".join(lines) + "\n"
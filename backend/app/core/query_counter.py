@@ -0,0 +1,43 @@
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+class StatementCounter:
+    """SQL statements sent to the database while the counter is active"""
+
+    def __init__(self) -> None:
+        self.statements: list[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        self.statements.append(statement)
+
+    def assert_at_most(self, budget: int) -> None:
+        if self.count > budget:
+            detail = "\n".join(f"  {index + 1}. {statement}" for index, statement in enumerate(self.statements))
+            raise AssertionError(f"{self.count} SQL statements sent, at most {budget} expected :\n{detail}")
+
+
+@contextmanager
+def count_statements(engine: AsyncEngine | None = None) -> Iterator[StatementCounter]:
+    """Count the statements sent by the engine (the engine of the app by default), e.g in a test :
+
+    with count_statements() as counter:
+        response = client.get("/api/v0.1/unit/owners/list")
+    counter.assert_at_most(3)
+    """
+    if engine is None:
+        from app.core.database import engine
+    counter = StatementCounter()
+    event.listen(engine.sync_engine, "before_cursor_execute", counter._before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", counter._before_cursor_execute)
@@ -0,0 +1,152 @@
+import logging
+import re
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Any
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+@dataclass
+class RequestQueries:
+    """Statements sent to the database during one request"""
+
+    max_statements: int = 20
+    count: int = 0
+    duration: float = 0.0
+    shapes: Counter[str] = field(default_factory=Counter)
+
+    def duplicates(self, minimum: int) -> list[tuple[str, int]]:
+        """Statements sent at least minimum times : the sign of a lazy load in a loop (N+1)"""
+        return [(shape, count) for shape, count in self.shapes.most_common() if count >= minimum]
+
+
+_current: ContextVar[RequestQueries | None] = ContextVar("request_queries", default=None)
+_raise_on_excess = False
+
+_whitespace = re.compile(r"\s+")
+# lists of parameters (IN, multi-rows VALUES) have the same shape whatever their length
+_parameters_list = re.compile(r"\((?:\s*%\(\w+\)s(?:::\w+)?\s*,?)+\)")
+_rows_list = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+
+
+def _shape(statement: str) -> str:
+    statement = _parameters_list.sub("(...)", _whitespace.sub(" ", statement))
+    return _rows_list.sub("(...)", statement).strip()
+
+
+def _before_cursor_execute(conn: Any, _cursor: Any, statement: str, *_args: Any) -> None:
+    queries = _current.get()
+    if queries is None:
+        return
+    queries.count += 1
+    queries.shapes[_shape(statement)] += 1
+    if _raise_on_excess and queries.count > queries.max_statements:
+        raise QueryBudgetExceeded(f"More than {queries.max_statements} SQL statements in the request")
+    conn.info.setdefault("query_monitor_start", []).append(perf_counter())
+
+
+def _after_cursor_execute(conn: Any, _cursor: Any, _statement: str, *_args: Any) -> None:
+    queries = _current.get()
+    starts = conn.info.get("query_monitor_start")
+    if queries is None or not starts:
+        return
+    queries.duration += perf_counter() - starts.pop()
+
+
+def install_listeners(engine: AsyncEngine) -> None:
+    """Listen the statements of the engine (once), they are recorded only inside request_queries()"""
+    if not event.contains(engine.sync_engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine.sync_engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine.sync_engine, "after_cursor_execute", _after_cursor_execute)
+
+
+@contextmanager
+def request_queries(max_statements: int | None = None) -> Iterator[RequestQueries]:
+    """Record of the statements of the current request : the one opened by an outer middleware, or a new one"""
+    queries = _current.get()
+    if queries is not None:
+        if max_statements is not None:
+            queries.max_statements = max_statements
+        yield queries
+        return
+    queries = RequestQueries() if max_statements is None else RequestQueries(max_statements=max_statements)
+    token = _current.set(queries)
+    try:
+        yield queries
+    finally:
+        _current.reset(token)
+
+
+def query_budget(max_statements: int):
+    """Dependency giving to a route its own budget of statements, e.g
+    @router.get("/list", dependencies=[Depends(query_budget(3))])
+    """
+
+    def set_budget() -> None:
+        queries = _current.get()
+        if queries is not None:
+            queries.max_statements = max_statements
+
+    return set_budget
+
+
+class QueryMonitorMiddleware:
+    """Counts the statements, the time spent in the database and the statements sent many times
+    by each request, and logs the requests over their budget.
+    With raise_on_excess, the statement over the budget fails (error 500) : to make the tests fail.
+    For development and CI only : enabled by QUERY_MONITOR_ENABLED.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        engine: AsyncEngine,
+        max_statements: int = 20,
+        max_duplicates: int = 3,
+        raise_on_excess: bool = False,
+    ):
+        global _raise_on_excess
+        self.app = app
+        self.max_statements = max_statements
+        self.max_duplicates = max_duplicates
+        _raise_on_excess = raise_on_excess
+        install_listeners(engine)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with request_queries(self.max_statements) as queries:
+            try:
+                await self.app(scope, receive, send)
+            finally:
+                self._report(scope, queries)
+
+    def _report(self, scope: Scope, queries: RequestQueries) -> None:
+        route = getattr(scope.get("route"), "path", scope["path"])
+        duplicates = queries.duplicates(self.max_duplicates + 1)
+        if queries.count <= queries.max_statements and not duplicates:
+            return
+        logger.warning(
+            "%s %s : %s SQL statements (budget %s) in %.1f ms",
+            scope["method"],
+            route,
+            queries.count,
+            queries.max_statements,
+            queries.duration * 1000,
+        )
+        for shape, count in duplicates:
+            logger.warning("  sent %s times : %s", count, shape[:300])
@@ -0,0 +1,71 @@
+import asyncio
+import logging
+from time import perf_counter
+
+from fastapi.routing import APIRoute
+from sqlalchemy.ext.asyncio import AsyncEngine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import registry, write_worker_snapshot
+from app.core.query_monitor import install_listeners, request_queries
+
+logger = logging.getLogger(__name__)
+
+request_seconds = registry.histogram("http_request_duration_seconds", "Time to serve a request, by route")
+requests_in_flight = registry.gauge("http_requests_in_flight", "Requests being served")
+request_db_statements = registry.histogram(
+    "http_request_db_statements",
+    "SQL statements sent to serve a request, by route",
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+request_db_seconds = registry.histogram("http_request_db_seconds", "Time spent in the database to serve a request")
+
+
+def _route_name(scope: Scope) -> str:
+    # name given by custom_generate_unique_id (tag-function), the path is not used : it contains the ids
+    route = scope.get("route")
+    if isinstance(route, APIRoute):
+        return route.unique_id
+    return getattr(route, "name", None) or "unmatched"
+
+
+class RequestMetricsMiddleware:
+    """Latency, requests in flight, number of SQL statements and database time of each request"""
+
+    def __init__(self, app: ASGIApp, engine: AsyncEngine):
+        self.app = app
+        install_listeners(engine)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = perf_counter()
+        requests_in_flight.inc()
+        try:
+            with request_queries() as queries:
+                await self.app(scope, receive, send_with_status)
+        finally:
+            requests_in_flight.dec()
+            route = _route_name(scope)
+            request_seconds.observe(perf_counter() - start, route=route, method=scope["method"], status=status)
+            request_db_statements.observe(queries.count, route=route)
+            request_db_seconds.observe(queries.duration, route=route)
+
+
+async def flush_worker_metrics(directory: str, interval: float) -> None:
+    """Write the metrics of this worker in the shared directory every interval seconds"""
+    while True:
+        try:
+            await asyncio.to_thread(write_worker_snapshot, directory)
+        except OSError as e:
+            logger.warning("metrics of the worker not written: %s", e)
+        await asyncio.sleep(interval)
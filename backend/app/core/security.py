@@ -1,12 +1,50 @@
+import asyncio
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
+from time import perf_counter
 from passlib.context import CryptContext
 from jose import jwt
-from typing import Any
+from typing import Any, TypeVar
 from app.core.config import settings
+from app.core.metrics import registry
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashes made with another work factor are flagged as deprecated and rehashed at next login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.PASSWORD_HASH_ROUNDS)
 ALGORITHM = "HS256"
 
+# bcrypt takes hundreds of milliseconds and releases the GIL :
+# it is run in a dedicated pool of threads to not block the event loop
+_hash_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+hash_queue_depth = registry.gauge("password_hash_queue_depth", "Password hashing jobs waiting for a thread")
+hash_in_progress = registry.gauge("password_hash_in_progress", "Password hashing jobs running")
+hash_wait_seconds = registry.histogram("password_hash_wait_seconds", "Time a password hashing job waited for a thread")
+hash_seconds = registry.histogram("password_hash_seconds", "Time spent to hash or verify a password")
+
+T = TypeVar("T")
+
+
+async def _run_in_hash_pool(operation: str, func: Callable[..., T], *args: Any) -> T:
+    submitted_at = perf_counter()
+    hash_queue_depth.inc()
+
+    def job() -> T:
+        hash_queue_depth.dec()
+        hash_wait_seconds.observe(perf_counter() - submitted_at)
+        hash_in_progress.inc()
+        try:
+            with hash_seconds.time(operation=operation):
+                return func(*args)
+        finally:
+            hash_in_progress.dec()
+
+    return await asyncio.get_running_loop().run_in_executor(_hash_executor, job)
+
+
+def shutdown_hash_pool() -> None:
+    _hash_executor.shutdown(wait=False, cancel_futures=True)
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -16,6 +54,19 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_hash_pool("verify", pwd_context.verify, plain_password, hashed_password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Verify the password, and return a new hash if the stored one uses an outdated work factor"""
+    return await _run_in_hash_pool("verify", pwd_context.verify_and_update, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_hash_pool("hash", pwd_context.hash, password)
+
+
 def create_access_token(data: str | Any, expires_delta: timedelta) -> str:
     expire = datetime.now(timezone.utc) + (expires_delta or timedelta(minutes=15))
     to_encode = {"exp": expire, "sub": str(data)}  # type: ignore
@@ -0,0 +1,241 @@
+# In-process cache of the product catalog of each area, for the lists and the reads of products.
+# A catalog is loaded at the first read of the area and kept with its version (table catalog_version).
+# Each change of a product or a category increments the version of the area in the transaction
+# of the change (ProductManager) : the version is read again with each page served,
+# a worker seeing a new version reloads the catalog, so all the workers follow the change at their next read.
+# The stock of the products changes at each sale and is not cached : it is read with the version.
+import bisect
+import logging
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from typing import Any
+
+from cachetools import LRUCache
+from sqlalchemy import ColumnElement, event, func, literal, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.cache import cache_hits, cache_misses
+from app.core.config import settings
+from app.dto.crud.pagination import Page, decode_cursor, encode_cursor
+from app.dto.models.models import CatalogVersion, Product
+
+logger = logging.getLogger(__name__)
+
+# columns of the products served from the cache
+STOCK_COLUMNS = ("actual_stock", "old_stock")
+CATALOG_COLUMNS = tuple(column for column in Product.__table__.columns if column.key not in STOCK_COLUMNS)
+SORT_KEYS = (Product.name, Product.id)
+# the pages are cut in Python (bisect on the name and the id) : the catalog is sorted by the code points
+# of the names (collation "C", same order as the comparison of the str), not by the collation of the database
+CATALOG_ORDER = (Product.name.collate("C"), Product.id)
+
+
+class DatabaseCatalogVersions:
+    """Versions of the catalogs in the table catalog_version : shared by all the workers"""
+
+    def current(self, area_id: uuid.UUID) -> ColumnElement[Any]:
+        return select(CatalogVersion.version).where(CatalogVersion.area_id == area_id).scalar_subquery()
+
+    async def bump(self, db: AsyncSession, area_id: uuid.UUID) -> None:
+        statement = pg_insert(CatalogVersion).values(area_id=area_id, version=1)
+        statement = statement.on_conflict_do_update(
+            index_elements=[CatalogVersion.area_id], set_={"version": CatalogVersion.version + 1}
+        )
+        await db.execute(statement)
+
+
+class LocalCatalogVersions:
+    """Stand-in of the table for a single worker (development, tests) : versions kept in memory,
+    incremented when the change is committed
+    """
+
+    def __init__(self) -> None:
+        self._versions: dict[uuid.UUID, int] = {}
+
+    def current(self, area_id: uuid.UUID) -> ColumnElement[Any]:
+        return literal(self._versions.get(area_id, 0))
+
+    async def bump(self, db: AsyncSession, area_id: uuid.UUID) -> None:
+        db.sync_session.info.setdefault("catalog_changed", set()).add(area_id)
+
+    def committed(self, area_ids: set[uuid.UUID]) -> None:
+        for area_id in area_ids:
+            self._versions[area_id] = self._versions.get(area_id, 0) + 1
+
+
+@dataclass(frozen=True)
+class AreaCatalog:
+    version: int | None
+    # values of the catalog columns of each product, sorted by name (code points) and id
+    products: tuple[dict[str, Any], ...]
+    keys: tuple[tuple[str, uuid.UUID], ...]
+    by_id: dict[uuid.UUID, dict[str, Any]]
+    # reference (barcode) -> product, unique in an area
+    by_reference: dict[str, dict[str, Any]]
+
+
+class CatalogCache:
+    name = "catalog"
+
+    def __init__(self, maxsize: int, versions: DatabaseCatalogVersions | LocalCatalogVersions):
+        self.versions = versions
+        self._areas: LRUCache[uuid.UUID, AreaCatalog] = LRUCache(maxsize=maxsize)
+
+    async def _load(self, db: AsyncSession, area_id: uuid.UUID) -> tuple[AreaCatalog, dict[uuid.UUID, Any]]:
+        """Catalog of the area and stock of its products.
+        The version is read first : a change committed in between is seen as a new version at the next read
+        """
+        cache_misses.inc(cache=self.name)
+        version = (await db.execute(select(self.versions.current(area_id)))).scalar_one_or_none()
+        statement = (
+            select(*CATALOG_COLUMNS, *(Product.__table__.c[key] for key in STOCK_COLUMNS))
+            .where(Product.area_id == area_id)
+            .order_by(*CATALOG_ORDER)
+        )
+        products = []
+        stocks = {}
+        for row in (await db.execute(statement)).mappings():
+            products.append({column.key: row[column.key] for column in CATALOG_COLUMNS})
+            stocks[row["id"]] = {key: row[key] for key in STOCK_COLUMNS}
+        catalog = AreaCatalog(
+            version=version or 0,
+            products=tuple(products),
+            keys=tuple((product["name"], product["id"]) for product in products),
+            by_id={product["id"]: product for product in products},
+            by_reference={product["reference"]: product for product in products},
+        )
+        self._areas[area_id] = catalog
+        return catalog, stocks
+
+    async def _stocks(
+        self, db: AsyncSession, area_id: uuid.UUID, catalog: AreaCatalog, product_ids: Sequence[uuid.UUID]
+    ) -> tuple[AreaCatalog, dict[uuid.UUID, Any]] | None:
+        """Stock of the products and version of the catalog in one query, None if the catalog is outdated"""
+        version = self.versions.current(area_id).label("catalog_version")
+        if product_ids:
+            statement = select(Product.id, *(Product.__table__.c[key] for key in STOCK_COLUMNS), version).where(
+                Product.id.in_(product_ids)
+            )
+            rows = (await db.execute(statement)).mappings().all()
+        else:
+            rows = (await db.execute(select(version))).mappings().all()
+        if not rows or (rows[0]["catalog_version"] or 0) != catalog.version:
+            return None
+        cache_hits.inc(cache=self.name)
+        return catalog, {row["id"]: {key: row[key] for key in STOCK_COLUMNS} for row in rows if "id" in row}
+
+    @staticmethod
+    def _product(values: dict[str, Any], stock: dict[str, Any] | None) -> Product:
+        # a new object (not attached to the session) for each read : the cached values are never modified
+        return Product(**values, **(stock or dict.fromkeys(STOCK_COLUMNS)))
+
+    @staticmethod
+    def _slice(catalog: AreaCatalog, limit: int, cursor: str | None, skip: int) -> tuple[int, int]:
+        if cursor is not None:
+            values, _ = decode_cursor(cursor, SORT_KEYS)
+            start = bisect.bisect_right(catalog.keys, tuple(values))
+        else:
+            start = skip
+        return start, min(start + limit, len(catalog.products))
+
+    async def area_page(
+        self, db: AsyncSession, area_id: uuid.UUID, limit: int, cursor: str | None = None, skip: int = 0
+    ) -> Page[Product]:
+        """Page of the products of the area sorted by name (code points, e.g "Banana" before "apple") and id"""
+        catalog = self._areas.get(area_id)
+        fresh = None
+        if catalog is not None:
+            start, end = self._slice(catalog, limit, cursor, skip)
+            fresh = await self._stocks(db, area_id, catalog, [product["id"] for product in catalog.products[start:end]])
+        if fresh is None:
+            fresh = await self._load(db, area_id)
+        catalog, stocks = fresh
+        start, end = self._slice(catalog, limit, cursor, skip)
+        total = len(catalog.products)
+        next_cursor = encode_cursor(catalog.keys[end - 1]) if end < total else None
+        items = [self._product(product, stocks.get(product["id"])) for product in catalog.products[start:end]]
+        return Page(items=items, next_cursor=next_cursor, total=total)
+
+    async def get_product(self, db: AsyncSession, product_id: uuid.UUID) -> Product | None:
+        for area_id, catalog in list(self._areas.items()):
+            if product_id in catalog.by_id:
+                fresh = await self._stocks(db, area_id, catalog, [product_id])
+                if fresh is None:
+                    fresh = await self._load(db, area_id)
+                catalog, stocks = fresh
+                product = catalog.by_id.get(product_id)
+                return self._product(product, stocks.get(product_id)) if product else None
+        # area not loaded (or product deleted) : the area of the product is loaded
+        area_id = (await db.execute(select(Product.area_id).where(Product.id == product_id))).scalar_one_or_none()
+        if area_id is None:
+            return None
+        catalog, stocks = await self._load(db, area_id)
+        product = catalog.by_id.get(product_id)
+        return self._product(product, stocks.get(product_id)) if product else None
+
+    async def scan(self, db: AsyncSession, area_id: uuid.UUID, reference: str) -> Product | None:
+        """Product of the area with this reference : found in the catalog, only its stock is read"""
+        catalog = self._areas.get(area_id)
+        fresh = None
+        if catalog is not None:
+            product = catalog.by_reference.get(reference)
+            fresh = await self._stocks(db, area_id, catalog, [product["id"]] if product else [])
+        if fresh is None:
+            fresh = await self._load(db, area_id)
+        catalog, stocks = fresh
+        product = catalog.by_reference.get(reference)
+        return self._product(product, stocks.get(product["id"])) if product else None
+
+    async def warm(self, db: AsyncSession) -> int:
+        """Load the catalogs of the areas with the most products (as many as the cache keeps)"""
+        statement = (
+            select(Product.area_id).group_by(Product.area_id).order_by(func.count().desc()).limit(self._areas.maxsize)
+        )
+        area_ids = (await db.execute(statement)).scalars().all()
+        for area_id in area_ids:
+            await self._load(db, area_id)
+        return len(area_ids)
+
+    async def invalidate(self, db: AsyncSession, area_id: uuid.UUID) -> None:
+        """To call in the transaction changing the catalog of the area, before the commit"""
+        await self.versions.bump(db, area_id)
+        self._areas.pop(area_id, None)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "name": self.name,
+            "size": len(self._areas),
+            "maxsize": self._areas.maxsize,
+            "ttl": 0,
+            "hits": cache_hits.value(cache=self.name),
+            "misses": cache_misses.value(cache=self.name),
+        }
+
+
+catalog_cache = CatalogCache(
+    settings.CATALOG_CACHE_MAX_AREAS,
+    DatabaseCatalogVersions() if settings.CATALOG_CACHE_BACKEND == "database" else LocalCatalogVersions(),
+)
+
+
+@event.listens_for(Session, "after_commit")
+def _catalog_committed(session: Session) -> None:
+    changed = session.info.pop("catalog_changed", None)
+    if changed and isinstance(catalog_cache.versions, LocalCatalogVersions):
+        catalog_cache.versions.committed(changed)
+        for area_id in changed:
+            catalog_cache._areas.pop(area_id, None)
+
+
+@event.listens_for(Session, "after_rollback")
+def _catalog_rolled_back(session: Session) -> None:
+    session.info.pop("catalog_changed", None)
+
+
+async def warm_catalog_cache(db: AsyncSession) -> None:
+    """Load the catalogs at startup : the first scans at the tills don't pay for it"""
+    count = await catalog_cache.warm(db)
+    logger.info("product catalogs of %s areas cached", count)
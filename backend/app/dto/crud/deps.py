@@ -1,7 +1,7 @@
 import uuid
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.core.security import get_password_hash, verify_password
+from app.core.security import get_password_hash_async, verify_password_async
 from app.dto.schemas.management.unit_schema import UserCreate, UserUpdate
 from app.dto.models.models import User
 
@@ -16,7 +16,7 @@ class UserManager:
             email=data.email,
             is_active=False,
             is_superuser=False,
-            hashed_password=get_password_hash(data.password),
+            hashed_password=await get_password_hash_async(data.password),
         )
         self.db.add(user)
         await self.db.commit()
@@ -36,7 +36,7 @@ class UserManager:
             setattr(user, var, value)
 
         if user_in.password is not None:
-            user.password = get_password_hash(user_in.password)
+            user.password = await get_password_hash_async(user_in.password)
         self.db.add(user)
         await self.db.commit()
         await self.db.refresh(user)
@@ -52,6 +52,6 @@ class UserManager:
         db_user = await self.get_user_by_email(email=email)
         if not db_user:
             return None
-        if not verify_password(password, db_user.password):
+        if not await verify_password_async(password, db_user.password):
             return None
         return db_user
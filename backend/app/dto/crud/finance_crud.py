@@ -1,9 +1,30 @@
-from datetime import datetime
+import asyncio
+from collections.abc import Sequence
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from time import perf_counter
+from typing import Any
 import uuid
-from sqlalchemy import func, select
-from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, cast, distinct, false, func, insert, literal, select, update
+from sqlalchemy.dialects.postgresql import UUID, insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from app.dto.models.models import CashTransaction, TransactionDirection, TransactionState
+from app.dto.crud.reference_cache import denomination_cache
+from app.dto.models.load_profiles import load_profile
+from app.dto.models.models import (
+    CashAccount,
+    CashAccountDenomination,
+    CashAccountState,
+    CashAdjustement,
+    CashAdjustementLine,
+    CashAdjustementType,
+    CashTransaction,
+    CashTransactionDetailsLine,
+    Denomination,
+    TransactionDirection,
+    TransactionPurpose,
+    TransactionState,
+)
 
 
 class FinanceManager:
@@ -14,65 +35,520 @@ class FinanceManager:
 
     """Management of cash register"""
 
+    # bounds of the day of the date : [00:00, 00:00 of the next day[ in the timezone of the date (UTC by default)
+    @staticmethod
+    def _day_bounds(dateof: datetime | date) -> tuple[datetime, datetime]:
+        tz = dateof.tzinfo if isinstance(dateof, datetime) and dateof.tzinfo else timezone.utc
+        day = dateof.date() if isinstance(dateof, datetime) else dateof
+        start = datetime.combine(day, time.min, tzinfo=tz)
+        return start, start + timedelta(days=1)
+
+    def _register_day_filter(self, cash_register_id: uuid.UUID, dateof: datetime | date):
+        start, end = self._day_bounds(dateof)
+        return (
+            CashTransaction.register_id == cash_register_id,
+            CashTransaction.dateOf >= start,
+            CashTransaction.dateOf < end,
+        )
+
     # Get all transactions for a specific cash register on a given date
-    # This function retrieves all transactions for a specific cash register on a given date.
-    # It filters the transactions based on the cash register ID and the transaction date.
-    # The date is expected to be in the format of datetime.
-    async def get_cash_register_transactions_by_date(self, cash_register_id: uuid.UUID, dateof: datetime):
+    async def get_cash_register_transactions_by_date(self, cash_register_id: uuid.UUID, dateof: datetime | date):
         """Get all transactions for a specific cash register on a given date"""
-        # Execute the query and return the results
-        # The result is a list of CashTransaction objects for the specified cash register and date.
-        # If no transactions are found, an empty list is returned.
-        statement = select(CashTransaction).filter(
-            CashTransaction.cash_register_id == cash_register_id, CashTransaction.dateOf == dateof
+        statement = (
+            select(CashTransaction)
+            .options(*load_profile(CashTransaction, "list"))
+            .filter(*self._register_day_filter(cash_register_id, dateof))
         )
         result = await self.db.execute(statement)
         return result.scalars().all()
 
+    async def get_cash_register(self, cash_register_id: uuid.UUID) -> CashAccount:
+        register = await self.db.get(CashAccount, cash_register_id)
+        if register is None:
+            raise ValueError("Cash register not found")
+        return register
+
+    # Totals of the completed transactions of the day, per denomination, in one query :
+    # transactions x detail lines grouped by denomination, the values of the denominations come from the cache,
+    # the in / out / net totals are the sums of the few rows returned (one per denomination)
+    async def register_daily_totals(self, cash_register_id: uuid.UUID, dateof: datetime | date) -> dict[str, Any]:
+        register = await self.get_cash_register(cash_register_id)
+        is_in = CashTransaction.direction == TransactionDirection.IN
+        is_out = CashTransaction.direction == TransactionDirection.OUT
+        statement = (
+            select(
+                CashTransactionDetailsLine.denomination_id,
+                func.coalesce(func.sum(CashTransactionDetailsLine.quantity).filter(is_in), 0).label("quantity_in"),
+                func.coalesce(func.sum(CashTransactionDetailsLine.quantity).filter(is_out), 0).label("quantity_out"),
+            )
+            .select_from(CashTransaction)
+            .join(CashTransactionDetailsLine, CashTransactionDetailsLine.transac_id == CashTransaction.id)
+            .where(
+                *self._register_day_filter(cash_register_id, dateof),
+                CashTransaction.status == TransactionState.COMPLETED,
+            )
+            .group_by(CashTransactionDetailsLine.denomination_id)
+        )
+        rows = (await self.db.execute(statement)).all()
+        known = (await denomination_cache.get(self.db)).by_id
+        if any(row.denomination_id not in known for row in rows):
+            # denomination created by another worker since the last load
+            denomination_cache.invalidate()
+            known = (await denomination_cache.get(self.db)).by_id
+        denominations = [
+            {
+                "denomination_id": row.denomination_id,
+                "name": known[row.denomination_id].name,
+                "value": known[row.denomination_id].value,
+                "currency": known[row.denomination_id].currency,
+                "quantity_in": row.quantity_in,
+                "quantity_out": row.quantity_out,
+                "amount_in": row.quantity_in * known[row.denomination_id].value,
+                "amount_out": row.quantity_out * known[row.denomination_id].value,
+            }
+            for row in rows
+        ]
+        denominations.sort(key=lambda line: (line["currency"], -line["value"]))
+        total_in = sum((line["amount_in"] for line in denominations), Decimal(0))
+        total_out = sum((line["amount_out"] for line in denominations), Decimal(0))
+        amount_init = Decimal(register.amount_init or 0)
+        return {
+            "register_id": cash_register_id,
+            "area_id": register.area_id,
+            "dateof": self._day_bounds(dateof)[0].date(),
+            "amount_init": amount_init,
+            "total_in": total_in,
+            "total_out": total_out,
+            "net": total_in - total_out,
+            "theoretical_amount": amount_init + total_in - total_out,
+            "denominations": denominations,
+        }
+
     # Get the theoretical amount of cash in the register for a given date
     # This is the sum of all valid transactions (in and out) for that date
-    async def calculate_theoretical_amount(self, cash_register_id: uuid.UUID, dateof: datetime):
+    async def calculate_theoretical_amount(self, cash_register_id: uuid.UUID, dateof: datetime | date):
         """Get the theoretical amount of cash in the register for a given date"""
-        total = 0
-        for trans in await self.get_cash_register_transactions_by_date(
-            cash_register_id=cash_register_id, dateof=dateof
-        ):
-            if trans.is_valide and trans.cash_in:  # type: ignore
-                total += trans.total_amount if trans.details else 0
-            elif trans.is_valide and not trans.cash_in:  # type: ignore
-                total -= trans.total_amount if trans.details else 0
-        return total
+        totals = await self.register_daily_totals(cash_register_id, dateof)
+        return totals["net"]
+
+    # Number and amount of the transactions of the register between two days (included)
+    # for each status x direction x purpose, in one query
+    async def register_statistics(
+        self, cash_register_id: uuid.UUID, date_begin: datetime | date, date_end: datetime | date
+    ) -> list[dict[str, Any]]:
+        start, end = self._day_bounds(date_begin)[0], self._day_bounds(date_end)[1]
+        # a transaction without detail line has an amount of 0
+        amount = func.coalesce(func.sum(CashTransactionDetailsLine.quantity * Denomination.value), 0)
+        statement = (
+            select(
+                CashTransaction.status,
+                CashTransaction.direction,
+                CashTransaction.operation,
+                func.count(distinct(CashTransaction.id)).label("count"),
+                amount.label("amount"),
+            )
+            .select_from(CashTransaction)
+            .outerjoin(CashTransactionDetailsLine, CashTransactionDetailsLine.transac_id == CashTransaction.id)
+            .outerjoin(Denomination, Denomination.id == CashTransactionDetailsLine.denomination_id)
+            .where(
+                CashTransaction.register_id == cash_register_id,
+                CashTransaction.dateOf >= start,
+                CashTransaction.dateOf < end,
+            )
+            .group_by(CashTransaction.status, CashTransaction.direction, CashTransaction.operation)
+        )
+        return [
+            {
+                "status": row.status.value,
+                "direction": row.direction.value,
+                "operation": row.operation.value,
+                "count": row.count,
+                "amount": row.amount,
+            }
+            for row in (await self.db.execute(statement)).all()
+        ]
 
     # This function counts the number of transactions for a specific cash register on a given date.
     # It filters the transactions based on the cash register ID, transaction validity, and transaction direction
     # This funtion return a objet contain the number of valid in, out and annuled transactions.
-    # The date is expected to be in the format of datetime.
-    async def count_transactions(self, cash_register_id: uuid.UUID, dateof: datetime):
-        total_in_stmt = select(func.count(CashTransaction.id)).filter(
-            CashTransaction.cash_register_id == cash_register_id,
-            CashTransaction.status == TransactionState.COMPLETED,
-            CashTransaction.direction == TransactionDirection.IN,
-            CashTransaction.dateOf == dateof,
-        )
-        total_out_stmt = select(func.count(CashTransaction.id)).filter(
-            CashTransaction.cash_register_id == cash_register_id,
-            CashTransaction.status == TransactionState.COMPLETED,
-            CashTransaction.direction == TransactionDirection.OUT,
-            CashTransaction.dateOf == dateof,
-        )
-        total_annuled_stmt = select(func.count(CashTransaction.id)).filter(
-            CashTransaction.cash_register_id == cash_register_id,
-            CashTransaction.status == TransactionState.CANCELED,
-            CashTransaction.dateOf == dateof,
-        )
-        total_in = (await self.db.execute(total_in_stmt)).scalar_one()
-        total_out = (await self.db.execute(total_out_stmt)).scalar_one()
-        total_annuled = (await self.db.execute(total_annuled_stmt)).scalar_one()
-        return {"in": total_in, "out": total_out, "canceled": total_annuled}
+    async def count_transactions(self, cash_register_id: uuid.UUID, dateof: datetime | date):
+        counts = {"in": 0, "out": 0, "canceled": 0}
+        for group in await self.register_statistics(cash_register_id, dateof, dateof):
+            if group["status"] == TransactionState.CANCELED.value:
+                counts["canceled"] += group["count"]
+            elif group["status"] == TransactionState.COMPLETED.value:
+                counts[group["direction"]] += group["count"]
+        return counts
+
+    # Cash expected in the register (running balance) and number of each denomination
+    async def register_balance(self, cash_register_id: uuid.UUID) -> dict[str, Any]:
+        register = await self.get_cash_register(cash_register_id)
+        return {
+            "register_id": cash_register_id,
+            "running_balance": register.running_balance,
+            "denominations": await self._register_denominations(cash_register_id),
+        }
+
+    async def _register_denominations(self, cash_register_id: uuid.UUID) -> dict[uuid.UUID, int]:
+        statement = select(CashAccountDenomination.denomination_id, CashAccountDenomination.quantity).where(
+            CashAccountDenomination.register_id == cash_register_id
+        )
+        return {row.denomination_id: row.quantity for row in (await self.db.execute(statement)).all()}
+
+    # Opening of a register with the notes / coins put in it : the register, its OPENING adjustement and its lines,
+    # and its expected denominations (first cash_account_denomination rows, as amount_init is its first balance)
+    async def open_register(
+        self, area_id: uuid.UUID, user_id: uuid.UUID, counted: dict[uuid.UUID, int]
+    ) -> dict[str, Any]:
+        denominations = (await denomination_cache.get(self.db)).by_id
+        if set(counted) - set(denominations):
+            # denomination created by another worker since the last load
+            denomination_cache.invalidate()
+            denominations = (await denomination_cache.get(self.db)).by_id
+        if set(counted) - set(denominations):
+            raise ValueError("Denomination not found")
+        counted = {id: quantity for id, quantity in counted.items() if quantity}
+        amount = sum((denominations[id].value * quantity for id, quantity in counted.items()), Decimal(0))
+
+        register_id = uuid.uuid4()
+        adjustement_id = uuid.uuid4()
+        await self.db.execute(
+            insert(CashAccount).values(
+                id=register_id,
+                amount_init=amount,
+                running_balance=amount,
+                state=CashAccountState.OPEN,
+                user_id=user_id,
+                area_id=area_id,
+            )
+        )
+        await self.db.execute(
+            insert(CashAdjustement).values(
+                id=adjustement_id,
+                register_id=register_id,
+                performed_by_id=user_id,
+                typeOf=CashAdjustementType.OPENING,
+                counted_amount=amount,
+                dateof=datetime.now(timezone.utc),
+            )
+        )
+        if counted:
+            await self.db.execute(
+                insert(CashAdjustementLine),
+                [
+                    {"id": uuid.uuid4(), "adjustement_id": adjustement_id, "denomination_id": id, "quantity": quantity}
+                    for id, quantity in counted.items()
+                ],
+            )
+            # the register is new : one row per denomination, nothing to merge
+            await self.db.execute(
+                insert(CashAccountDenomination),
+                [
+                    {"register_id": register_id, "denomination_id": id, "quantity": quantity}
+                    for id, quantity in counted.items()
+                ],
+            )
+        await self.db.commit()
+        return {
+            "register_id": register_id,
+            "area_id": area_id,
+            "state": CashAccountState.OPEN.value,
+            "amount_init": amount,
+            "denominations": [{"denomination_id": id, "quantity": quantity} for id, quantity in counted.items()],
+        }
+
+    # Balancing : the cash counted is compared with the running balance of the register,
+    # the transactions of the register are not read again.
+    # The count closes the register (no more cash sale) : the end of day closing (close_area_registers)
+    # sets it BALANCED or NOT_BALANCED. It can be counted again until then
+    async def balance_register(
+        self, cash_register_id: uuid.UUID, performed_by_id: uuid.UUID, counted: dict[uuid.UUID, int]
+    ) -> dict[str, Any]:
+        # locked : no transaction of the register can be completed or canceled during the balancing
+        statement = select(CashAccount).where(CashAccount.id == cash_register_id).with_for_update()
+        register = (await self.db.execute(statement)).scalar_one_or_none()
+        if register is None:
+            raise ValueError("Cash register not found")
+        if register.state not in (CashAccountState.OPEN, CashAccountState.CLOSED):
+            raise ValueError("The register is already balanced")
+        expected = await self._register_denominations(cash_register_id)
+        denomination_ids = set(counted) | set(expected)
+        denominations = (await denomination_cache.get(self.db)).by_id
+        if denomination_ids - set(denominations):
+            # denomination created by another worker since the last load
+            denomination_cache.invalidate()
+            denominations = (await denomination_cache.get(self.db)).by_id
+        if set(counted) - set(denominations):
+            raise ValueError("Denomination not found")
+
+        counted_amount = sum((denominations[id].value * quantity for id, quantity in counted.items()), Decimal(0))
+        expected_amount = Decimal(register.running_balance)
+        self.db.add(
+            CashAdjustement(
+                register_id=cash_register_id,
+                performed_by_id=performed_by_id,
+                typeOf=CashAdjustementType.BALANCING,
+                expected_amount=expected_amount,
+                counted_amount=counted_amount,
+                difference=counted_amount - expected_amount,
+                details=[
+                    CashAdjustementLine(denomination_id=id, quantity=quantity) for id, quantity in counted.items()
+                ],
+            )
+        )
+        register.balancing_amount = counted_amount
+        register.state = CashAccountState.CLOSED
+        await self.db.commit()
+        return {
+            "register_id": cash_register_id,
+            "state": register.state.value,
+            "expected_amount": expected_amount,
+            "counted_amount": counted_amount,
+            "difference": counted_amount - expected_amount,
+            "denominations": [
+                {
+                    "denomination_id": id,
+                    "name": denominations[id].name,
+                    "value": denominations[id].value,
+                    "expected_quantity": expected.get(id, 0),
+                    "counted_quantity": counted.get(id, 0),
+                }
+                for id in sorted(denomination_ids, key=lambda id: denominations[id].value, reverse=True)
+                if id in denominations
+            ],
+        }
+
+    # End of day closing of the registers of an area, in two statements whatever the number of registers :
+    # the state of each register is set by one UPDATE comparing the amount counted by the employee
+    # (balancing_amount, saved by balance_register) with the running balance, then the BALANCING adjustements
+    # recording the expected and counted amounts are inserted together
+    async def close_area_registers(self, area_id: uuid.UUID, performed_by_id: uuid.UUID) -> dict[str, Any]:
+        counted = CashAccount.state == CashAccountState.CLOSED
+        # a register still open was not counted : its balancing_amount (if any) is not the one of the day,
+        # it is closed NOT_BALANCED and the difference is checked by a manager
+        balanced = func.coalesce(counted & (CashAccount.balancing_amount == CashAccount.running_balance), false())
+        statement = (
+            update(CashAccount)
+            .where(
+                CashAccount.area_id == area_id,
+                CashAccount.state.in_([CashAccountState.OPEN, CashAccountState.CLOSED]),
+            )
+            # literals typed with the enum of the column : sent as the names of the members, like the ORM,
+            # and cast : without it the branches of the CASE would be text, not the enum type of the column
+            .values(
+                state=case(
+                    (
+                        balanced,
+                        cast(literal(CashAccountState.BALANCED, CashAccount.state.type), CashAccount.state.type),
+                    ),
+                    else_=cast(literal(CashAccountState.NOT_BALANCED, CashAccount.state.type), CashAccount.state.type),
+                ),
+                balancing_amount=case((counted, CashAccount.balancing_amount), else_=None),
+            )
+            .returning(CashAccount.id, CashAccount.state, CashAccount.running_balance, CashAccount.balancing_amount)
+        )
+        closed = (await self.db.execute(statement)).all()
+        if closed:
+            now = datetime.now(timezone.utc)
+            await self.db.execute(
+                insert(CashAdjustement),
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "register_id": register.id,
+                        "performed_by_id": performed_by_id,
+                        "typeOf": CashAdjustementType.BALANCING,
+                        "dateof": now,
+                        "expected_amount": register.running_balance,
+                        "counted_amount": register.balancing_amount,
+                        "difference": (
+                            register.balancing_amount - register.running_balance
+                            if register.balancing_amount is not None
+                            else None
+                        ),
+                    }
+                    for register in closed
+                ],
+            )
+        await self.db.commit()
+        return {
+            "area_id": area_id,
+            "closed": len(closed),
+            "balanced": sum(1 for register in closed if register.state == CashAccountState.BALANCED),
+            "not_balanced": sum(1 for register in closed if register.state == CashAccountState.NOT_BALANCED),
+            "expected_amount": sum((register.running_balance for register in closed), Decimal(0)),
+            "counted_amount": sum((register.balancing_amount or Decimal(0) for register in closed), Decimal(0)),
+        }
+
+    # Closing of the registers of all the areas having open or counted registers (or of the areas given),
+    # each area in its own session and transaction, at most `concurrency` areas at the same time
+    # (each one holds a connection of the pool)
+    @classmethod
+    async def close_registers(
+        cls,
+        session_factory: async_sessionmaker[AsyncSession],
+        performed_by_id: uuid.UUID,
+        area_ids: Sequence[uuid.UUID] | None = None,
+        concurrency: int = 4,
+    ) -> dict[str, Any]:
+        started_at = perf_counter()
+        if area_ids is None:
+            async with session_factory() as session:
+                statement = select(distinct(CashAccount.area_id)).where(
+                    CashAccount.state.in_([CashAccountState.OPEN, CashAccountState.CLOSED])
+                )
+                area_ids = (await session.execute(statement)).scalars().all()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def close_area(area_id: uuid.UUID) -> dict[str, Any]:
+            async with semaphore:
+                area_started_at = perf_counter()
+                async with session_factory() as session:
+                    try:
+                        report = await cls(session).close_area_registers(area_id, performed_by_id)
+                    except Exception as e:
+                        # the other areas are closed anyway
+                        await session.rollback()
+                        report = {"area_id": area_id, "error": str(e)}
+                report["duration"] = perf_counter() - area_started_at
+                return report
+
+        areas = await asyncio.gather(*(close_area(area_id) for area_id in area_ids))
+        duration = perf_counter() - started_at
+        closed = sum(area.get("closed", 0) for area in areas)
+        return {
+            "areas": areas,
+            "closed": closed,
+            "failed": sum(1 for area in areas if "error" in area),
+            "duration": duration,
+            # registers closed per second
+            "throughput": closed / duration if duration else 0.0,
+        }
 
     """End of Management of cash register"""
 
     """Management of cash transaction"""
     # def create_cash_transaction(session : Session, )
 
+    async def get_cash_transaction(self, transaction_id: uuid.UUID) -> CashTransaction:
+        statement = (
+            select(CashTransaction)
+            .options(*load_profile(CashTransaction, "list"))
+            .where(CashTransaction.id == transaction_id)
+        )
+        transaction = (await self.db.execute(statement)).scalar_one_or_none()
+        if transaction is None:
+            raise ValueError("Cash transaction not found")
+        return transaction
+
+    # The row of the transaction stays locked until the commit : a transaction is applied to the balance only once
+    async def _lock_transaction(self, transaction_id: uuid.UUID):
+        statement = (
+            select(
+                CashTransaction.status,
+                CashTransaction.direction,
+                CashTransaction.operation,
+                CashTransaction.register_id,
+            )
+            .where(CashTransaction.id == transaction_id)
+            .with_for_update()
+        )
+        transaction = (await self.db.execute(statement)).one_or_none()
+        if transaction is None:
+            raise ValueError("Cash transaction not found")
+        return transaction
+
+    async def _set_transaction_status(
+        self, transaction_id: uuid.UUID, status: TransactionState, user_id: uuid.UUID, reason: str | None = None
+    ) -> None:
+        values: dict[str, Any] = {
+            "status": status,
+            "updated_at": datetime.now(timezone.utc),
+            "updated_by_id": user_id,
+            # dateOf is updated automatically at each update : the transaction keeps its date
+            "dateOf": CashTransaction.dateOf,
+        }
+        if reason is not None:
+            values["updated_reason"] = reason
+        await self.db.execute(update(CashTransaction).where(CashTransaction.id == transaction_id).values(**values))
+
+    # Adds (sign 1) or removes (sign -1) the lines of the transaction to the balance and the denominations
+    # of the register. The amounts are computed by the database, the lines are not loaded
+    async def apply_transaction(self, transaction_id: uuid.UUID, register_id: uuid.UUID, sign: int) -> Decimal:
+        lines = (
+            select(
+                literal(register_id, UUID(as_uuid=True)),
+                CashTransactionDetailsLine.denomination_id,
+                func.sum(CashTransactionDetailsLine.quantity) * sign,
+            )
+            .where(CashTransactionDetailsLine.transac_id == transaction_id)
+            .group_by(CashTransactionDetailsLine.denomination_id)
+        )
+        statement = pg_insert(CashAccountDenomination).from_select(
+            ["register_id", "denomination_id", "quantity"], lines
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[CashAccountDenomination.register_id, CashAccountDenomination.denomination_id],
+            set_={"quantity": CashAccountDenomination.quantity + statement.excluded.quantity},
+        )
+        await self.db.execute(statement)
+
+        amount = (
+            select(func.coalesce(func.sum(CashTransactionDetailsLine.quantity * Denomination.value), 0))
+            .join(Denomination, Denomination.id == CashTransactionDetailsLine.denomination_id)
+            .where(CashTransactionDetailsLine.transac_id == transaction_id)
+            .scalar_subquery()
+        )
+        statement = (
+            update(CashAccount)
+            .where(CashAccount.id == register_id)
+            .values(running_balance=CashAccount.running_balance + amount * sign)
+            .returning(CashAccount.running_balance)
+        )
+        return (await self.db.execute(statement)).scalar_one()
+
+    async def complete_transaction(self, transaction_id: uuid.UUID, user_id: uuid.UUID) -> dict[str, Any]:
+        """Complete a pending transaction, its amount is added to (in) or removed from (out) the register"""
+        transaction = await self._lock_transaction(transaction_id)
+        if transaction.status != TransactionState.PENDING:
+            raise ValueError("Only a pending transaction can be completed.")
+        await self._set_transaction_status(transaction_id, TransactionState.COMPLETED, user_id)
+        sign = 1 if transaction.direction == TransactionDirection.IN else -1
+        running_balance = await self.apply_transaction(transaction_id, transaction.register_id, sign)
+        await self.db.commit()
+        return {
+            "transaction_id": transaction_id,
+            "register_id": transaction.register_id,
+            "status": TransactionState.COMPLETED.value,
+            "running_balance": running_balance,
+        }
+
+    async def cancel_transaction(
+        self, transaction_id: uuid.UUID, user_id: uuid.UUID, reason: str | None = None
+    ) -> dict[str, Any]:
+        """Cancel a pending or completed transaction (does not delete it),
+        a completed one is removed from the balance of the register
+        """
+        transaction = await self._lock_transaction(transaction_id)
+        if transaction.status == TransactionState.CANCELED:
+            raise ValueError("This transaction is already canceled.")
+        if transaction.status not in (TransactionState.PENDING, TransactionState.COMPLETED):
+            raise ValueError("Only a pending or completed transaction can be canceled.")
+        if transaction.operation == TransactionPurpose.SALE_PAYMENT:
+            raise ValueError("Sale payments cannot be canceled directly.")
+        await self._set_transaction_status(transaction_id, TransactionState.CANCELED, user_id, reason)
+        if transaction.status == TransactionState.COMPLETED:
+            sign = -1 if transaction.direction == TransactionDirection.IN else 1
+            running_balance = await self.apply_transaction(transaction_id, transaction.register_id, sign)
+        else:
+            statement = select(CashAccount.running_balance).where(CashAccount.id == transaction.register_id)
+            running_balance = (await self.db.execute(statement)).scalar_one()
+        await self.db.commit()
+        return {
+            "transaction_id": transaction_id,
+            "register_id": transaction.register_id,
+            "status": TransactionState.CANCELED.value,
+            "running_balance": running_balance,
+        }
+
     """End of management of cash transaction"""
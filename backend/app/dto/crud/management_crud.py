@@ -1,10 +1,39 @@
-from typing import Literal
+from datetime import datetime, timezone
+from decimal import Decimal
+import logging
+from time import perf_counter
+from typing import Any, Literal
 import uuid
 from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import asc, desc, insert, select, func
-from sqlalchemy.orm import selectinload, aliased
-from app.dto.models.models import Area, Employee, Role, User, area_owners
+from sqlalchemy import insert, select, func
+from sqlalchemy.orm import aliased
+from app.dto.models.models import (
+    Area,
+    CashAccount,
+    CashAccountState,
+    CashTransaction,
+    CashTransactionDetailsLine,
+    Employee,
+    MovementDirection,
+    MovementOperation,
+    Payment,
+    PaymentMethod,
+    Product,
+    Role,
+    Sale,
+    SaleDetailLine,
+    SaleStatus,
+    StockMovement,
+    TransactionDirection,
+    TransactionPurpose,
+    TransactionState,
+    TransactionType,
+    User,
+    area_owners,
+)
+from app.dto.models.load_profiles import load_profile
 from app.dto.schemas.management.unit_schema import (
     AreaCreate,
     AreaUpdate,
@@ -17,8 +46,19 @@ from app.dto.schemas.management.unit_schema import (
     UserRead,
     UserUpdate,
 )
+from app.dto.schemas.finance.cash_schema import CashCountLine
+from app.dto.schemas.management.sale_schema import SaleCheckoutCreate, SalePaymentCreate
 from app.api.utils import getSortableFields
-from app.core.security import get_password_hash, verify_password
+from app.dto.crud.finance_crud import FinanceManager
+from app.dto.crud.operation_crud import StockManager
+from app.dto.crud.pagination import Page, paginate
+from app.dto.crud.reference_cache import denomination_cache
+from app.core.cache import user_cache
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import get_password_hash_async, verify_and_update_password, verify_password_async
+
+logger = logging.getLogger(__name__)
 
 
 class POS_Manager:
@@ -38,6 +78,7 @@ class POS_Manager:
         # mise à jour de la jointure
         stmt = insert(area_owners).values(user_id=area.owner_id, area_id=db_area.id)
         await self.db.execute(stmt)
+        user_cache.invalidate(str(area.owner_id))
         return db_area
 
     async def get_Area(self, area_id: uuid.UUID):
@@ -59,6 +100,8 @@ class POS_Manager:
         if db_area:
             await self.db.delete(db_area)
             await self.db.commit()
+            # owners and employees of the area lose their access
+            user_cache.clear()
         return None
 
     # obtain list of area managed by a user
@@ -123,12 +166,15 @@ class POS_Manager:
         if db_employee:
             await self.db.delete(db_employee)
             await self.db.commit()
+            user_cache.clear()
         return None
 
-    async def get_area_employees_list(self, area_id: uuid.UUID, skip: int, limit: int):
-        stmt = select(Employee).where(Employee.area_id == area_id).order_by(Employee.name).offset(skip).limit(limit)
-        resultat = await self.db.execute(stmt)
-        return resultat.scalars().all()
+    async def get_area_employees_list(
+        self, area_id: uuid.UUID, skip: int = 0, limit: int = 10, cursor: str | None = None
+    ) -> Page[Employee]:
+        stmt = select(Employee).where(Employee.area_id == area_id)
+        keys = [func.coalesce(Employee.last_name, ""), Employee.first_name, Employee.id]
+        return await paginate(self.db, stmt, keys, limit, cursor, skip)
 
     async def create_Role(self, new_role: RoleCreate):
         db_role = Role(**new_role.model_dump())
@@ -158,10 +204,11 @@ class POS_Manager:
             await self.db.commit()
         return None
 
-    async def get_area_role_list(self, area_id: uuid.UUID, skip: int, limit: int):
-        stmt = select(Role).where(Role.area_id == area_id).order_by(Role.name).offset(skip).limit(limit)
-        resultat = await self.db.execute(stmt)
-        return resultat.scalars().all()
+    async def get_area_role_list(
+        self, area_id: uuid.UUID, skip: int = 0, limit: int = 10, cursor: str | None = None
+    ) -> Page[Role]:
+        stmt = select(Role).where(Role.area_id == area_id)
+        return await paginate(self.db, stmt, [func.coalesce(Role.name, ""), Role.id], limit, cursor, skip)
 
     async def createUser(self, new_user: UserCreate) -> User:
         # Récupération du mot de passe
@@ -173,18 +220,24 @@ class POS_Manager:
         if isinstance(db_user, User) and new_user.id != db_user.id:
             raise HTTPException(status_code=409, detail="User with this email already exists")
         # transformation du mot de passe
-        new_user.password = get_password_hash(password)
+        new_user.password = await get_password_hash_async(password)
         self.db.add(new_user)
         await self.db.commit()
         await self.db.refresh(new_user)
         return new_user
 
     async def getUser(self, user_id: uuid.UUID):
-        result = await self.db.execute(select(User).where(User.id == user_id))
+        result = await self.db.execute(select(User).options(*load_profile(User, "detail")).where(User.id == user_id))
         if not result:
             raise ValueError("User not found")
         return result.unique().scalar_one_or_none()
 
+    # load the user with all relationships needed by the authenticated user
+    async def get_auth_user(self, user_id: uuid.UUID):
+        statement = select(User).options(*load_profile(User, "detail")).where(User.id == user_id)
+        result = await self.db.execute(statement)
+        return result.unique().scalar_one_or_none()
+
     async def updateUser(self, user_id: uuid.UUID, user_updated: UserUpdate):
         db_user = await self.getUser(user_id)
         if db_user:
@@ -192,18 +245,19 @@ class POS_Manager:
             for var, value in user_data.items():
                 setattr(db_user, var, value)
             if "password" in user_data:
-                db_user.password = get_password_hash(user_data["password"])
+                db_user.password = await get_password_hash_async(user_data["password"])
             self.db.add(db_user)
             await self.db.commit()
             await self.db.refresh(db_user)
+            user_cache.invalidate(str(user_id))
         return db_user
 
     async def update_password_me(self, user: User, pwd: UpdatedPassword):
-        if not verify_password(pwd.current_password, user.password):
+        if not await verify_password_async(pwd.current_password, user.password):
             raise ValueError("Incorrect password")
         if pwd.current_password == pwd.new_password:
             raise ValueError("New password cannot be the same as the current one")
-        user.password = get_password_hash(pwd.new_password)
+        user.password = await get_password_hash_async(pwd.new_password)
         self.db.add(user)
         await self.db.commit()
         return user
@@ -216,6 +270,7 @@ class POS_Manager:
             user.email = user_updated.email
         await self.db.commit()
         await self.db.refresh(user)
+        user_cache.invalidate(str(user_updated.id))
         return user
 
     async def deleteUser(self, user_id: uuid.UUID):
@@ -223,20 +278,27 @@ class POS_Manager:
         if db_user:
             await self.db.delete(db_user)
             await self.db.commit()
+            user_cache.invalidate(str(user_id))
         return None
 
-    async def get_area_users_list(self, area_id: uuid.UUID, skip: int, limit: int):
-        stmt = select(User).where(User.area_id == area_id).offset(skip).limit(limit)
-        resultat = await self.db.execute(stmt)
-        return resultat.scalars().all()
+    # users of an area are the users linked to an employee of the area
+    async def get_area_users_list(
+        self, area_id: uuid.UUID, skip: int = 0, limit: int = 10, cursor: str | None = None
+    ) -> Page[User]:
+        stmt = (
+            select(User)
+            .options(*load_profile(User, "list"))
+            .join(Employee, User.employee_id == Employee.id)
+            .where(Employee.area_id == area_id)
+        )
+        keys = [func.coalesce(User.last_name, ""), User.id]
+        return await paginate(self.db, stmt, keys, limit, cursor, skip, with_total=True)
 
     async def get_user_by_email(self, email: str):
         statement = select(User).where(User.email == email)
         session_user = await self.db.execute(statement)
-        # puisqu'il y a des jointures déclaré en lazy-joigned, il faut ajouter la fonction unique()
-        # avant d'appeler scalar. La cause est que la même instance d'objet est invoqué deux fois
-        # une fois via la classe user, et la deuxième fois via la classe Role en jointure
-        return session_user.unique().scalar_one_or_none()
+        # aucune relation n'est chargée : la connexion et les réponses UserPublic n'en ont pas besoin
+        return session_user.scalar_one_or_none()
 
     async def authenticate(self, email: str, password: str) -> User | None:
         db_user = await self.get_user_by_email(email=email)
@@ -244,14 +306,19 @@ class POS_Manager:
         if not isinstance(db_user, User):
             return None
         # if password doesn't match
-        if not verify_password(password, db_user.password):
+        is_valid, new_hash = await verify_and_update_password(password, db_user.password)
+        if not is_valid:
             return None
+        # the work factor changed since the password was hashed
+        if new_hash is not None:
+            db_user.password = new_hash
+            await self.db.commit()
         return db_user
 
-    async def get_all_user(self, skip: int, limit: int):
-        statement = select(User).offset(skip).limit(limit)
-        resultat = await self.db.execute(statement)
-        return resultat.scalars().all()
+    async def get_all_user(self, skip: int = 0, limit: int = 10, cursor: str | None = None) -> Page[User]:
+        keys = [User.created_at, User.id]
+        statement = select(User).options(*load_profile(User, "list"))
+        return await paginate(self.db, statement, keys, limit, cursor, skip, with_total=True)
 
     # owner management
     async def getAllOwners(
@@ -260,36 +327,224 @@ class POS_Manager:
         order: Literal["asc", "desc"] = "asc",
         skip: int = 0,
         limit: int = 10,
-    ):
+        cursor: str | None = None,
+    ) -> Page[User]:
 
         sort_column = getSortableFields()[sort_by]
 
         if not sort_column:
             raise ValueError("Invalid sort field")
 
-        order_func = asc if order == "asc" else desc
-
-        statement = (
-            select(User)
-            .options(  # to avoid multiple queries for relationships
-                selectinload(User.owned_areas),
-                selectinload(User.employee),
-                selectinload(User.roles),
-            )
-            .where(User.is_owner)
-            .order_by(order_func(sort_column))
-            .offset(skip)
-            .limit(limit)
+        # the owners are read with their areas, employee and roles
+        statement = select(User).options(*load_profile(User, "detail")).where(User.is_owner)
+        # the id makes the order unique when the sort column has duplicates
+        keys = [func.coalesce(sort_column, "") if sort_by == "last_name" else sort_column]
+        if sort_by != "id":
+            keys.append(User.id)
+        return await paginate(self.db, statement, keys, limit, cursor, skip, descending=order == "desc")
+
+    # totals of all the owners in one query : owners, active owners, points of sale owned
+    async def owners_totals(self) -> tuple[int, int, int]:
+        owner = aliased(User)
+        total_pos = (
+            select(func.count())
+            .select_from(area_owners)
+            .join(owner, area_owners.c.user_id == owner.id)
+            .where(owner.is_owner)
+            .scalar_subquery()
         )
-        session_user = await self.db.execute(statement)
-        return session_user.unique().scalars().all()
+        statement = select(func.count(), func.count().filter(User.is_active), total_pos).where(User.is_owner)
+        total, total_active, total_pos_count = (await self.db.execute(statement)).one()
+        return total, total_active, total_pos_count
+
+
+checkout_seconds = registry.histogram("sale_checkout_seconds", "Time spent to save a sale at checkout")
 
 
 # class SaleManager
 class SaleManager:
+    # statements of a checkout paid in cash, besides the update of the stock of each product
+    CHECKOUT_STATEMENTS = 12
+
     def __init__(self, db: AsyncSession):
         self.db = db
 
+    @classmethod
+    def checkout_statement_budget(cls, product_count: int) -> int:
+        """Statements sent by a checkout of product_count different products (at most)"""
+        per_product = 2 if settings.STOCK_UPDATE_MODE == "locked" else 1
+        return cls.CHECKOUT_STATEMENTS + per_product * product_count
+
+    async def _check_cash_payment(self, data: SaleCheckoutCreate, amount: Decimal) -> None:
+        payment = data.payment
+        if payment.register_id is None:
+            raise ValueError("A cash payment needs a register")
+        statement = select(CashAccount.area_id, CashAccount.state).where(CashAccount.id == payment.register_id)
+        register = (await self.db.execute(statement)).one_or_none()
+        if register is None:
+            raise ValueError("Cash register not found")
+        if register.area_id != data.area_id:
+            raise ValueError("The register is not in the area of the sale")
+        if register.state != CashAccountState.OPEN:
+            raise ValueError("The register is not open")
+        denominations = (await denomination_cache.get(self.db)).by_id
+        if any(line.denomination_id not in denominations for line in payment.cash_lines + payment.change_lines):
+            raise ValueError("Denomination not found")
+
+        def total(lines: list[CashCountLine]) -> Decimal:
+            return sum((denominations[line.denomination_id].value * line.quantity for line in lines), Decimal(0))
+
+        given, change = total(payment.cash_lines), total(payment.change_lines)
+        if given - change != amount:
+            raise ValueError(
+                f"The cash given ({given}) less the change ({change}) is not the amount of the sale ({amount})"
+            )
+
+    @staticmethod
+    def _cash_details(transaction_id: uuid.UUID, payment: SalePaymentCreate) -> list[dict[str, Any]]:
+        """Lines of the cash transaction : the notes / coins given are added to the register,
+        the change given back is removed from it (negative quantity)
+        """
+        return [
+            {
+                "id": uuid.uuid4(),
+                "transac_id": transaction_id,
+                "denomination_id": line.denomination_id,
+                "quantity": sign * line.quantity,
+            }
+            for lines, sign in ((payment.cash_lines, 1), (payment.change_lines, -1))
+            for line in lines
+            if line.quantity
+        ]
+
+    async def checkout(self, data: SaleCheckoutCreate, user_id: uuid.UUID, employee_id: uuid.UUID) -> dict[str, Any]:
+        """Save a sale paid and delivered at the counter in one transaction : the sale and its lines,
+        the stock movements, the cash transaction (cash payment) and the payment.
+        Each table is written by one INSERT, the stock by one UPDATE per product,
+        see checkout_statement_budget.
+        """
+        started_at = perf_counter()
+        now = datetime.now(timezone.utc)
+        try:
+            method = PaymentMethod(data.payment.method)
+        except ValueError:
+            raise ValueError(f"Unknown payment method '{data.payment.method}'")
+
+        product_ids = {line.product_id for line in data.lines}
+        statement = select(Product.id, Product.sale_price).where(
+            Product.id.in_(product_ids), Product.area_id == data.area_id
+        )
+        prices = {row.id: row.sale_price for row in (await self.db.execute(statement)).all()}
+        if product_ids - set(prices):
+            raise ValueError("Product not found in the area")
+
+        sale_id = uuid.uuid4()
+        reference = data.reference or f"S{now:%Y%m%d%H%M%S}-{sale_id.hex[:8].upper()}"
+        lines = [
+            {
+                "id": uuid.uuid4(),
+                "sale_id": sale_id,
+                "product_id": line.product_id,
+                "quantity": line.quantity,
+                "unitaryPrice": (
+                    Decimal(str(line.unit_price)) if line.unit_price is not None else prices[line.product_id]
+                ),
+            }
+            for line in data.lines
+        ]
+        amount = sum((line["unitaryPrice"] * line["quantity"] for line in lines), Decimal(0))
+        if method == PaymentMethod.CASH:
+            await self._check_cash_payment(data, amount)
+
+        movements = [
+            StockMovement(
+                id=uuid.uuid4(),
+                area_id=data.area_id,
+                product_id=line["product_id"],
+                direction=MovementDirection.OUT,
+                operation=MovementOperation.SALE,
+                quantity=line["quantity"],
+                dateOf=now,
+                create_at=now,
+                initiated_by_id=employee_id,
+                created_by_id=user_id,
+                sale_details_line_id=line["id"],
+            )
+            for line in lines
+        ]
+        cash_transaction_id = uuid.uuid4() if method == PaymentMethod.CASH else None
+        payment_id = uuid.uuid4()
+        try:
+            await self.db.execute(
+                insert(Sale).values(
+                    id=sale_id,
+                    customer_id=data.customer_id,
+                    area_id=data.area_id,
+                    reference=reference,
+                    date=now,
+                    status=SaleStatus.DELIVERED,
+                    created_by_id=user_id,
+                )
+            )
+            await self.db.execute(insert(SaleDetailLine), lines)
+            await StockManager(self.db).add_movements(movements)
+            if cash_transaction_id is not None:
+                await self.db.execute(
+                    insert(CashTransaction).values(
+                        id=cash_transaction_id,
+                        direction=TransactionDirection.IN,
+                        operation=TransactionPurpose.SALE_PAYMENT,
+                        status=TransactionState.COMPLETED,
+                        created_by_id=user_id,
+                        register_id=data.payment.register_id,
+                        payment_ref=reference[:50],
+                        dateOf=now,
+                    )
+                )
+                details = self._cash_details(cash_transaction_id, data.payment)
+                if details:
+                    await self.db.execute(insert(CashTransactionDetailsLine), details)
+                await FinanceManager(self.db).apply_transaction(cash_transaction_id, data.payment.register_id, 1)
+            await self.db.execute(
+                insert(Payment).values(
+                    id=payment_id,
+                    reference=data.payment.reference,
+                    amount=amount,
+                    date=now,
+                    method=method,
+                    state=TransactionState.COMPLETED,
+                    direction=TransactionType.IN,
+                    sale_id=sale_id,
+                    cash_transac_id=cash_transaction_id,
+                )
+            )
+            await self.db.commit()
+        except ValueError:
+            await self.db.rollback()
+            raise
+        except IntegrityError as e:
+            # unknown customer, reference already used ...
+            await self.db.rollback()
+            raise ValueError(f"The sale can't be saved : {e.orig}")
+
+        duration = perf_counter() - started_at
+        checkout_seconds.observe(duration)
+        if duration > settings.SALE_CHECKOUT_TARGET_SECONDS:
+            logger.warning(
+                "checkout of %s lines in %.3fs (target %ss)",
+                len(lines),
+                duration,
+                settings.SALE_CHECKOUT_TARGET_SECONDS,
+            )
+        return {
+            "sale_id": sale_id,
+            "reference": reference,
+            "amount": amount,
+            "payment_id": payment_id,
+            "cash_transaction_id": cash_transaction_id,
+            "stock_movement_ids": [movement.id for movement in movements],
+        }
+
 
 # class PurchaseManager
 
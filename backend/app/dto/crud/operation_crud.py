@@ -1,19 +1,31 @@
 import datetime
+from decimal import Decimal
+from collections.abc import Iterable
+from typing import NamedTuple
 import uuid
-from sqlalchemy import and_, func, select, update
+from sqlalchemy import DateTime, Numeric, and_, case, cast, column, func, insert, literal, select, update, values
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION, UUID, insert as pg_insert
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+from app.dto.crud.catalog_cache import catalog_cache
+from app.dto.crud.pagination import Page, paginate
+from app.dto.models.load_profiles import load_profile
 from app.dto.models.models import (
+    AreaCounter,
     PriceHistory,
     PriceType,
     Product,
     ProductCategory,
     ProductCreationState,
     MovementDirection,
+    StockBalance,
     StockMovement,
+    StockSnapshot,
     MovementOperation,
 )
-from app.dto.schemas.operation.stock_schema import StockMovementCreate
+from app.dto.schemas.operation.stock_schema import StockMovementCreate, StockMovementBatchCreate
 from app.dto.schemas.operation.product_schema import (
     ProductCategoryBase,
     ProductCategoryUpdate,
@@ -26,39 +38,87 @@ class ProductManager:
     def __init__(self, db: AsyncSession):
         self.db = db
 
-    async def _get_or_create_category(self, product: ProductCreate):
-        normalize_category_name = product.category_name.lower() if product.category_name else None
-        statement = select(ProductCategory).filter(
-            func.lower(ProductCategory.cat_name) == normalize_category_name, ProductCategory.area_id == product.area_id
+    async def resolve_categories(self, area_id: uuid.UUID, names: Iterable[str | None]) -> dict[str, uuid.UUID]:
+        """Ids of the categories of the area by name (lower case), the missing ones are created.
+        One query for the existing categories, one upsert for the missing ones, without commit
+        """
+        normalized = {name.strip().lower() for name in names if name and name.strip()}
+        if not normalized:
+            return {}
+        lower_name = func.lower(ProductCategory.cat_name)
+        statement = select(lower_name, ProductCategory.id).where(
+            ProductCategory.area_id == area_id, lower_name.in_(normalized)
         )
-        result = await self.db.execute(statement)
-        # Check if the category already exists
-        category = result.scalars().first()
-        # If it doesn't exist, create a new category
-        if not category:
-            category = ProductCategory(cat_name=normalize_category_name, area_id=product.area_id)
-            self.db.add(category)
-            await self.db.flush()  # Ensure the category is added before creating the product
-        return category
+        categories = dict((await self.db.execute(statement)).tuples().all())
+        missing = normalized - categories.keys()
+        if missing:
+            # index uq_category_area_lower_name : a category created in between by another request is kept
+            insert_missing = (
+                pg_insert(ProductCategory)
+                .values([{"id": uuid.uuid4(), "cat_name": name, "area_id": area_id} for name in sorted(missing)])
+                .on_conflict_do_nothing(index_elements=[ProductCategory.area_id, lower_name])
+                .returning(ProductCategory.cat_name, ProductCategory.id)
+            )
+            categories.update((await self.db.execute(insert_missing)).tuples().all())
+            if missing - categories.keys():
+                statement = statement.where(lower_name.in_(missing - categories.keys()))
+                categories.update((await self.db.execute(statement)).tuples().all())
+        return categories
+
+    async def _get_or_create_category(self, product: ProductCreate) -> uuid.UUID | None:
+        categories = await self.resolve_categories(product.area_id, [product.category_name])
+        return next(iter(categories.values()), None)
 
-    async def create_product(self, data: ProductCreate):
-        category = await self._get_or_create_category(data)
+    async def create_product(
+        self, data: ProductCreate, user_id: uuid.UUID, employee_id: uuid.UUID | None = None
+    ) -> Product:
+        """Create a product, its category if new, and its initial stock as a movement (like the import)"""
+        stock = Decimal(str(data.actual_stock or data.init_stock or 0))
+        if stock < 0:
+            raise ValueError("The initial stock can't be negative")
+        if stock > 0 and employee_id is None:
+            raise ValueError("Only an employee can set the initial stock")
+        category_id = await self._get_or_create_category(data)
         db_prod = Product(
+            id=uuid.uuid4(),
             reference=data.reference,
             name=data.name,
-            description=data.description,
+            description=data.description or "",
             state=ProductCreationState.PENDING,
-            price=data.purchase_price,
+            sale_price=data.price,
             purchase_price=data.purchase_price,
-            init_stock=data.init_stock or 0,
-            actual_stock=data.actual_stock or 0,
+            old_stock=0,
+            actual_stock=stock,
             area_id=data.area_id,
-            category_id=category.id,
+            category_id=category_id,
         )
         self.db.add(db_prod)
+        movements = []
+        if stock > 0:
+            # the stock of the product is already set : only the movement and the ledger are saved
+            now = datetime.datetime.now(datetime.timezone.utc)
+            movements.append(
+                StockMovement(
+                    id=uuid.uuid4(),
+                    area_id=data.area_id,
+                    product_id=db_prod.id,
+                    direction=MovementDirection.IN,
+                    operation=MovementOperation.OTHER,
+                    quantity=stock,
+                    dateOf=now,
+                    create_at=now,
+                    initiated_by_id=employee_id,
+                    created_by_id=user_id,
+                    comment="initial stock",
+                )
+            )
+            self.db.add_all(movements)
         try:
+            # the product is flushed by the first statement : a reference already used fails here or at the commit
+            await StockLedgerManager(self.db).apply([StockLedgerManager.delta_of(movement) for movement in movements])
+            await catalog_cache.invalidate(self.db, data.area_id)
             await self.db.commit()
-        except InterruptedError:
+        except IntegrityError:
             await self.db.rollback()
             raise ValueError("Product with this reference already exists.")
         await self.db.refresh(db_prod)
@@ -99,9 +159,18 @@ class ProductManager:
                     comment=getattr(data, "comment", None),
                 )
             )
+        # the product can move to another area : both catalogs change
+        await catalog_cache.invalidate(self.db, product_db.area_id)
         # Update the product fields
-        for var, value in data.model_dump(exclude_unset=True).items():
+        values = data.model_dump(exclude_unset=True)
+        if "category_name" in values:
+            area_id = values.get("area_id") or product_db.area_id
+            categories = await self.resolve_categories(area_id, [values.pop("category_name")])
+            values["category_id"] = next(iter(categories.values()), None)
+        for var, value in values.items():
             setattr(product_db, var, value)
+        if product_db.area_id is not None:
+            await catalog_cache.invalidate(self.db, product_db.area_id)
         # Add the price history entries to the session
         for history in history_entries:
             self.db.add(history)
@@ -110,14 +179,25 @@ class ProductManager:
         await self.db.refresh(product_db)
         return product_db
 
+    # scan at the till, served by the catalog cache
+    async def get_product_by_reference(self, area_id: uuid.UUID, reference: str) -> Product:
+        product = await catalog_cache.scan(self.db, area_id, reference)
+        if not product:
+            raise ValueError("Product not found")
+        return product
+
+    # served by the catalog cache : the product returned is not attached to the session (read only)
     async def get_product(self, product_id: uuid.UUID) -> Product:
-        product = await self.db.get(Product, product_id)
+        product = await catalog_cache.get_product(self.db, product_id)
         if not product:
             raise ValueError("Product not found")
         return product
 
     async def delete_product(self, product_id: uuid.UUID):
-        product = self.get_product(product_id)
+        product = await self.db.get(Product, product_id)
+        if not product:
+            raise ValueError("Product not found")
+        await catalog_cache.invalidate(self.db, product.area_id)
         await self.db.delete(product)
         await self.db.commit()
 
@@ -126,6 +206,7 @@ class ProductManager:
         if not product_db:
             raise ValueError("Product not found")
         product_db.state = validation
+        await catalog_cache.invalidate(self.db, product_db.area_id)
         await self.db.commit()
         await self.db.refresh(product_db)
         return product_db
@@ -151,15 +232,60 @@ class ProductManager:
     async def detach_product_from_category(self, category_id: uuid.UUID):
         # Detach all products from the category
         # This will set the category_id of all products in this category to None
-        stmt = update(Product).where(Product.category_id == category_id).values(category_id=None)
-        await self.db.execute(stmt)
+        stmt = (
+            update(Product)
+            .where(Product.category_id == category_id)
+            .values(category_id=None)
+            .returning(Product.area_id)
+        )
+        for area_id in set((await self.db.execute(stmt)).scalars().all()):
+            await catalog_cache.invalidate(self.db, area_id)
         await self.db.commit()
 
     # return a list of all product for area passed in parameter
-    async def get_area_products(self, area_id: uuid.UUID, skip: int = 0, limit: int = 10):
-        stmt = select(Product).where(Product.area_id == area_id).order_by(Product.name).offset(skip).limit(limit)
-        result = await self.db.execute(stmt)
-        return result.scalars().all()
+    async def get_area_products(
+        self, area_id: uuid.UUID, skip: int = 0, limit: int = 10, cursor: str | None = None
+    ) -> Page[Product]:
+        # catalog of the area cached, only the stock of the page is read
+        return await catalog_cache.area_page(self.db, area_id, limit, cursor, skip)
+
+    # search in the name, reference, description and category of the products (indexes pg_trgm),
+    # the best matches first : prefix of the name or of the reference, then similarity
+    async def search_products(
+        self, area_id: uuid.UUID, query: str, skip: int = 0, limit: int = 10, cursor: str | None = None
+    ) -> Page[Product]:
+        query = query.strip().lower()
+        if not query:
+            raise ValueError("Empty search")
+        pattern = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        contains = f"%{pattern}%"
+        category_name = func.coalesce(ProductCategory.cat_name, "")
+        similarity = func.greatest(
+            func.similarity(Product.name, query),
+            func.similarity(Product.reference, query),
+            func.similarity(category_name, query),
+            func.similarity(Product.description, query),
+        )
+        prefix = Product.name.ilike(f"{pattern}%", escape="\\") | Product.reference.ilike(f"{pattern}%", escape="\\")
+        # double precision : the rank carried by the cursor is compared without rounding
+        rank = cast(similarity + case((prefix, 1), else_=0), DOUBLE_PRECISION)
+        stmt = (
+            select(Product)
+            .outerjoin(ProductCategory, ProductCategory.id == Product.category_id)
+            .where(
+                Product.area_id == area_id,
+                Product.name.ilike(contains, escape="\\")
+                | Product.reference.ilike(contains, escape="\\")
+                | Product.description.ilike(contains, escape="\\")
+                | ProductCategory.cat_name.ilike(contains, escape="\\"),
+            )
+        )
+        return await paginate(self.db, stmt, [rank, Product.id], limit, cursor, skip, descending=True, with_total=True)
+
+    # number of products of the area, kept by a trigger on product : no count of the rows
+    async def count_area_products(self, area_id: uuid.UUID) -> int:
+        statement = select(AreaCounter.value).where(AreaCounter.area_id == area_id, AreaCounter.name == "product")
+        return (await self.db.execute(statement)).scalar_one_or_none() or 0
 
     # return a list of all product categories for area passed in parameter
     async def get_area_product_categories(self, area_id: uuid.UUID, skip: int = 0, limit: int = 10):
@@ -176,7 +302,12 @@ class ProductManager:
     async def create_category(self, category: ProductCategoryBase):
         db_prod = ProductCategory(**category.model_dump())
         self.db.add(db_prod)
-        await self.db.commit()
+        await catalog_cache.invalidate(self.db, db_prod.area_id)
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            await self.db.rollback()
+            raise ValueError("Category with this name already exists.")
         await self.db.refresh(db_prod)
         return db_prod
 
@@ -190,20 +321,218 @@ class ProductManager:
         if category_db:
             for var, value in category_update.model_dump(exclude_unset=True).items():
                 setattr(category_db, var, value)
-            await self.db.commit()
+            await catalog_cache.invalidate(self.db, category_db.area_id)
+            try:
+                await self.db.commit()
+            except IntegrityError:
+                await self.db.rollback()
+                raise ValueError("Category with this name already exists.")
             await self.db.refresh(category_db)
         return category_db
 
-    async def get_product_history_price(self, product_id: uuid.UUID, type: PriceType, skip: int = 0, limit: int = 10):
+    # most recent first
+    async def get_product_history_price(
+        self, product_id: uuid.UUID, type: PriceType, skip: int = 0, limit: int = 10, cursor: str | None = None
+    ) -> Page[PriceHistory]:
         satement = (
             select(PriceHistory)
+            .options(*load_profile(PriceHistory, "list"))
             .where((PriceHistory.product_id == product_id) & (PriceHistory.type == type))
-            .order_by(PriceHistory.created_at.desc())
-            .offset(skip)
-            .limit(limit)
         )
-        result = await self.db.execute(satement)
-        return result.scalars().all()
+        keys = [PriceHistory.created_at, PriceHistory.id]
+        return await paginate(self.db, satement, keys, limit, cursor, skip, descending=True)
+
+
+class StockDelta(NamedTuple):
+    """Signed quantity moved for an (area, product, lot) at the real date of the movement"""
+
+    area_id: uuid.UUID
+    product_id: uuid.UUID
+    lot_id: uuid.UUID | None
+    quantity: Decimal
+    dateof: datetime.datetime
+
+
+class StockLedgerManager:
+    """Running balances of stock per (area, product, lot) and periodic snapshots.
+    The current stock is read on the balances, the stock at a date from the last snapshot before it
+    plus the movements since this snapshot : the cost doesn't depend of the length of the history.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def signed_quantity():
+        return case(
+            (StockMovement.direction == MovementDirection.OUT, -StockMovement.quantity), else_=StockMovement.quantity
+        )
+
+    @staticmethod
+    def delta_of(movement: StockMovement) -> StockDelta:
+        quantity = Decimal(movement.quantity or 0)
+        if movement.direction == MovementDirection.OUT:
+            quantity = -quantity
+        # a movement not flushed yet has no date (default of the column) : dated now, like the column would do
+        dateof = movement.dateOf or datetime.datetime.now(datetime.timezone.utc)
+        return StockDelta(movement.area_id, movement.product_id, movement.lot_id, quantity, dateof)
+
+    # to call in the transaction which saves the movements
+    async def apply(self, deltas: list[StockDelta]):
+        if not deltas:
+            return
+        now = datetime.datetime.now(datetime.timezone.utc)
+        # one row by key : a statement "on conflict do update" can't update twice the same row
+        balances: dict[tuple[uuid.UUID, uuid.UUID, uuid.UUID | None], dict] = {}
+        for delta in deltas:
+            key = (delta.area_id, delta.product_id, delta.lot_id)
+            balance = balances.get(key)
+            if balance is None:
+                balances[key] = {
+                    "id": uuid.uuid4(),
+                    "area_id": delta.area_id,
+                    "product_id": delta.product_id,
+                    "lot_id": delta.lot_id,
+                    "quantity": delta.quantity,
+                    "last_movement_at": delta.dateof,
+                    "updated_at": now,
+                }
+            else:
+                balance["quantity"] += delta.quantity
+                balance["last_movement_at"] = max(balance["last_movement_at"], delta.dateof)
+        statement = pg_insert(StockBalance).values(list(balances.values()))
+        statement = statement.on_conflict_do_update(
+            index_elements=[StockBalance.area_id, StockBalance.product_id, StockBalance.lot_id],
+            set_={
+                "quantity": StockBalance.quantity + statement.excluded.quantity,
+                "last_movement_at": func.greatest(StockBalance.last_movement_at, statement.excluded.last_movement_at),
+                "updated_at": statement.excluded.updated_at,
+            },
+        )
+        await self.db.execute(statement)
+        await self._update_snapshots(deltas)
+
+    # a movement dated before a snapshot (entered late or canceled) is added to this snapshot and the next ones
+    async def _update_snapshots(self, deltas: list[StockDelta]):
+        rows = values(
+            column("area_id", UUID(as_uuid=True)),
+            column("product_id", UUID(as_uuid=True)),
+            column("lot_id", UUID(as_uuid=True)),
+            column("quantity", Numeric(18, 2)),
+            column("dateof", DateTime(timezone=True)),
+            name="delta",
+        ).data([tuple(delta) for delta in deltas])
+        moved = (
+            select(func.sum(rows.c.quantity))
+            .where(
+                rows.c.area_id == StockSnapshot.area_id,
+                rows.c.product_id == StockSnapshot.product_id,
+                # a VALUES with only NULL lots is typed as text
+                cast(rows.c.lot_id, UUID(as_uuid=True)).is_not_distinct_from(StockSnapshot.lot_id),
+                rows.c.dateof <= StockSnapshot.snapshot_at,
+            )
+            .scalar_subquery()
+        )
+        statement = (
+            update(StockSnapshot)
+            .where(
+                StockSnapshot.area_id.in_({delta.area_id for delta in deltas}),
+                StockSnapshot.product_id.in_({delta.product_id for delta in deltas}),
+                StockSnapshot.snapshot_at >= min(delta.dateof for delta in deltas),
+                moved.is_not(None),
+            )
+            .values(quantity=StockSnapshot.quantity + moved)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(statement)
+
+    async def current_stock(self, area_id: uuid.UUID, product_id: uuid.UUID, lot_id: uuid.UUID | None = None):
+        """Stock on hand, of one lot or of all lots if lot_id is None"""
+        statement = select(func.coalesce(func.sum(StockBalance.quantity), 0)).where(
+            StockBalance.area_id == area_id, StockBalance.product_id == product_id
+        )
+        if lot_id is not None:
+            statement = statement.where(StockBalance.lot_id == lot_id)
+        return (await self.db.execute(statement)).scalar_one()
+
+    async def stock_at(
+        self, area_id: uuid.UUID, product_id: uuid.UUID, dateof: datetime.datetime, lot_id: uuid.UUID | None = None
+    ):
+        """Stock at a date, of one lot or of all lots if lot_id is None"""
+        snapshots = select(StockSnapshot.snapshot_at, func.sum(StockSnapshot.quantity)).where(
+            StockSnapshot.area_id == area_id, StockSnapshot.product_id == product_id
+        )
+        moved = select(func.coalesce(func.sum(self.signed_quantity()), 0)).where(
+            StockMovement.area_id == area_id, StockMovement.product_id == product_id
+        )
+        if lot_id is not None:
+            snapshots = snapshots.where(StockSnapshot.lot_id == lot_id)
+            moved = moved.where(StockMovement.lot_id == lot_id)
+        snapshots = snapshots.group_by(StockSnapshot.snapshot_at).limit(1)
+
+        # last snapshot before the date, plus the movements since
+        before = snapshots.where(StockSnapshot.snapshot_at <= dateof).order_by(StockSnapshot.snapshot_at.desc())
+        snapshot = (await self.db.execute(before)).first()
+        if snapshot is not None:
+            snapshot_at, quantity = snapshot
+            moved = moved.where(StockMovement.dateOf > snapshot_at, StockMovement.dateOf <= dateof)
+            return quantity + (await self.db.execute(moved)).scalar_one()
+        # date before the first snapshot : first snapshot after it, minus the movements in between
+        after = snapshots.where(StockSnapshot.snapshot_at > dateof).order_by(StockSnapshot.snapshot_at.asc())
+        snapshot = (await self.db.execute(after)).first()
+        if snapshot is not None:
+            snapshot_at, quantity = snapshot
+            moved = moved.where(StockMovement.dateOf > dateof, StockMovement.dateOf <= snapshot_at)
+            return quantity - (await self.db.execute(moved)).scalar_one()
+        # no snapshot of the product yet (taken every night) : go back from the current stock
+        current = await self.current_stock(area_id, product_id, lot_id)
+        moved = moved.where(StockMovement.dateOf > dateof)
+        return current - (await self.db.execute(moved)).scalar_one()
+
+    # to launch periodly (e.g every night with the end of the previous day)
+    async def take_snapshot(self, area_id: uuid.UUID, snapshot_at: datetime.datetime) -> int:
+        """Save the stock of all products of the area at the date, computed from the current balances"""
+        moved_after = (
+            select(func.coalesce(func.sum(self.signed_quantity()), 0))
+            .where(
+                StockMovement.area_id == StockBalance.area_id,
+                StockMovement.product_id == StockBalance.product_id,
+                StockMovement.lot_id.is_not_distinct_from(StockBalance.lot_id),
+                StockMovement.dateOf > snapshot_at,
+            )
+            .scalar_subquery()
+        )
+        source = select(
+            func.gen_random_uuid(),
+            StockBalance.area_id,
+            StockBalance.product_id,
+            StockBalance.lot_id,
+            literal(snapshot_at, DateTime(timezone=True)),
+            StockBalance.quantity - moved_after,
+        ).where(StockBalance.area_id == area_id)
+        statement = pg_insert(StockSnapshot).from_select(
+            ["id", "area_id", "product_id", "lot_id", "snapshot_at", "quantity"], source
+        )
+        statement = statement.on_conflict_do_update(
+            index_elements=[
+                StockSnapshot.area_id,
+                StockSnapshot.product_id,
+                StockSnapshot.lot_id,
+                StockSnapshot.snapshot_at,
+            ],
+            set_={"quantity": statement.excluded.quantity},
+        )
+        result = await self.db.execute(statement)
+        await self.db.commit()
+        return result.rowcount
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product_id: uuid.UUID, available: Decimal, requested: Decimal):
+        self.product_id = product_id
+        self.available = available
+        self.requested = requested
+        super().__init__(f"Insufficient stock for product {product_id} : {available} available, {requested} requested")
 
 
 class StockManager:
@@ -211,18 +540,19 @@ class StockManager:
         self.db = db
 
     def _create_stockMovement(self, data: StockMovementCreate):
-        if data.dateof is None:
-            data.dateof = datetime.datetime.now(datetime.timezone.utc)
+        now = datetime.datetime.now(datetime.timezone.utc)
         return StockMovement(
             area_id=data.area_id,
             product_id=data.product_id,
+            lot_id=data.product_lot_id,
             direction=data.direction,
             operation=data.operation,
             quantity=data.quantity,
-            dateof=data.dateof,
-            create_at=datetime.datetime.now(datetime.timezone.utc),
-            itiated_by_id=data.initiated_by,
-            create_by_id=data.created_by,
+            # no real date given : the movement is dated when it is saved
+            dateOf=data.dateof or now,
+            create_at=now,
+            initiated_by_id=data.initiated_by,
+            created_by_id=data.created_by,
             comment=getattr(data, "comment", None),
         )
 
@@ -233,29 +563,97 @@ class StockManager:
             stock.purchase_id = operation_id
         return stock
 
-    async def _update_product_stock_fields(self, stock: StockMovement):
-        product_db = await ProductManager(self.db).get_product(stock.product_id)
-        product_db.old_stock = product_db.actual_stock
-        quantity_movement = stock.quantity
-        if stock.direction == MovementDirection.OUT:
-            quantity_movement *= -1
-        product_db.actual_stock += quantity_movement
-        return product_db
+    async def _adjust_product_stock(self, product_id: uuid.UUID, quantity: Decimal):
+        """Add the quantity (negative for an exit) to the stock of the product in the database.
+        The addition is made by Postgres and not in Python : two tills selling the same product
+        at the same time can't overwrite the stock of each other.
+        """
+        statement = update(Product).where(Product.id == product_id)
+        if settings.STOCK_UPDATE_MODE == "locked":
+            # the row is locked up to the end of the transaction, the stock read can't change before the update
+            result = await self.db.execute(
+                select(Product.actual_stock).where(Product.id == product_id).with_for_update()
+            )
+            actual_stock = result.scalar_one_or_none()
+            if actual_stock is None:
+                raise ValueError("Product not found")
+            if quantity < 0 and not settings.STOCK_ALLOW_NEGATIVE and actual_stock + quantity < 0:
+                raise InsufficientStockError(product_id, actual_stock, -quantity)
+        elif quantity < 0 and not settings.STOCK_ALLOW_NEGATIVE:
+            statement = statement.where(Product.actual_stock + quantity >= 0)
+        statement = statement.values(
+            old_stock=Product.actual_stock, actual_stock=Product.actual_stock + quantity
+        ).returning(Product.id)
+        result = await self.db.execute(statement, execution_options={"synchronize_session": "fetch"})
+        if result.scalar_one_or_none() is None:
+            # no row updated : the product doesn't exist or its stock is not enough
+            actual_stock = (
+                await self.db.execute(select(Product.actual_stock).where(Product.id == product_id))
+            ).scalar_one_or_none()
+            if actual_stock is None:
+                raise ValueError("Product not found")
+            raise InsufficientStockError(product_id, actual_stock, -quantity)
 
     async def update_stock(self, data: StockMovementCreate):
         stock = self._update_fields(self._create_stockMovement(data), data.operation_id)
-        # update the stock in product
-        product_db = await self._update_product_stock_fields(stock)
+        delta = StockLedgerManager.delta_of(stock)
+        try:
+            # update the stock in product
+            await self._adjust_product_stock(stock.product_id, delta.quantity)
+        except ValueError:
+            await self.db.rollback()
+            raise
         self.db.add(stock)
         await self.db.flush()
-        self.db.add(product_db)
+        await StockLedgerManager(self.db).apply([delta])
         await self.db.commit()
         await self.db.refresh(stock)
-        await self.db.refresh(product_db)
         return stock
 
+    async def add_movements(self, movements: list[StockMovement]) -> None:
+        """Save movements in the current transaction, without commit : one UPDATE per product
+        with the sum of its quantities, one INSERT for all the movements, one upsert of the balances.
+        On ValueError the caller rolls back the transaction.
+        """
+        deltas = [StockLedgerManager.delta_of(movement) for movement in movements]
+        quantities: dict[uuid.UUID, Decimal] = {}
+        for delta in deltas:
+            quantities[delta.product_id] = quantities.get(delta.product_id, Decimal(0)) + delta.quantity
+        # always the same order of the products : two batches can't wait for the lock of each other
+        for product_id in sorted(quantities):
+            await self._adjust_product_stock(product_id, quantities[product_id])
+        columns = [attribute.key for attribute in StockMovement.__mapper__.column_attrs]
+        await self.db.execute(
+            insert(StockMovement), [{key: getattr(movement, key) for key in columns} for movement in movements]
+        )
+        await StockLedgerManager(self.db).apply(deltas)
+
+    async def create_movements(self, data: StockMovementBatchCreate) -> list[uuid.UUID]:
+        """Save many movements in one transaction (see add_movements)"""
+        movements = []
+        for index, line in enumerate(data.movements):
+            try:
+                # the model checks the direction is coherent with the operation
+                movement = self._create_stockMovement(line)
+            except ValueError as e:
+                raise ValueError(f"Line {index + 1} : {e}")
+            movement.id = uuid.uuid4()
+            movements.append(movement)
+        try:
+            await self.add_movements(movements)
+            await self.db.commit()
+        except ValueError:
+            await self.db.rollback()
+            raise
+        return [movement.id for movement in movements]
+
     async def get_stock_movement(self, stock_movement_id: uuid.UUID):
-        stock_movement = self.db.get(StockMovement, stock_movement_id)
+        statement = (
+            select(StockMovement)
+            .options(*load_profile(StockMovement, "detail"))
+            .where(StockMovement.id == stock_movement_id)
+        )
+        stock_movement = (await self.db.execute(statement)).unique().scalar_one_or_none()
         if not isinstance(stock_movement, StockMovement):
             raise ValueError("Stock movement not found")
         return stock_movement
@@ -264,26 +662,66 @@ class StockManager:
     # else, enter a new stock movement exacte oposite of movement to canceled
     async def cancel_movement_stock(self, movement_id: uuid.UUID):
         db_movement = await self.get_stock_movement(movement_id)
-        dateofDay = datetime.datetime.today
-        if db_movement.create_at != dateofDay:
+        today = datetime.datetime.now(datetime.timezone.utc).date()
+        if db_movement.create_at.astimezone(datetime.timezone.utc).date() != today:
             raise ValueError(
                 "Movement at stock can be cancelled only at the day when his created\n "
                 "Please procced to a movement opposite"
             )
-        # make the operation direction to this opposite
-        if db_movement.direction == MovementDirection.IN:
-            db_movement.direction = MovementDirection.OUT
-        elif db_movement.direction == MovementDirection.OUT:
-            db_movement.direction = MovementDirection.IN
+        # the opposite of the movement is applied to the stock
+        delta = StockLedgerManager.delta_of(db_movement)
+        reverse = delta._replace(quantity=-delta.quantity)
+        try:
+            await self._adjust_product_stock(db_movement.product_id, reverse.quantity)
+        except ValueError:
+            await self.db.rollback()
+            raise
         # delete movement in database
         await self.db.delete(db_movement)
-        # update the quantity stock labeled in the product
-        product_db = await self._update_product_stock_fields(db_movement)
-        self.db.add(product_db)
+        await StockLedgerManager(self.db).apply([reverse])
         await self.db.commit()
-        await self.db.refresh(product_db)
         return None
 
+    # columns of the export of the movements
+    EXPORT_COLUMNS = (
+        StockMovement.id,
+        StockMovement.dateOf,
+        StockMovement.create_at,
+        StockMovement.area_id,
+        StockMovement.product_id,
+        StockMovement.lot_id,
+        StockMovement.direction,
+        StockMovement.operation,
+        StockMovement.quantity,
+        StockMovement.comment,
+        StockMovement.initiated_by_id,
+        StockMovement.created_by_id,
+    )
+
+    async def stream_movements(
+        self,
+        area_id: uuid.UUID,
+        date_begin: datetime.datetime,
+        date_end: datetime.datetime,
+        product_id: uuid.UUID | None = None,
+        chunk_size: int = 1000,
+    ):
+        """Movements of the area between two dates, by chunks of rows.
+        The rows are read with a server side cursor : only one chunk is in memory at a time.
+        """
+        conditions = [StockMovement.area_id == area_id, StockMovement.dateOf.between(date_begin, date_end)]
+        if product_id is not None:
+            conditions.append(StockMovement.product_id == product_id)
+        statement = (
+            select(*self.EXPORT_COLUMNS)
+            .where(and_(*conditions))
+            .order_by(StockMovement.dateOf, StockMovement.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        result = await self.db.stream(statement)
+        async for rows in result.partitions():
+            yield rows
+
     async def product_stock_track(
         self,
         product_id: uuid.UUID,
@@ -295,6 +733,7 @@ class StockManager:
     ):
         statement = (
             select(StockMovement)
+            .options(*load_profile(StockMovement, "list"))
             .where(
                 and_(
                     StockMovement.area_id == area_id,
@@ -302,7 +741,7 @@ class StockManager:
                     StockMovement.dateOf.between(date_begin, date_end),
                 )
             )
-            .order_by(StockMovement.dateof.desc())
+            .order_by(StockMovement.dateOf.desc())
             .offset(skip)
             .limit(limit)
         )
@@ -0,0 +1,116 @@
+import base64
+import datetime
+import json
+import uuid
+from collections.abc import Sequence
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Any, Generic, TypeVar
+
+from sqlalchemy import ColumnElement, Select, func, literal, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+T = TypeVar("T")
+
+
+@dataclass
+class Page(Generic[T]):
+    items: list[T]
+    # None : this page is the last one
+    next_cursor: str | None = None
+    # number of rows of all the pages, None if not asked
+    total: int | None = None
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return value
+
+
+def _load(value: Any, key: ColumnElement[Any]) -> Any:
+    if value is None:
+        return None
+    python_type = key.type.python_type
+    if python_type is uuid.UUID:
+        return uuid.UUID(value)
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(value)
+    if python_type is Decimal:
+        return Decimal(value)
+    if not isinstance(value, python_type):
+        raise TypeError(value)
+    return value
+
+
+def encode_cursor(values: Sequence[Any], total: int | None = None) -> str:
+    """Opaque cursor made of the sort values of the last row of a page,
+    and of the total counted on the first page (not counted again on the next ones)
+    """
+    content = {"k": [_dump(value) for value in values], "t": total}
+    return base64.urlsafe_b64encode(json.dumps(content).encode()).decode()
+
+
+def decode_cursor(cursor: str, keys: Sequence[ColumnElement[Any]]) -> tuple[list[Any], int | None]:
+    try:
+        content = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        values, total = content["k"], content["t"]
+        if not isinstance(values, list) or len(values) != len(keys) or not isinstance(total, (int, type(None))):
+            raise ValueError(cursor)
+        return [_load(value, key) for value, key in zip(values, keys, strict=True)], total
+    except (ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+
+
+async def paginate(
+    db: AsyncSession,
+    statement: Select[Any],
+    keys: Sequence[ColumnElement[Any]],
+    limit: int,
+    cursor: str | None = None,
+    skip: int = 0,
+    descending: bool = False,
+    with_total: bool = False,
+) -> Page[Any]:
+    """Keyset pagination of a statement selecting one entity.
+    keys are the sort columns and must end by a unique column (the id) : the next page starts
+    after the values of the last row (WHERE (keys) > (values)), so a deep page costs as much as the first one.
+    Without cursor, skip is used as offset (first page, or clients still paging by offset).
+    with_total : the rows of all the pages are counted with count(*) over() in the query of the first page,
+    the total is then carried by the cursor.
+    """
+    total = None
+    base = statement
+    count_rows = with_total and cursor is None
+    statement = statement.add_columns(*(key.label(f"cursor_key_{index}") for index, key in enumerate(keys)))
+    if count_rows:
+        # computed before the limit : counts the rows of all the pages
+        statement = statement.add_columns(func.count().over().label("page_total"))
+    if cursor is not None:
+        values, total = decode_cursor(cursor, keys)
+        after = tuple_(*keys)
+        bound = tuple_(*(literal(value, key.type) for value, key in zip(values, keys, strict=True)))
+        statement = statement.where(after < bound if descending else after > bound)
+    elif skip:
+        statement = statement.offset(skip)
+    statement = statement.order_by(*(key.desc() if descending else key.asc() for key in keys)).limit(limit + 1)
+
+    # unique() : the joined eager loads return the same entity on many rows
+    rows = (await db.execute(statement)).unique().all()
+    if count_rows:
+        if rows:
+            total = rows[0].page_total
+        elif skip:
+            # offset beyond the last row : no row to carry the total
+            total = (await db.execute(select(func.count()).select_from(base.subquery()))).scalar_one()
+        else:
+            total = 0
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1 : len(keys) + 1], total if with_total else None)
+    return Page(items=[row[0] for row in rows], next_cursor=next_cursor, total=total if with_total else None)
@@ -0,0 +1,259 @@
+# Import of the products of a point of sale from a CSV or XLSX file (onboarding of a new area).
+# The file is read by chunks of rows : each chunk is validated with ProductCreate, its categories
+# are resolved / created in one pass (ProductManager.resolve_categories), its products and their
+# initial stock inserted in a few statements, then committed. A row in error doesn't stop the import : it is reported with its line number.
+import asyncio
+import csv
+import datetime
+import io
+import logging
+import uuid
+from collections.abc import Iterator
+from dataclasses import dataclass, field
+from decimal import Decimal
+from time import perf_counter
+from typing import IO, Any
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.dto.crud.catalog_cache import catalog_cache
+from app.dto.crud.operation_crud import ProductManager, StockLedgerManager
+from app.dto.models.models import (
+    MovementDirection,
+    MovementOperation,
+    Product,
+    ProductCreationState,
+    StockMovement,
+)
+from app.dto.schemas.operation.product_schema import ProductCreate
+
+logger = logging.getLogger(__name__)
+
+# columns of the file, in the order of the header (area_id is the one of the import)
+COLUMNS = tuple(name for name in ProductCreate.model_fields if name != "area_id")
+FORMATS = ("csv", "xlsx")
+NUMBER_COLUMNS = ("price", "purchase_price", "init_stock", "actual_stock")
+# size of the text columns of the table : a longer value is reported on its row, not rejected by the database
+TEXT_LENGTHS = {name: Product.__table__.c[name].type.length for name in ("reference", "name", "description")}
+
+
+def _csv_rows(file: IO[bytes]) -> Iterator[dict[str, Any]]:
+    text = io.TextIOWrapper(file, encoding="utf-8-sig", newline="")
+    try:
+        # files saved by Excel in French are separated by ";"
+        dialect: Any = csv.Sniffer().sniff(text.read(4096), delimiters=",;\t")
+    except csv.Error:
+        dialect = csv.excel
+    text.seek(0)
+    yield from csv.DictReader(text, dialect=dialect)
+
+
+def _xlsx_rows(file: IO[bytes]) -> Iterator[dict[str, Any]]:
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("The import of XLSX files needs openpyxl (pip install openpyxl)")
+    # read only : the rows are read one by one, the sheet is never loaded whole
+    workbook = load_workbook(file, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(cell).strip() if cell is not None else "" for cell in next(rows, ())]
+        for values in rows:
+            yield dict(zip(header, values, strict=False))
+    finally:
+        workbook.close()
+
+
+def read_rows(file: IO[bytes], format: str) -> Iterator[dict[str, Any]]:
+    """Rows of the file as dicts column -> value"""
+    if format == "csv":
+        return _csv_rows(file)
+    if format == "xlsx":
+        return _xlsx_rows(file)
+    raise ValueError(f"Unknown format {format}, expected one of {', '.join(FORMATS)}")
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    error_count: int = 0
+    # the first errors (settings.PRODUCT_IMPORT_MAX_ERRORS)
+    errors: list[dict[str, Any]] = field(default_factory=list)
+    duration_seconds: float = 0
+    rows_per_second: float = 0
+
+    def error(self, row: int, reference: Any, messages: list[str]) -> None:
+        self.error_count += 1
+        if len(self.errors) < settings.PRODUCT_IMPORT_MAX_ERRORS:
+            self.errors.append({"row": row, "reference": reference, "errors": messages})
+
+
+class ProductImportManager:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def _validate(values: dict[str, Any], area_id: uuid.UUID) -> ProductCreate:
+        data: dict[str, Any] = {}
+        for name in COLUMNS:
+            value = values.get(name)
+            if isinstance(value, str):
+                value = value.strip() or None
+            if isinstance(value, str) and name in NUMBER_COLUMNS:
+                # decimal comma of the files saved in French
+                value = value.replace(",", ".")
+            data[name] = value
+        product = ProductCreate(**data, area_id=area_id)
+        messages = [
+            f"{name} : at most {length} characters"
+            for name, length in TEXT_LENGTHS.items()
+            if len(getattr(product, name) or "") > length
+        ]
+        if product.purchase_price is None:
+            messages.append("purchase_price : field required")
+        if (product.actual_stock or product.init_stock or 0) < 0:
+            messages.append("actual_stock : the initial stock can't be negative")
+        if messages:
+            raise ValueError(", ".join(messages))
+        return product
+
+    async def _import_chunk(
+        self,
+        chunk: list[tuple[int, ProductCreate]],
+        area_id: uuid.UUID,
+        user_id: uuid.UUID,
+        employee_id: uuid.UUID,
+        report: ImportReport,
+    ) -> None:
+        categories = await ProductManager(self.db).resolve_categories(
+            area_id, (product.category_name for _, product in chunk)
+        )
+        now = datetime.datetime.now(datetime.timezone.utc)
+        rows = []
+        for _, product in chunk:
+            stock = Decimal(str(product.actual_stock or product.init_stock or 0))
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "reference": product.reference,
+                    "name": product.name,
+                    "description": product.description or "",
+                    "area_id": area_id,
+                    "category_id": categories.get((product.category_name or "").strip().lower()),
+                    "purchase_price": product.purchase_price,
+                    "sale_price": product.price,
+                    "old_stock": 0,
+                    "actual_stock": stock,
+                    "state": ProductCreationState.PENDING,
+                }
+            )
+        # a reference already used in the area is not imported again : reported as error
+        statement = (
+            pg_insert(Product)
+            .on_conflict_do_nothing(constraint="uq_product_area_reference")
+            .returning(Product.id, Product.reference)
+        )
+        created = dict((await self.db.execute(statement, rows)).tuples().all())
+        movements = [
+            StockMovement(
+                id=uuid.uuid4(),
+                area_id=area_id,
+                product_id=row["id"],
+                direction=MovementDirection.IN,
+                operation=MovementOperation.OTHER,
+                quantity=row["actual_stock"],
+                dateOf=now,
+                create_at=now,
+                initiated_by_id=employee_id,
+                created_by_id=user_id,
+                comment="initial stock (import)",
+            )
+            for row in rows
+            if row["id"] in created and row["actual_stock"] > 0
+        ]
+        if movements:
+            # the stock of the products is already inserted : only the movements and the ledger are saved
+            columns = [attribute.key for attribute in StockMovement.__mapper__.column_attrs]
+            await self.db.execute(
+                insert(StockMovement), [{key: getattr(movement, key) for key in columns} for movement in movements]
+            )
+            await StockLedgerManager(self.db).apply([StockLedgerManager.delta_of(movement) for movement in movements])
+        if created:
+            await catalog_cache.invalidate(self.db, area_id)
+        await self.db.commit()
+        report.created += len(created)
+        for (line, product), row in zip(chunk, rows, strict=True):
+            if row["id"] not in created:
+                report.error(line, product.reference, ["reference : already used in the area"])
+
+    def _parse_chunk(
+        self,
+        rows: Iterator[tuple[int, dict[str, Any]]],
+        area_id: uuid.UUID,
+        references: set[str],
+        report: ImportReport,
+    ) -> list[tuple[int, ProductCreate]]:
+        """Next valid rows of the file (at most a chunk), the rows in error are reported.
+        Run in a thread : reading and validating the file don't block the event loop
+        """
+        chunk: list[tuple[int, ProductCreate]] = []
+        for line, values in rows:
+            if not any(value not in (None, "") for value in values.values()):
+                continue
+            report.rows += 1
+            try:
+                product = self._validate(values, area_id)
+            except ValidationError as e:
+                messages = [f"{'.'.join(map(str, error['loc']))} : {error['msg']}" for error in e.errors()]
+                report.error(line, values.get("reference"), messages)
+                continue
+            except ValueError as e:
+                report.error(line, values.get("reference"), [str(e)])
+                continue
+            if product.reference in references:
+                report.error(line, product.reference, ["reference : already in the file"])
+                continue
+            references.add(product.reference)
+            chunk.append((line, product))
+            if len(chunk) >= settings.PRODUCT_IMPORT_CHUNK_SIZE:
+                break
+        return chunk
+
+    async def import_products(
+        self, file: IO[bytes], format: str, area_id: uuid.UUID, user_id: uuid.UUID, employee_id: uuid.UUID
+    ) -> ImportReport:
+        """Import the products of the file in the area, chunk by chunk (one transaction per chunk).
+        The file is read and validated in a thread, only the statements of each chunk run on the event loop
+        """
+        report = ImportReport()
+        started_at = perf_counter()
+        references: set[str] = set()
+        # line 1 is the header
+        rows = enumerate(read_rows(file, format), start=2)
+
+        while chunk := await asyncio.to_thread(self._parse_chunk, rows, area_id, references, report):
+            try:
+                await self._import_chunk(chunk, area_id, user_id, employee_id, report)
+            except DBAPIError as e:
+                # only this chunk is lost : the chunks before are committed, the next ones are still imported
+                await self.db.rollback()
+                for line, product in chunk:
+                    report.error(line, product.reference, [f"not saved : {e.orig}"])
+
+        report.duration_seconds = perf_counter() - started_at
+        report.rows_per_second = report.rows / report.duration_seconds if report.duration_seconds else 0
+        logger.info(
+            "import of products in area %s : %s rows, %s created, %s errors, %.0f rows/s",
+            area_id,
+            report.rows,
+            report.created,
+            report.error_count,
+            report.rows_per_second,
+        )
+        return report
@@ -0,0 +1,138 @@
+# In-process caches of reference data : tables which almost never change, read on each operation.
+# The rows are loaded at startup in an immutable snapshot, read without query.
+# A change committed by this worker invalidates the snapshot (see the listeners below),
+# the other workers reload it at the latest after the ttl.
+import asyncio
+import logging
+import uuid
+from collections.abc import Mapping
+from dataclasses import dataclass
+from decimal import Decimal
+from time import monotonic
+from types import MappingProxyType
+from typing import Any
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, object_session
+
+from app.core.cache import cache_hits, cache_misses
+from app.core.config import settings
+from app.dto.models.models import Denomination
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class DenominationEntry:
+    id: uuid.UUID
+    name: str
+    value: Decimal
+    currency: str
+
+
+@dataclass(frozen=True)
+class DenominationSnapshot:
+    # incremented each time the content of the table changes
+    version: int
+    loaded_at: float
+    by_id: Mapping[uuid.UUID, DenominationEntry]
+
+
+class DenominationCache:
+    """Denominations of the database, reloaded when changed or after ttl seconds"""
+
+    name = "denomination"
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._snapshot: DenominationSnapshot | None = None
+        self._stale = True
+        self._lock = asyncio.Lock()
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version if self._snapshot else 0
+
+    def invalidate(self) -> None:
+        self._stale = True
+
+    def _expired(self, snapshot: DenominationSnapshot | None) -> bool:
+        return snapshot is None or self._stale or monotonic() - snapshot.loaded_at > self.ttl
+
+    async def load(self, db: AsyncSession) -> DenominationSnapshot:
+        self._stale = False
+        statement = select(Denomination.id, Denomination.name, Denomination.value, Denomination.currency)
+        by_id = MappingProxyType(
+            {
+                row.id: DenominationEntry(row.id, row.name, Decimal(row.value), row.currency)
+                for row in (await db.execute(statement)).all()
+            }
+        )
+        previous = self._snapshot
+        version = previous.version if previous is not None and previous.by_id == by_id else self.version + 1
+        self._snapshot = DenominationSnapshot(version=version, loaded_at=monotonic(), by_id=by_id)
+        return self._snapshot
+
+    async def get(self, db: AsyncSession) -> DenominationSnapshot:
+        """Snapshot of the denominations, loaded with the session if missing or outdated"""
+        snapshot = self._snapshot
+        if not self._expired(snapshot):
+            cache_hits.inc(cache=self.name)
+            return snapshot  # type: ignore[return-value]
+        cache_misses.inc(cache=self.name)
+        async with self._lock:
+            # loaded by another request while waiting for the lock
+            snapshot = self._snapshot
+            if self._expired(snapshot):
+                snapshot = await self.load(db)
+        return snapshot  # type: ignore[return-value]
+
+    def value(self, denomination_id: uuid.UUID) -> Decimal | None:
+        """Value of a denomination without query (None if not loaded yet)"""
+        snapshot = self._snapshot
+        entry = snapshot.by_id.get(denomination_id) if snapshot else None
+        return entry.value if entry else None
+
+    def stats(self) -> dict[str, Any]:
+        size = len(self._snapshot.by_id) if self._snapshot else 0
+        return {
+            "name": self.name,
+            "size": size,
+            "maxsize": size,
+            "ttl": self.ttl,
+            "hits": cache_hits.value(cache=self.name),
+            "misses": cache_misses.value(cache=self.name),
+        }
+
+
+denomination_cache = DenominationCache(settings.DENOMINATION_CACHE_TTL_SECONDS)
+
+
+# A denomination changed with the ORM invalidates the cache once the change is committed
+# (an UPDATE / DELETE statement on the table is seen after the ttl)
+def _denomination_changed(_mapper: Any, _connection: Any, target: Denomination) -> None:
+    session = object_session(target)
+    if session is not None:
+        session.info["denominations_changed"] = True
+
+
+for _event in ("after_insert", "after_update", "after_delete"):
+    event.listen(Denomination, _event, _denomination_changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    if session.info.pop("denominations_changed", False):
+        denomination_cache.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_after_rollback(session: Session) -> None:
+    session.info.pop("denominations_changed", None)
+
+
+async def warm_reference_caches(db: AsyncSession) -> None:
+    """Load the reference data at startup : the first requests don't pay for it"""
+    snapshot = await denomination_cache.load(db)
+    logger.info("%s denominations cached (version %s)", len(snapshot.by_id), snapshot.version)
@@ -0,0 +1,58 @@
+# Loading of the relationships per use of a model.
+# The relationships are loaded lazily by default (and a lazy load can't run in async code) :
+# a query loads the relationships it needs with a profile, e.g
+#   select(User).options(*load_profile(User, "detail"))
+# "list" : what a list of the model needs (no joined collection, the rows are not duplicated)
+# "detail" : what the reading of one item needs
+# to-one relationships are joined, collections are loaded by a second query (selectin)
+# A model gets its profiles with the first manager reading it (no profile : no relationship loaded)
+from sqlalchemy.orm import joinedload, selectinload
+from sqlalchemy.orm.interfaces import LoaderOption
+
+from app.dto.models.models import (
+    CashTransaction,
+    PriceHistory,
+    StockMovement,
+    User,
+)
+
+LOAD_PROFILES: dict[type, dict[str, tuple[LoaderOption, ...]]] = {
+    User: {
+        "list": (),
+        "detail": (selectinload(User.owned_areas), joinedload(User.employee), selectinload(User.roles)),
+    },
+    StockMovement: {
+        "list": (),
+        "detail": (
+            joinedload(StockMovement.created_by),
+            joinedload(StockMovement.initiated_by),
+            joinedload(StockMovement.updated_by),
+            joinedload(StockMovement.sale_details_line),
+            joinedload(StockMovement.purchase_details_line),
+            joinedload(StockMovement.order_details_line),
+        ),
+    },
+    PriceHistory: {
+        "list": (),
+        "detail": (joinedload(PriceHistory.created_by),),
+    },
+    CashTransaction: {
+        "list": (joinedload(CashTransaction.register),),
+        "detail": (
+            joinedload(CashTransaction.register),
+            joinedload(CashTransaction.created_by),
+            joinedload(CashTransaction.updated_by),
+            joinedload(CashTransaction.payments),
+        ),
+    },
+}
+
+
+def load_profile(model: type, name: str) -> tuple[LoaderOption, ...]:
+    """Loader options of the profile of the model (no option for a model without profile)"""
+    profiles = LOAD_PROFILES.get(model)
+    if profiles is None:
+        return ()
+    if name not in profiles:
+        raise KeyError(f"No load profile '{name}' for {model.__name__}")
+    return profiles[name]
@@ -1,6 +1,21 @@
 from enum import Enum as pyEnum
 import uuid
-from sqlalchemy import Column, Integer, ForeignKey, DateTime, Numeric, String, Enum as sqlEnum, Table, Text
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Integer,
+    ForeignKey,
+    DateTime,
+    Index,
+    LargeBinary,
+    Numeric,
+    String,
+    Enum as sqlEnum,
+    Table,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.dialects.postgresql import UUID
 from app.core.database import Base
 from sqlalchemy.orm import relationship, Mapped, mapped_column, validates
@@ -33,6 +48,44 @@ class Area(Base):
     log = relationship("Log", back_populates="area")
 
 
+# Number of rows of a table for an area (e.g name "product"), kept up to date by a trigger of the table :
+# the total of a list is read on one row instead of counting the rows of the area
+class AreaCounter(Base):
+    __tablename__ = "area_counter"
+    area_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("area.id", ondelete="CASCADE"), primary_key=True
+    )
+    name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
+# Response of a write request sent with an Idempotency-Key header : a retry of the request gets
+# this response again instead of being executed twice (see app.core.idempotency)
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_key"
+    # id of the user who sent the key (sub of the access token) : a key is only seen by this user
+    scope: Mapped[str] = mapped_column(String(64), primary_key=True)
+    key: Mapped[str] = mapped_column(String(255), primary_key=True)
+    # hash of the request (method, path, body) : the key can't be reused for another request
+    fingerprint: Mapped[str] = mapped_column(String(64), nullable=False)
+    # None while the first request is processed
+    status_code: Mapped[int | None] = mapped_column(Integer)
+    content_type: Mapped[str | None] = mapped_column(String(255))
+    response_body: Mapped[bytes | None] = mapped_column(LargeBinary)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+
+
+# Version of the product catalog of an area, incremented in the transaction of each change of a product
+# or a category : each worker compares it with the version of its cache of the catalog
+class CatalogVersion(Base):
+    __tablename__ = "catalog_version"
+    area_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("area.id", ondelete="CASCADE"), primary_key=True
+    )
+    version: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
+
 class Employee(Base):
     __tablename__ = "employee"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
@@ -146,7 +199,7 @@ class User(Base):
     cash_register: Mapped[Optional["CashAccount"]] = relationship(back_populates="user")
 
     # role assigned for user (one or more role). ex : manager, account, saler, logistician,..
-    roles: Mapped[List["Role"]] = relationship(secondary="user_roles", back_populates="users", lazy="joined")
+    roles: Mapped[List["Role"]] = relationship(secondary="user_roles", back_populates="users")
 
 
 class Role(Base):
@@ -192,6 +245,24 @@ class ProductCreationState(pyEnum):
 
 class Product(Base):
     __tablename__ = "product"
+    __table_args__ = (
+        # scan at the till : product of an area by its reference (barcode)
+        UniqueConstraint("area_id", "reference", name="uq_product_area_reference"),
+        # search of the products (ILIKE '%...%' and similarity), extension pg_trgm
+        Index("ix_product_name_trgm", "name", postgresql_using="gin", postgresql_ops={"name": "gin_trgm_ops"}),
+        Index(
+            "ix_product_reference_trgm",
+            "reference",
+            postgresql_using="gin",
+            postgresql_ops={"reference": "gin_trgm_ops"},
+        ),
+        Index(
+            "ix_product_description_trgm",
+            "description",
+            postgresql_using="gin",
+            postgresql_ops={"description": "gin_trgm_ops"},
+        ),
+    )
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     reference: Mapped[str] = mapped_column(String(50), index=True)
     name: Mapped[str] = mapped_column(String(50), index=True)
@@ -226,6 +297,13 @@ class ProductCategory(Base):
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     cat_name = Column(String, index=True)
     area_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("area.id"), nullable=False)
+    __table_args__ = (
+        Index(
+            "ix_category_cat_name_trgm", "cat_name", postgresql_using="gin", postgresql_ops={"cat_name": "gin_trgm_ops"}
+        ),
+        # the names of the categories are compared in lower case : one category per name in an area
+        Index("uq_category_area_lower_name", "area_id", func.lower(cat_name), unique=True),
+    )
 
     area = relationship("Area", back_populates="product_category")
     product = relationship("Product", back_populates="product_category")
@@ -243,7 +321,7 @@ class PriceHistory(Base):
 
     product: Mapped[Product] = relationship(back_populates="price_history", uselist=False)
     created_by: Mapped[User] = relationship(
-        back_populates="price_history", foreign_keys="PriceHistory.created_by_id", lazy="joined", uselist=False
+        back_populates="price_history", foreign_keys="PriceHistory.created_by_id", uselist=False
     )
 
     product: Mapped[Product] = relationship(back_populates="price_history")
@@ -296,6 +374,8 @@ class MovementOperation(str, pyEnum):
 
 class StockMovement(Base):
     __tablename__ = "stock_movement"
+    # history of stock of a product in an area between two dates
+    __table_args__ = (Index("ix_stock_movement_area_product_dateof", "area_id", "product_id", "dateOf"),)
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     area_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("area.id"), nullable=False)
     product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("product.id"), nullable=False)
@@ -325,14 +405,14 @@ class StockMovement(Base):
 
     # relationship to the user who created the transaction
     created_by: Mapped[User] = relationship(
-        back_populates="stock_movement_created", foreign_keys="StockMovement.created_by_id", lazy="joined"
+        back_populates="stock_movement_created", foreign_keys="StockMovement.created_by_id"
     )
     initiated_by: Mapped[Employee] = relationship(
-        back_populates="stock_movement_initiated", foreign_keys="StockMovement.initiated_by_id", lazy="joined"
+        back_populates="stock_movement_initiated", foreign_keys="StockMovement.initiated_by_id"
     )
     # relationship to the user who canceled the transaction
     updated_by: Mapped[Optional[User]] = relationship(
-        back_populates="stock_movement_updated", foreign_keys="StockMovement.updated_by_id", lazy="joined"
+        back_populates="stock_movement_updated", foreign_keys="StockMovement.updated_by_id"
     )
 
     # Optionnal FK and relationship
@@ -347,14 +427,12 @@ class StockMovement(Base):
         UUID(as_uuid=True), ForeignKey("order_detail_line.id")
     )
 
-    sale_details_line: Mapped[Optional["SaleDetailLine"]] = relationship(
-        back_populates="stock_movement", uselist=False, lazy="joined"
-    )
+    sale_details_line: Mapped[Optional["SaleDetailLine"]] = relationship(back_populates="stock_movement", uselist=False)
     purchase_details_line: Mapped[Optional["PurchaseRequestDetailsLine"]] = relationship(
-        back_populates="stock_movement", uselist=False, lazy="joined"
+        back_populates="stock_movement", uselist=False
     )
     order_details_line: Mapped[Optional["OrderDetailsLine"]] = relationship(
-        back_populates="stock_movement", uselist=False, lazy="joined"
+        back_populates="stock_movement", uselist=False
     )
 
     @validates("operation", "direction")
@@ -376,6 +454,37 @@ class StockMovement(Base):
         return value  # type: ignore
 
 
+# Running balance of stock per area, product and lot (stock without lot has lot_id at NULL)
+# updated in the same transaction as each stock movement : the current stock is one row to read
+class StockBalance(Base):
+    __tablename__ = "stock_balance"
+    __table_args__ = (UniqueConstraint("area_id", "product_id", "lot_id", postgresql_nulls_not_distinct=True),)
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    area_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("area.id"), nullable=False)
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("product.id"), nullable=False)
+    lot_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("lot.id"))
+    quantity: Mapped[float] = mapped_column(Numeric(18, 2), default=0)
+    # real date of the most recent movement applied
+    last_movement_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+
+# Stock per area, product and lot at a date (e.g end of day), taken periodically.
+# The stock at any date is the last snapshot before it plus the movements since the snapshot
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshot"
+    __table_args__ = (
+        UniqueConstraint("area_id", "product_id", "lot_id", "snapshot_at", postgresql_nulls_not_distinct=True),
+    )
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    area_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("area.id"), nullable=False)
+    product_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("product.id"), nullable=False)
+    lot_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("lot.id"))
+    # the snapshot contains all movements with a real date before or equal this one
+    snapshot_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    quantity: Mapped[float] = mapped_column(Numeric(18, 2), default=0)
+
+
 class Invotory(Base):
     __tablename__ = "inventory"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
@@ -426,11 +535,9 @@ class Sale(Base):
     customer: Mapped["Customer"] = relationship(back_populates="sale")
 
     created_by: Mapped[User] = relationship(
-        back_populates="sale_created", foreign_keys="Sale.created_by_id", lazy="joined", uselist=False
-    )
-    updated_by: Mapped[Optional[User]] = relationship(
-        back_populates="sale_updated", foreign_keys="Sale.updated_by_id", lazy="joined"
+        back_populates="sale_created", foreign_keys="Sale.created_by_id", uselist=False
     )
+    updated_by: Mapped[Optional[User]] = relationship(back_populates="sale_updated", foreign_keys="Sale.updated_by_id")
 
     details: Mapped[List["SaleDetailLine"]] = relationship(back_populates="sale", cascade="all, delete-orphan")
 
@@ -438,7 +545,7 @@ class Sale(Base):
     def total_amount(self):
         return sum(detail.value for detail in self.details)
 
-    payments: Mapped["Payment"] = relationship(back_populates="sale", lazy="joined")
+    payments: Mapped["Payment"] = relationship(back_populates="sale")
 
 
 class SaleDetailLine(Base):
@@ -471,7 +578,7 @@ class Customer(Base):
     area = relationship("Area", back_populates="customer")
     sale = relationship("Sale", back_populates="customer")
     order_initiated: Mapped[Optional[List["Order"]]] = relationship(
-        back_populates="initiated_by", foreign_keys="Order.initiated_by_id", lazy="joined"
+        back_populates="initiated_by", foreign_keys="Order.initiated_by_id"
     )
     invoice = relationship("Invoice", back_populates="customer", cascade="all, delete-orphan")
 
@@ -511,16 +618,15 @@ class PurchaseRequest(Base):
     initiated_by: Mapped[Employee] = relationship(
         back_populates="purchase_initiated",
         foreign_keys="PurchaseRequest.initiated_by_id",
-        lazy="joined",
         uselist=False,
     )
     created_by: Mapped[User] = relationship(
-        back_populates="purchase_created", foreign_keys="PurchaseRequest.created_by_id", lazy="joined", uselist=False
+        back_populates="purchase_created", foreign_keys="PurchaseRequest.created_by_id", uselist=False
     )
     updated_by: Mapped[Optional[User]] = relationship(
-        back_populates="purchase_updated", foreign_keys="PurchaseRequest.updated_by_id", lazy="joined"
+        back_populates="purchase_updated", foreign_keys="PurchaseRequest.updated_by_id"
     )
-    invoice: Mapped[Optional[List["Invoice"]]] = relationship(back_populates="purchase", lazy="joined")
+    invoice: Mapped[Optional[List["Invoice"]]] = relationship(back_populates="purchase")
 
     @property
     def total_amount(self):
@@ -571,15 +677,15 @@ class Order(Base):
     details: Mapped[List["OrderDetailsLine"]] = relationship(back_populates="order", cascade="all, delete-orphan")
 
     initiated_by: Mapped[Customer] = relationship(
-        back_populates="order_initiated", foreign_keys="Order.initiated_by_id", lazy="joined", uselist=False
+        back_populates="order_initiated", foreign_keys="Order.initiated_by_id", uselist=False
     )
     created_by: Mapped[User] = relationship(
-        back_populates="order_created", foreign_keys="Order.created_by_id", lazy="joined", uselist=False
+        back_populates="order_created", foreign_keys="Order.created_by_id", uselist=False
     )
     updated_by: Mapped[Optional[User]] = relationship(
-        back_populates="order_updated", foreign_keys="Order.updated_by_id", lazy="joined"
+        back_populates="order_updated", foreign_keys="Order.updated_by_id"
     )
-    invoice: Mapped[Optional[List["Invoice"]]] = relationship(back_populates="order", lazy="joined")
+    invoice: Mapped[Optional[List["Invoice"]]] = relationship(back_populates="order")
 
     @property
     def total_amount(self):
@@ -654,19 +760,18 @@ class Payment(Base):
     state: Mapped["TransactionState"] = mapped_column(sqlEnum(TransactionState), nullable=False)
     direction: Mapped["TransactionType"] = mapped_column(sqlEnum(TransactionType), nullable=False)
     sale_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("sale.id"), nullable=False)
-    invoice_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("invoice.id"), nullable=False)
+    # None : payment of a sale at the counter, without invoice
+    invoice_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("invoice.id"), nullable=True)
     # Optional FK if the payment is linked to a cash transaction
     # If the payment is not linked to a cash transaction, this can be None
     cash_transac_id: Mapped[uuid.UUID | None] = mapped_column(
         UUID(as_uuid=True), ForeignKey("cash_transaction.id"), nullable=True
     )
 
-    cash_transaction: Mapped[Optional["CashTransaction"]] = relationship(
-        back_populates="payments", uselist=False, lazy="joined"
-    )
+    cash_transaction: Mapped[Optional["CashTransaction"]] = relationship(back_populates="payments", uselist=False)
     # Reverse relation from sale, payment
-    sale: Mapped[Optional["Sale"]] = relationship(back_populates="payments", uselist=False, lazy="joined")
-    invoice: Mapped[Optional[List["Invoice"]]] = relationship(back_populates="payments", uselist=False, lazy="joined")
+    sale: Mapped[Optional["Sale"]] = relationship(back_populates="payments", uselist=False)
+    invoice: Mapped[Optional[List["Invoice"]]] = relationship(back_populates="payments", uselist=False)
 
 
 # This is used to indicate the direction of the transaction
@@ -708,6 +813,8 @@ class CashTransaction(Base):
     """
 
     __tablename__ = "cash_transaction"
+    # transactions of a register for a day
+    __table_args__ = (Index("ix_cash_transaction_register_dateof", "register_id", "dateOf"),)
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
     direction: Mapped[TransactionDirection] = mapped_column(sqlEnum(TransactionDirection), nullable=False)
     operation: Mapped[TransactionPurpose] = mapped_column(sqlEnum(TransactionPurpose), nullable=False)
@@ -731,22 +838,20 @@ class CashTransaction(Base):
     )
 
     # Relationships
-    register: Mapped["CashAccount"] = relationship(back_populates="transactions", lazy="joined", uselist=False)
+    register: Mapped["CashAccount"] = relationship(back_populates="transactions", uselist=False)
     details: Mapped[List["CashTransactionDetailsLine"]] = relationship(
         back_populates="transaction", cascade="all, delete-orphan"
     )
     # relationship to the user who created the transaction
     created_by: Mapped["User"] = relationship(
-        back_populates="transaction_created", foreign_keys="CashTransaction.created_by_id", lazy="joined"
+        back_populates="transaction_created", foreign_keys="CashTransaction.created_by_id"
     )
     # relationship to the user who canceled the transaction
     updated_by: Mapped[Optional["User"]] = relationship(
-        back_populates="transaction_updated", foreign_keys="CashTransaction.updated_by_id", lazy="joined"
+        back_populates="transaction_updated", foreign_keys="CashTransaction.updated_by_id"
     )
     # relationship to the payment if it exists
-    payments: Mapped[Optional["Payment"]] = relationship(
-        back_populates="cash_transaction", uselist=False, lazy="joined"
-    )
+    payments: Mapped[Optional["Payment"]] = relationship(back_populates="cash_transaction", uselist=False)
 
     # --- Useful helper ---
     @property
@@ -768,7 +873,7 @@ class CashTransaction(Base):
     def total_amount(self):
         """get the amount of transaction"""
         """Amount of the transaction (can be positive or negative depending on the direction)"""
-        amount = sum(detail.value for detail in self.details)
+        amount = sum(detail.amount for detail in self.details)
         if self.direction == TransactionDirection.OUT:
             amount = amount * (-1)
         return amount
@@ -805,8 +910,9 @@ class CashTransaction(Base):
 class CashTransactionDetailsLine(Base):
     __tablename__ = "transaction_details_line"
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, index=True, default=uuid.uuid4)
+    # one line per denomination of the transaction
     transac_id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), ForeignKey("cash_transaction.id"), nullable=False, unique=True
+        UUID(as_uuid=True), ForeignKey("cash_transaction.id"), nullable=False, index=True
     )
     denomination_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True), ForeignKey("denomination.id"), nullable=False
@@ -818,7 +924,16 @@ class CashTransactionDetailsLine(Base):
 
     @property
     def amount(self):
-        return self.quantity * self.denomination.value
+        return self.quantity * _denomination_value(self)
+
+
+# value of the denomination of a line, read from the cache of the denominations (no lazy load),
+# from the relationship if the cache is not loaded
+def _denomination_value(line: "CashTransactionDetailsLine | CashAdjustementLine"):
+    from app.dto.crud.reference_cache import denomination_cache
+
+    value = denomination_cache.value(line.denomination_id)
+    return line.denomination.value if value is None else value
 
 
 # This class represent a bank billet
@@ -848,6 +963,9 @@ class CashAccount(Base):
     area_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("area.id"))
     # amount edited by employee during balancing
     balancing_amount: Mapped[float] = mapped_column(Numeric(18, 2))
+    # cash expected in the register : amount_init + completed transactions in - out,
+    # updated when a transaction is completed or canceled (no sum of the transactions at balancing)
+    running_balance: Mapped[float] = mapped_column(Numeric(18, 2), default=0, server_default="0", nullable=False)
 
     # Relationship
     adjustement: Mapped["CashAdjustement"] = relationship(
@@ -860,6 +978,26 @@ class CashAccount(Base):
     user: Mapped["User"] = relationship(back_populates="cash_register")
     area: Mapped["Area"] = relationship(back_populates="cash_register")
 
+    @validates("amount_init")
+    def validate_amount_init(self, key, value):  # type: ignore
+        """A new register starts with its initial amount as balance"""
+        if self.running_balance is None:
+            self.running_balance = value
+        return value  # type: ignore
+
+
+# Number of notes / coins of each denomination expected in a register, updated with CashAccount.running_balance
+# (counted at the opening, FinanceManager.open_register, then the lines of the completed transactions)
+class CashAccountDenomination(Base):
+    __tablename__ = "cash_account_denomination"
+    register_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("cash_account.id", ondelete="CASCADE"), primary_key=True
+    )
+    denomination_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("denomination.id"), primary_key=True
+    )
+    quantity: Mapped[int] = mapped_column(BigInteger, default=0, nullable=False)
+
 
 class CashAdjustement(Base):
     __tablename__ = "cash_adjustement"
@@ -869,6 +1007,10 @@ class CashAdjustement(Base):
     typeOf: Mapped["CashAdjustementType"] = mapped_column(
         sqlEnum(CashAdjustementType), nullable=False
     )  # reason for adjustment : opening, closing, correction
+    # balancing : cash expected (running balance of the register), counted, and counted - expected
+    expected_amount: Mapped[float | None] = mapped_column(Numeric(18, 2))
+    counted_amount: Mapped[float | None] = mapped_column(Numeric(18, 2))
+    difference: Mapped[float | None] = mapped_column(Numeric(18, 2))
     dateof: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
     )
@@ -876,7 +1018,7 @@ class CashAdjustement(Base):
     # Relationship
     cash_register: Mapped["CashAccount"] = relationship(back_populates="adjustement")
     performed_by: Mapped["User"] = relationship(
-        back_populates="adjustements_done", foreign_keys="CashAdjustement.performed_by_id", lazy="joined"
+        back_populates="adjustements_done", foreign_keys="CashAdjustement.performed_by_id"
     )
     details: Mapped[List["CashAdjustementLine"]] = relationship(
         back_populates="adjustement", cascade="all, delete-orphan"
@@ -884,7 +1026,7 @@ class CashAdjustement(Base):
 
     @property
     def total_amount(self) -> float:
-        return sum(detail.value for detail in self.details)
+        return sum(detail.amount for detail in self.details)
 
 
 # e.g : 20.000 * 5
@@ -904,7 +1046,7 @@ class CashAdjustementLine(Base):
 
     @property
     def amount(self):
-        return self.quantity * self.denomination.value
+        return self.quantity * _denomination_value(self)
 
 
 # Represents an invoice for purchases or sales
@@ -942,16 +1084,16 @@ class Invoice(Base):
     purchase: Mapped[Optional[PurchaseRequest]] = relationship(back_populates="invoice", uselist=False)
     order: Mapped[Optional[Order]] = relationship(back_populates="invoice", uselist=False)
     # payment is optional, if invoice is not paid yet
-    payments: Mapped[Optional[Payment]] = relationship(back_populates="invoice", lazy="joined")
+    payments: Mapped[Optional[Payment]] = relationship(back_populates="invoice")
 
     initiated_by: Mapped[Employee] = relationship(
-        back_populates="invoice_initiated", foreign_keys="Invoice.initiated_by_id", lazy="joined", uselist=False
+        back_populates="invoice_initiated", foreign_keys="Invoice.initiated_by_id", uselist=False
     )
     created_by: Mapped[User] = relationship(
-        back_populates="invoice_created", foreign_keys="Invoice.created_by_id", lazy="joined", uselist=False
+        back_populates="invoice_created", foreign_keys="Invoice.created_by_id", uselist=False
     )
     updated_by: Mapped[Optional[User]] = relationship(
-        back_populates="invoice_updated", foreign_keys="Invoice.updated_by_id", lazy="joined"
+        back_populates="invoice_updated", foreign_keys="Invoice.updated_by_id"
     )
 
     details: Mapped[List["InvoiceDetailsLine"]] = relationship(back_populates="invoice", cascade="all, delete-orphan")
@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 import uuid
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class PaymentBase(BaseModel):
@@ -111,3 +111,106 @@ class DenominationRead(DenominationBase):
     id: uuid.UUID
 
     model_config = {"from_attributes": True}
+
+
+class DenominationTotalRead(BaseModel):
+    denomination_id: uuid.UUID
+    name: str
+    value: float
+    currency: str
+    quantity_in: int
+    quantity_out: int
+    amount_in: float
+    amount_out: float
+
+
+class RegisterDailyTotalsRead(BaseModel):
+    register_id: uuid.UUID
+    area_id: uuid.UUID | None
+    dateof: date
+    amount_init: float
+    total_in: float
+    total_out: float
+    net: float
+    # amount_init + total_in - total_out : what should be in the register
+    theoretical_amount: float
+    denominations: list[DenominationTotalRead]
+
+
+class RegisterStatisticRead(BaseModel):
+    status: str
+    direction: str
+    operation: str
+    count: int
+    amount: float
+
+
+class RegisterStatisticsRead(BaseModel):
+    register_id: uuid.UUID
+    date_begin: date
+    date_end: date
+    # one line per status x direction x purpose having transactions
+    groups: list[RegisterStatisticRead]
+    count: int
+
+
+class DenominationCountRead(BaseModel):
+    denomination_id: uuid.UUID
+    quantity: int
+
+
+class RegisterBalanceRead(BaseModel):
+    register_id: uuid.UUID
+    # cash expected in the register
+    running_balance: float
+    denominations: list[DenominationCountRead]
+
+
+class TransactionCashStateRead(BaseModel):
+    transaction_id: uuid.UUID
+    register_id: uuid.UUID
+    status: str
+    # balance of the register after the change
+    running_balance: float
+
+
+class CashCountLine(BaseModel):
+    denomination_id: uuid.UUID
+    quantity: int = Field(ge=0)
+
+
+class RegisterBalancingCreate(BaseModel):
+    # notes / coins counted in the register
+    lines: list[CashCountLine]
+
+
+class RegisterOpeningCreate(BaseModel):
+    area_id: uuid.UUID
+    # notes / coins put in the register at the opening
+    lines: list[CashCountLine]
+
+
+class RegisterOpeningRead(BaseModel):
+    register_id: uuid.UUID
+    area_id: uuid.UUID
+    state: str
+    amount_init: float
+    denominations: list[DenominationCountRead]
+
+
+class DenominationBalancingRead(BaseModel):
+    denomination_id: uuid.UUID
+    name: str
+    value: float
+    expected_quantity: int
+    counted_quantity: int
+
+
+class RegisterBalancingRead(BaseModel):
+    register_id: uuid.UUID
+    state: str
+    expected_amount: float
+    counted_amount: float
+    # counted - expected : negative when cash is missing
+    difference: float
+    denominations: list[DenominationBalancingRead]
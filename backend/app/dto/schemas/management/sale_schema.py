@@ -0,0 +1,41 @@
+import uuid
+
+from pydantic import BaseModel, Field
+
+from app.dto.schemas.finance.cash_schema import CashCountLine
+
+
+class SaleCheckoutLine(BaseModel):
+    product_id: uuid.UUID
+    quantity: int = Field(gt=0)
+    # None : sale price of the product
+    unit_price: float | None = Field(default=None, ge=0)
+
+
+class SalePaymentCreate(BaseModel):
+    method: str  # card, check, cash, wire
+    reference: str | None = None
+    # cash payment : register receiving the money, notes / coins given by the customer (cash_lines)
+    # and taken from the register to give the change back (change_lines).
+    # cash_lines - change_lines is the amount of the sale
+    register_id: uuid.UUID | None = None
+    cash_lines: list[CashCountLine] = []
+    change_lines: list[CashCountLine] = []
+
+
+class SaleCheckoutCreate(BaseModel):
+    area_id: uuid.UUID
+    customer_id: uuid.UUID
+    # None : generated
+    reference: str | None = Field(default=None, max_length=255)
+    lines: list[SaleCheckoutLine] = Field(min_length=1, max_length=500)
+    payment: SalePaymentCreate
+
+
+class SaleCheckoutRead(BaseModel):
+    sale_id: uuid.UUID
+    reference: str
+    amount: float
+    payment_id: uuid.UUID
+    cash_transaction_id: uuid.UUID | None = None
+    stock_movement_ids: list[uuid.UUID]
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List
 import uuid
-from pydantic import BaseModel, ConfigDict, EmailStr
+from pydantic import BaseModel, ConfigDict, EmailStr, model_validator
 from typing import Optional
 
 
@@ -40,7 +40,7 @@ class AreaDetails(AreaBase):
 class RoleBase(BaseModel):
     name: str
     description: str | None
-    permission: List[str] | None
+    permission: List[str] | None = None
 
 
 class RoleCreate(RoleBase):
@@ -73,7 +73,7 @@ class EmployeeUpdate(BaseModel):
 class EmployeeRead(EmployeeBase):
     id: uuid.UUID
     area_id: uuid.UUID
-    user_id: uuid.UUID | None
+    user_id: uuid.UUID | None = None
     model_config = {"from_attributes": True}
 
 
@@ -123,6 +123,28 @@ class UserRead(UserBase):
     model_config = {"from_attributes": True}
 
 
+class UserPrincipal(UserRead):
+    """Authenticated user.
+    area_scope is the set of areas the user can access, computed once at authentication
+    (None for a superuser, who can access all areas)
+    """
+
+    area_scope: frozenset[uuid.UUID] | None = None
+
+    @model_validator(mode="after")
+    def _compute_area_scope(self) -> "UserPrincipal":
+        if self.is_superuser:
+            self.area_scope = None
+        elif self.area_scope is None:
+            scope: set[uuid.UUID] = set()
+            if self.is_owner and self.owned_areas:
+                scope.update(area.id for area in self.owned_areas)
+            if self.employee and self.employee.area_id:
+                scope.add(self.employee.area_id)
+            self.area_scope = frozenset(scope)
+        return self
+
+
 class UsersRead(BaseModel):
     data: list[UserRead]
     count: int
@@ -134,6 +156,7 @@ class OwnersRead(BaseModel):
     total: int
     total_active: int
     total_pos: int
+    next_cursor: str | None = None
     model_config = {"from_attributes": True}
 
 
@@ -152,6 +175,7 @@ class UserPublic(UserBase):
 class UsersPublic(BaseModel):
     data: list[UserPublic]
     count: int
+    next_cursor: str | None = None
     model_config = {"from_attributes": True}
 
 
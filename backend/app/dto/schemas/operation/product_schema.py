@@ -49,6 +49,35 @@ class ProductRead(ProductManagementBase):
     model_config = {"from_attributes": True}
 
 
+# product scanned at the till : price and stock on hand
+class ProductScanRead(BaseModel):
+    id: uuid.UUID
+    reference: str
+    name: str
+    sale_price: float
+    actual_stock: float | None
+    state: ProductCreationState
+
+    model_config = {"from_attributes": True}
+
+
+class ProductImportError(BaseModel):
+    # line of the file (1 : header)
+    row: int
+    reference: str | None = None
+    errors: list[str]
+
+
+class ProductImportRead(BaseModel):
+    rows: int
+    created: int
+    error_count: int
+    # the first errors only
+    errors: list[ProductImportError]
+    duration_seconds: float
+    rows_per_second: float
+
+
 class ProductDashbordRead(ProductManagementBase):
     id: uuid.UUID
     state: ProductCreationState
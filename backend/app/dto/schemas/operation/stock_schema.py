@@ -1,18 +1,18 @@
 import uuid
-from pydantic import BaseModel
-from typing import Optional
 from datetime import datetime
 
+from pydantic import BaseModel, Field
+
 
 class StockMovementBase(BaseModel):
     area_id: uuid.UUID
     product_id: uuid.UUID
-    product_lot_id: Optional[uuid.UUID] = None  # optional
+    product_lot_id: uuid.UUID | None = None  # optional
     direction: str
     operation: str
-    dateof: datetime | None
-    quantity: Optional[int] = None
-    comment: Optional[str] = None
+    dateof: datetime | None = None  # None : dated when saved
+    quantity: int | None = None
+    comment: str | None = None
 
 
 class StockMovementCreate(StockMovementBase):
@@ -21,10 +21,20 @@ class StockMovementCreate(StockMovementBase):
     operation_id: uuid.UUID  # Represent a sale_id or a purchase_id who enclenched the movement in stock
 
 
+class StockMovementBatchCreate(BaseModel):
+    # lines of a goods receipt, an inventory ... saved together or not at all
+    movements: list[StockMovementCreate] = Field(min_length=1, max_length=1000)
+
+
+class StockMovementBatchRead(BaseModel):
+    created: int
+    ids: list[uuid.UUID]
+
+
 class StockMovementUpdate(BaseModel):
     area_id: uuid.UUID | None
     product_id: uuid.UUID | None
-    product_lot_id: Optional[uuid.UUID] = None  # optional
+    product_lot_id: uuid.UUID | None = None  # optional
     direction: str | None
     operation: str | None
     quantity: int | None
@@ -55,6 +65,20 @@ class StockMovementReadUpdate(StockMovementBase):
     model_config = {"from_attributes": True}
 
 
+class StockLevelRead(BaseModel):
+    area_id: uuid.UUID
+    product_id: uuid.UUID
+    lot_id: uuid.UUID | None = None  # None : all lots of the product
+    dateof: datetime | None = None  # None : current stock
+    quantity: float
+
+
+class StockSnapshotRead(BaseModel):
+    area_id: uuid.UUID
+    snapshot_at: datetime
+    saved: int  # number of (product, lot) saved
+
+
 class InvotoryBase(BaseModel):
     area_id: uuid.UUID
     product_id: uuid.UUID
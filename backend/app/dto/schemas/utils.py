@@ -1,5 +1,9 @@
+from typing import Any, Generic, TypeVar
+
 from pydantic import BaseModel
 
+T = TypeVar("T")
+
 
 class TokenPayload(BaseModel):
     sub: str | None = None
@@ -8,3 +12,30 @@ class TokenPayload(BaseModel):
 class Sort(BaseModel):
     colum: str | None
     direction: str
+
+
+class CursorPage(BaseModel, Generic[T]):
+    data: list[T]
+    # to pass as cursor to get the next page, None on the last page
+    next_cursor: str | None = None
+    # number of items of all the pages
+    total: int | None = None
+
+
+class PoolStatus(BaseModel):
+    worker_pid: int
+    pool_size: int
+    max_overflow: int
+    checked_out: int
+    checked_in: int
+    overflow: int
+    metrics: dict[str, Any]
+
+
+class CacheStats(BaseModel):
+    name: str
+    size: int
+    maxsize: int
+    ttl: float
+    hits: float
+    misses: float
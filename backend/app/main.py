@@ -6,10 +6,19 @@ import sentry_sdk
 from app.core.config import settings
 from app.initial_data import main
 from app.api.main import api_router
+from app.core.security import shutdown_hash_pool
+from app.core.database import AsyncSessionLocal, engine
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.query_monitor import QueryMonitorMiddleware
+from app.core.metrics import write_worker_snapshot
+from app.core.request_metrics import RequestMetricsMiddleware, flush_worker_metrics
+from app.dto.crud.catalog_cache import warm_catalog_cache
+from app.dto.crud.reference_cache import warm_reference_caches
 
 
 from contextlib import asynccontextmanager
 
+import logging
 import sys
 import asyncio
 
@@ -18,6 +27,9 @@ if sys.platform.startswith("win"):
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
 
+logger = logging.getLogger(__name__)
+
+
 def custom_generate_unique_id(route: APIRoute) -> str:
     return f"{route.tags[0]}-{route.name}"
 
@@ -25,7 +37,19 @@ def custom_generate_unique_id(route: APIRoute) -> str:
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await main()
+    try:
+        async with AsyncSessionLocal() as session:
+            await warm_reference_caches(session)
+            await warm_catalog_cache(session)
+    except Exception as e:
+        # loaded by the first request using it
+        logger.error("reference caches not loaded: %s", e)
+    flush = asyncio.create_task(flush_worker_metrics(settings.METRICS_DIR, settings.METRICS_FLUSH_SECONDS))
     yield
+    flush.cancel()
+    # last values of the counters of this worker
+    write_worker_snapshot(settings.METRICS_DIR)
+    shutdown_hash_pool()
 
 
 if settings.SENTRY_DSN and settings.ENVIRONMENT != "local":
@@ -43,6 +67,15 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+# retries of the write requests sent with an Idempotency-Key header (routes marked @idempotent),
+# added before CORS : the middleware added last is the outermost, the replayed responses get the CORS headers too
+app.add_middleware(
+    IdempotencyMiddleware,
+    router=app.router,
+    session_factory=AsyncSessionLocal,
+    ttl=settings.IDEMPOTENCY_TTL_SECONDS,
+    lock_timeout=settings.IDEMPOTENCY_LOCK_SECONDS,
+)
 if settings.all_cors_origins:
     app.add_middleware(
         CORSMiddleware,
@@ -51,5 +84,14 @@ if settings.all_cors_origins:
         allow_methods=["*"],
         allow_headers=["*"],
     )
+if settings.QUERY_MONITOR_ENABLED:
+    app.add_middleware(
+        QueryMonitorMiddleware,
+        engine=engine,
+        max_statements=settings.QUERY_MONITOR_MAX_STATEMENTS,
+        max_duplicates=settings.QUERY_MONITOR_MAX_DUPLICATES,
+        raise_on_excess=settings.QUERY_MONITOR_RAISE,
+    )
+app.add_middleware(RequestMetricsMiddleware, engine=engine)
 # Include your routers here
 app.include_router(api_router, prefix=settings.API_V01_STR)
@@ -0,0 +1,56 @@
+# This script closes the registers of every area at the end of the day : the amount counted by the employee
+# (balancing of the register) is compared with the expected amount of each register open or counted during the day.
+# It is made to be launched every night (e.g by a cron job) : python app/register_closing.py
+import asyncio
+import logging
+import sys
+
+from sqlalchemy import select
+
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def main():
+    from app.core.config import settings
+    from app.core.database import AsyncSessionLocal
+    from app.dto.crud.finance_crud import FinanceManager
+    from app.dto.models.models import User
+
+    # the adjustements of the job are recorded as performed by the first superuser
+    async with AsyncSessionLocal() as session:
+        statement = select(User.id).where(User.email == settings.FIRST_SUPERUSER)
+        performed_by_id = (await session.execute(statement)).scalar_one()
+
+    logger.info("Closing the registers (%s areas at a time)", settings.REGISTER_CLOSING_CONCURRENCY)
+    report = await FinanceManager.close_registers(
+        AsyncSessionLocal, performed_by_id, concurrency=settings.REGISTER_CLOSING_CONCURRENCY
+    )
+    for area in report["areas"]:
+        if "error" in area:
+            logger.error("Area %s : failed in %.3fs : %s", area["area_id"], area["duration"], area["error"])
+        else:
+            logger.info(
+                "Area %s : %s registers closed (%s balanced, %s not balanced), expected %s, counted %s, in %.3fs",
+                area["area_id"],
+                area["closed"],
+                area["balanced"],
+                area["not_balanced"],
+                area["expected_amount"],
+                area["counted_amount"],
+                area["duration"],
+            )
+    logger.info(
+        "%s registers closed in %.3fs (%.1f registers/s), %s areas failed",
+        report["closed"],
+        report["duration"],
+        report["throughput"],
+        report["failed"],
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
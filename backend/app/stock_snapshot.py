@@ -0,0 +1,40 @@
+# This script saves the stock of every area at the end of the previous day.
+# It is made to be launched every night (e.g by a cron job) : python app/stock_snapshot.py
+import asyncio
+import datetime
+import logging
+import sys
+
+from sqlalchemy import select
+
+if sys.platform.startswith("win"):
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def snapshot_all_areas(snapshot_at: datetime.datetime):
+    from app.core.database import AsyncSessionLocal
+    from app.dto.crud.operation_crud import StockLedgerManager
+    from app.dto.models.models import Area
+
+    async with AsyncSessionLocal() as session:
+        area_ids = (await session.execute(select(Area.id))).scalars().all()
+        ledger = StockLedgerManager(session)
+        for area_id in area_ids:
+            saved = await ledger.take_snapshot(area_id, snapshot_at)
+            logger.info("Area %s : stock of %s products saved", area_id, saved)
+
+
+async def main():
+    # end of the previous day
+    today = datetime.datetime.now(datetime.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+    snapshot_at = today - datetime.timedelta(microseconds=1)
+    logger.info("Saving stock snapshots at %s", snapshot_at)
+    await snapshot_all_areas(snapshot_at)
+    logger.info("Stock snapshots saved")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
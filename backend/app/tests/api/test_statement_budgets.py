@@ -0,0 +1,51 @@
+# Number of SQL statements sent by the main endpoints : a relationship loaded lazily or a query
+# run per row shows up here as a budget exceeded (the statements sent are listed in the error).
+# Each endpoint is called once before being counted : the user and the catalog are then cached,
+# like in production after the first request.
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.query_counter import count_statements
+
+API = settings.API_V01_STR
+
+
+def _history_params(data: dict[str, Any]) -> dict[str, str]:
+    now = datetime.now(timezone.utc)
+    return {
+        "area_id": str(data["area_id"]),
+        "date_begin": (now - timedelta(days=1)).isoformat(),
+        "date_end": (now + timedelta(days=1)).isoformat(),
+    }
+
+
+# path, query parameters, statements allowed
+ENDPOINTS = [
+    ("/unit/users/list/admin", lambda data: {}, 1),
+    ("/stock/{movement_id}", lambda data: {}, 1),
+    ("/stock/product/{product_id}/history", _history_params, 1),
+    ("/product/scan/{area_id}/{reference}", lambda data: {}, 1),
+]
+
+
+@pytest.mark.parametrize("path, params, budget", ENDPOINTS, ids=[endpoint[0] for endpoint in ENDPOINTS])
+def test_statement_budget(
+    client: TestClient,
+    superuser_token_headers: dict[str, str],
+    area_data: dict[str, Any],
+    path: str,
+    params: Any,
+    budget: int,
+) -> None:
+    url = API + path.format(**area_data)
+    r = client.get(url, params=params(area_data), headers=superuser_token_headers)
+    assert r.status_code == 200, r.text
+    with count_statements(engine) as counter:
+        r = client.get(url, params=params(area_data), headers=superuser_token_headers)
+    assert r.status_code == 200, r.text
+    counter.assert_at_most(budget)
@@ -0,0 +1,122 @@
+# The tests run against the database of the settings, migrated and with its first superuser
+# (scripts/prestart.sh), e.g : bash scripts/test.sh
+import uuid
+from collections.abc import Generator
+from datetime import datetime, timezone
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import delete, select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.dto.models.models import (
+    Area,
+    CatalogVersion,
+    Employee,
+    MovementDirection,
+    MovementOperation,
+    PriceHistory,
+    PriceType,
+    Product,
+    ProductCategory,
+    ProductCreationState,
+    StockBalance,
+    StockMovement,
+    User,
+)
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client() -> Generator[TestClient, None, None]:
+    # the lifespan of the app runs (initial data, caches warmed)
+    with TestClient(app) as c:
+        yield c
+
+
+@pytest.fixture(scope="session")
+def superuser_token_headers(client: TestClient) -> dict[str, str]:
+    login_data = {"username": settings.FIRST_SUPERUSER, "password": settings.FIRST_SUPERUSER_PASSWORD}
+    r = client.post(f"{settings.API_V01_STR}/login/access-token", data=login_data)
+    assert r.status_code == 200, r.text
+    return {"Authorization": f"Bearer {r.json()['access_token']}"}
+
+
+async def _create_area_data() -> dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    async with AsyncSessionLocal() as session:
+        superuser = (await session.execute(select(User).where(User.email == settings.FIRST_SUPERUSER))).scalar_one()
+        area = Area(id=uuid.uuid4(), name="tests", location="tests")
+        employee = Employee(id=uuid.uuid4(), area_id=area.id, first_name="Tests", phone="000")
+        product = Product(
+            id=uuid.uuid4(),
+            reference=f"TEST-{uuid.uuid4().hex[:8]}",
+            name="Test product",
+            description="",
+            area_id=area.id,
+            purchase_price=1,
+            sale_price=2,
+            old_stock=0,
+            actual_stock=5,
+            state=ProductCreationState.VALIDED,
+        )
+        movement = StockMovement(
+            id=uuid.uuid4(),
+            area_id=area.id,
+            product_id=product.id,
+            direction=MovementDirection.IN,
+            operation=MovementOperation.SUPPLY,
+            quantity=5,
+            dateOf=now,
+            create_at=now,
+            initiated_by_id=employee.id,
+            created_by_id=superuser.id,
+        )
+        price = PriceHistory(
+            id=uuid.uuid4(),
+            product_id=product.id,
+            type=PriceType.SALE,
+            old_value=1,
+            new_value=2,
+            created_at=now,
+            created_by_id=superuser.id,
+        )
+        session.add(area)
+        await session.flush()
+        session.add_all([employee, product])
+        await session.flush()
+        session.add_all([movement, price])
+        await session.commit()
+        return {
+            "area_id": area.id,
+            "user_id": superuser.id,
+            "employee_id": employee.id,
+            "product_id": product.id,
+            "reference": product.reference,
+            "movement_id": movement.id,
+        }
+
+
+async def _delete_area_data(data: dict[str, Any]) -> None:
+    async with AsyncSessionLocal() as session:
+        await session.execute(delete(PriceHistory).where(PriceHistory.product_id == data["product_id"]))
+        await session.execute(delete(StockMovement).where(StockMovement.area_id == data["area_id"]))
+        await session.execute(delete(StockBalance).where(StockBalance.area_id == data["area_id"]))
+        await session.execute(delete(Product).where(Product.area_id == data["area_id"]))
+        await session.execute(delete(ProductCategory).where(ProductCategory.area_id == data["area_id"]))
+        await session.execute(delete(Employee).where(Employee.area_id == data["area_id"]))
+        await session.execute(delete(CatalogVersion).where(CatalogVersion.area_id == data["area_id"]))
+        await session.execute(delete(Area).where(Area.id == data["area_id"]))
+        await session.commit()
+
+
+@pytest.fixture(scope="session")
+def area_data(client: TestClient) -> Generator[dict[str, Any], None, None]:
+    """An area with an employee, a product, a stock movement and a price change"""
+    # run in the event loop of the app : the connections of the pool belong to it
+    assert client.portal is not None
+    data = client.portal.call(_create_area_data)
+    yield data
+    client.portal.call(_delete_area_data, data)
@@ -0,0 +1,70 @@
+import uuid
+from decimal import Decimal
+from typing import Any
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+from app.core.database import AsyncSessionLocal
+from app.dto.crud.operation_crud import ProductManager, StockLedgerManager
+from app.dto.models.models import ProductCategory, StockMovement
+from app.dto.schemas.operation.product_schema import ProductCreate
+
+
+def _product(area_id: uuid.UUID, **values: Any) -> ProductCreate:
+    data = {
+        "reference": f"NEW-{uuid.uuid4().hex[:8]}",
+        "name": "New product",
+        "description": None,
+        "category_name": "Drinks",
+        "area_id": area_id,
+        "price": 3.5,
+        "purchase_price": 2,
+        "init_stock": None,
+        "actual_stock": 12,
+    }
+    return ProductCreate(**{**data, **values})
+
+
+async def _create_product(data: dict[str, Any]) -> None:
+    async with AsyncSessionLocal() as session:
+        manager = ProductManager(session)
+        product = await manager.create_product(_product(data["area_id"]), data["user_id"], data["employee_id"])
+        assert product.sale_price == Decimal("3.50")
+        assert product.actual_stock == 12
+        category = await session.get(ProductCategory, product.category_id)
+        assert category is not None and category.cat_name == "Drinks"
+        # the initial stock is a movement, counted by the ledger
+        movements = (
+            (await session.execute(select(StockMovement).where(StockMovement.product_id == product.id))).scalars().all()
+        )
+        assert [movement.quantity for movement in movements] == [12]
+        assert await StockLedgerManager(session).current_stock(data["area_id"], product.id) == 12
+
+        # same category name, another case : the category is reused
+        other = await manager.create_product(
+            _product(data["area_id"], category_name="drinks", actual_stock=0), data["user_id"], data["employee_id"]
+        )
+        assert other.category_id == product.category_id
+
+        with pytest.raises(ValueError):
+            await manager.create_product(
+                _product(data["area_id"], reference=product.reference), data["user_id"], data["employee_id"]
+            )
+
+
+async def _create_product_without_employee(data: dict[str, Any]) -> None:
+    async with AsyncSessionLocal() as session:
+        with pytest.raises(ValueError):
+            await ProductManager(session).create_product(_product(data["area_id"]), data["user_id"])
+
+
+def test_create_product(client: TestClient, area_data: dict[str, Any]) -> None:
+    assert client.portal is not None
+    client.portal.call(_create_product, area_data)
+
+
+def test_initial_stock_needs_an_employee(client: TestClient, area_data: dict[str, Any]) -> None:
+    assert client.portal is not None
+    client.portal.call(_create_product_without_employee, area_data)
@@ -0,0 +1,15 @@
+/**
+ * Generated by orval v7.11.2 🍺
+ * Do not edit manually.
+ * Tantana - Boutik
+ * OpenAPI spec version: 0.1.0
+ */
+import type { PriceHistoryRead } from './priceHistoryRead';
+import type { CursorPagePriceHistoryReadNextCursor } from './cursorPagePriceHistoryReadNextCursor';
+import type { CursorPagePriceHistoryReadTotal } from './cursorPagePriceHistoryReadTotal';
+
+export interface CursorPagePriceHistoryRead {
+  data: PriceHistoryRead[];
+  next_cursor?: CursorPagePriceHistoryReadNextCursor;
+  total?: CursorPagePriceHistoryReadTotal;
+}
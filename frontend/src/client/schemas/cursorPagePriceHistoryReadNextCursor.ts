@@ -0,0 +1,8 @@
+/**
+ * Generated by orval v7.11.2 🍺
+ * Do not edit manually.
+ * Tantana - Boutik
+ * OpenAPI spec version: 0.1.0
+ */
+
+export type CursorPagePriceHistoryReadNextCursor = string | null;
@@ -0,0 +1,15 @@
+/**
+ * Generated by orval v7.11.2 🍺
+ * Do not edit manually.
+ * Tantana - Boutik
+ * OpenAPI spec version: 0.1.0
+ */
+import type { ProductRead } from './productRead';
+import type { CursorPageProductReadNextCursor } from './cursorPageProductReadNextCursor';
+import type { CursorPageProductReadTotal } from './cursorPageProductReadTotal';
+
+export interface CursorPageProductRead {
+  data: ProductRead[];
+  next_cursor?: CursorPageProductReadNextCursor;
+  total?: CursorPageProductReadTotal;
+}
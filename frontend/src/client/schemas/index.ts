@@ -24,6 +24,12 @@ export * from './bodyAuthLoginClientSecret';
 export * from './bodyAuthLoginGrantType';
 export * from './categoriesDeleteParams';
 export * from './categoriesFetchAllParams';
+export * from './cursorPagePriceHistoryRead';
+export * from './cursorPagePriceHistoryReadNextCursor';
+export * from './cursorPagePriceHistoryReadTotal';
+export * from './cursorPageProductRead';
+export * from './cursorPageProductReadNextCursor';
+export * from './cursorPageProductReadTotal';
 export * from './employeeCreate';
 export * from './employeeCreateLastName';
 export * from './employeeRead';
@@ -8,4 +8,5 @@
 export type ProductFetchAllForSuperuserParams = {
 skip?: number;
 limit?: number;
+cursor?: string | null;
 };
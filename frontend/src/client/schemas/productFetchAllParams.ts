@@ -8,4 +8,5 @@
 export type ProductFetchAllParams = {
 skip?: number;
 limit?: number;
+cursor?: string | null;
 };
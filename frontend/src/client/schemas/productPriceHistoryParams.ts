@@ -11,4 +11,5 @@ area_id: string;
 type: PriceType;
 skip?: number;
 limit?: number;
+cursor?: string | null;
 };
@@ -119,10 +119,11 @@ export const productFetchAllQuerySkipDefault = 0;export const productFetchAllQue
 
 export const productFetchAllQueryParams = zod.object({
   "skip": zod.number().optional(),
-  "limit": zod.number().default(productFetchAllQueryLimitDefault)
+  "limit": zod.number().default(productFetchAllQueryLimitDefault),
+  "cursor": zod.union([zod.string(),zod.null()]).optional()
 })
 
-export const productFetchAllResponseItem = zod.object({
+export const productFetchAllResponseDataItem = zod.object({
   "reference": zod.string(),
   "name": zod.string(),
   "description": zod.union([zod.string(),zod.null()]),
@@ -135,7 +136,11 @@ export const productFetchAllResponseItem = zod.object({
   "id": zod.uuid(),
   "state": zod.enum(['pending', 'valided', 'rejected'])
 })
-export const productFetchAllResponse = zod.array(productFetchAllResponseItem)
+export const productFetchAllResponse = zod.object({
+  "data": zod.array(productFetchAllResponseDataItem),
+  "next_cursor": zod.union([zod.string(),zod.null()]).optional(),
+  "total": zod.union([zod.number(),zod.null()]).optional()
+})
 
 /**
  * Superuser can obtain list of product for one point of sale
@@ -149,7 +154,8 @@ export const productFetchAllForSuperuserQuerySkipDefault = 0;export const produc
 
 export const productFetchAllForSuperuserQueryParams = zod.object({
   "skip": zod.number().optional(),
-  "limit": zod.number().default(productFetchAllForSuperuserQueryLimitDefault)
+  "limit": zod.number().default(productFetchAllForSuperuserQueryLimitDefault),
+  "cursor": zod.union([zod.string(),zod.null()]).optional()
 })
 
 export const productFetchAllForSuperuserBody = zod.object({
@@ -186,7 +192,7 @@ export const productFetchAllForSuperuserBody = zod.object({
 }))
 })
 
-export const productFetchAllForSuperuserResponseItem = zod.object({
+export const productFetchAllForSuperuserResponseDataItem = zod.object({
   "reference": zod.string(),
   "name": zod.string(),
   "description": zod.union([zod.string(),zod.null()]),
@@ -199,7 +205,11 @@ export const productFetchAllForSuperuserResponseItem = zod.object({
   "id": zod.uuid(),
   "state": zod.enum(['pending', 'valided', 'rejected'])
 })
-export const productFetchAllForSuperuserResponse = zod.array(productFetchAllForSuperuserResponseItem)
+export const productFetchAllForSuperuserResponse = zod.object({
+  "data": zod.array(productFetchAllForSuperuserResponseDataItem),
+  "next_cursor": zod.union([zod.string(),zod.null()]).optional(),
+  "total": zod.union([zod.number(),zod.null()]).optional()
+})
 
 /**
  * @summary Dashboard
@@ -242,15 +252,20 @@ export const productPriceHistoryQueryParams = zod.object({
   "area_id": zod.uuid(),
   "type": zod.enum(['sale', 'purchase']),
   "skip": zod.number().optional(),
-  "limit": zod.number().default(productPriceHistoryQueryLimitDefault)
+  "limit": zod.number().default(productPriceHistoryQueryLimitDefault),
+  "cursor": zod.union([zod.string(),zod.null()]).optional()
 })
 
-export const productPriceHistoryResponseItem = zod.object({
+export const productPriceHistoryResponseDataItem = zod.object({
   "product_id": zod.uuid(),
   "type": zod.enum(['sale', 'purchase']),
   "value": zod.number(),
   "id": zod.uuid(),
   "date": zod.iso.datetime({})
 })
-export const productPriceHistoryResponse = zod.array(productPriceHistoryResponseItem)
+export const productPriceHistoryResponse = zod.object({
+  "data": zod.array(productPriceHistoryResponseDataItem),
+  "next_cursor": zod.union([zod.string(),zod.null()]).optional(),
+  "total": zod.union([zod.number(),zod.null()]).optional()
+})
 
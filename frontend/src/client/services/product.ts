@@ -29,8 +29,9 @@ import type {
 } from '@tanstack/react-query';
 
 import type {
+  CursorPagePriceHistoryRead,
+  CursorPageProductRead,
   HTTPValidationError,
-  PriceHistoryRead,
   ProductCreate,
   ProductDashboardParams,
   ProductDashbordRead,
@@ -404,7 +405,7 @@ export const productFetchAll = (
 ) => {
       
       
-      return customAxios<ProductRead[]>(
+      return customAxios<CursorPageProductRead>(
       {url: `/api/v0.1/product/list/${areaId}`, method: 'GET',
         params, signal
     },
@@ -572,7 +573,7 @@ export const productFetchAllForSuperuser = (
 ) => {
       
       
-      return customAxios<ProductRead[]>(
+      return customAxios<CursorPageProductRead>(
       {url: `/api/v0.1/product/superuser/list/${areaId}`, method: 'GET',
       headers: {'Content-Type': 'application/json', },
         params, signal
@@ -904,7 +905,7 @@ export const productPriceHistory = (
 ) => {
       
       
-      return customAxios<PriceHistoryRead[]>(
+      return customAxios<CursorPagePriceHistoryRead>(
       {url: `/api/v0.1/product/price-history/${productId}`, method: 'GET',
         params, signal
     },